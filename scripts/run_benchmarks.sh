@@ -47,8 +47,30 @@ case "${1:-}" in
         echo "  HTTP_MAX_WORKERS     Max HTTP client workers for measure_docker.py (default: 100)"
         echo "                       Set to 'system' to use Python ThreadPoolExecutor default (CSV: System default)."
         echo "                       Applies to HTTP (static/dynamic) only; WebSocket is unaffected."
+        echo "  HTTP_ENGINE          HTTP load engine for measure_docker.py: thread (default), async or raw"
+        echo "  HTTP_CONNECTIONS     Keep-alive connections for HTTP_ENGINE=async|raw (default: 100)"
+        echo "  HTTP_PROCESSES       Load generator processes, one per CPU (default: 1)"
+        echo "  HTTP_DURATION        Seconds per HTTP run; replaces the request-count sweep with one"
+        echo "                       duration-bounded run per container (default: unset = request counts)"
+        echo "  HTTP_SWEEP           1 = run all request counts in one measure_docker.py --sweep call,"
+        echo "                       reusing one container and Scaphandre session (default: 0)"
+        echo "  HTTP_SWEEP_RESTART   1 = with HTTP_SWEEP, recreate the container between points (default: 0)"
+        echo "  HTTP_TARGET_CI       Repeat each HTTP point until the 95% CI of Requests/s and Total Energy"
+        echo "                       is within this percent of the mean (default: unset = single run)"
+        echo "  HTTP_MAX_REPETITIONS Upper bound on repetitions with HTTP_TARGET_CI (default: 10, min: 3)"
         echo "  BENCH_MEASURE_QUIET  logs: 1=compact [MEASURE]+heartbeats (default), 0=verbose"
         echo "  MEASURE_HEARTBEAT_SEC  Seconds between quiet-mode load progress lines (default: 60, min: 10)"
+        echo "  MEASURE_IDLE_SECONDS   Idle baseline before load (HTTP + WebSocket); CSV adds Idle Power (W)"
+        echo "                       and Energy Above Idle (J) (default: 0 = off; use 10+ for a stable baseline)"
+        echo "  MEASURE_SERVER_CPUS    Pin the server container to a cpuset, e.g. 2-5 (HTTP + WebSocket)"
+        echo "  MEASURE_CLIENT_CPUS    Pin the load generator and Scaphandre to CPUs, e.g. 0-1 (HTTP + WebSocket)"
+        echo "  MEASURE_CORE_SWEEP     Core-scaling study: rerun each container with these CPU counts, e.g. 1,2,4,8"
+        echo "  MEASURE_CORE_LIMIT     How MEASURE_CORE_SWEEP limits the container: quota (default) or cpuset"
+        echo "  MEASURE_BEAM_SCHEDULERS  1 = also pass ERL_FLAGS='+S N:N' to match BEAM schedulers to the CPU count"
+        echo "  MEASURE_WS_VERIFY      WebSocket echo check: sampled (sequence + sampled CRC, default) or full (byte-for-byte)"
+        echo "  MEASURE_WS_WINDOW      WebSocket messages in flight per client (default: 1 = ping-pong), e.g. 16"
+        echo "  MEASURE_WS_PROCESSES   WebSocket client processes, one per CPU, --clients split across them (default: 1)"
+        echo "  MEASURE_WS_EVENT_LOOP  WebSocket client event loop: auto (uvloop when installed, default), asyncio or uvloop"
         echo "  clean       Clean repository to fresh state"
         echo ""
         echo "Examples:"
@@ -60,6 +82,14 @@ case "${1:-}" in
         echo "  $0 --quick static     # Quick static benchmarks"
         echo "  HTTP_MAX_WORKERS=100 $0 static   # Override HTTP worker count"
         echo "  HTTP_MAX_WORKERS=system $0 static   # Use ThreadPoolExecutor default"
+        echo "  HTTP_ENGINE=async HTTP_CONNECTIONS=200 $0 static   # Asyncio keep-alive engine"
+        echo "  HTTP_ENGINE=raw HTTP_CONNECTIONS=200 $0 static     # Raw-socket engine (lowest client overhead)"
+        echo "  HTTP_DURATION=60 $0 static   # 60 s of load per container (equal power samples)"
+        echo "  MEASURE_IDLE_SECONDS=15 $0 static   # 15 s idle baseline before each run"
+        echo "  MEASURE_SERVER_CPUS=2-5 MEASURE_CLIENT_CPUS=0-1 $0 static   # Server and client on separate cores"
+        echo "  MEASURE_CORE_SWEEP=1,2,4 MEASURE_BEAM_SCHEDULERS=1 $0 static   # Throughput/energy vs. server cores"
+        echo "  HTTP_SWEEP=1 $0 static   # One container boot per image for the whole request sweep"
+        echo "  HTTP_TARGET_CI=5 $0 static   # Repeat each point until the 95% CI is within ±5%"
         echo "  BENCH_MEASURE_QUIET=0 $0 static # Verbose logs"
         echo "  BENCH_MEASURE_QUIET=1 MEASURE_HEARTBEAT_SEC=60 $0 static # Compact mode for both + heartbeat interval"
         echo ""
@@ -104,6 +134,51 @@ if [ -n "$HTTP_MAX_WORKERS" ] && ! [[ "$HTTP_MAX_WORKERS" =~ ^[1-9][0-9]*$ ]]; t
     echo "[ERROR] HTTP_MAX_WORKERS must be a positive integer or 'system'. Got: $HTTP_MAX_WORKERS_RAW"
     exit 1
 fi
+# HTTP load engine: thread (requests + ThreadPoolExecutor) or async (asyncio keep-alive pool).
+HTTP_ENGINE="${HTTP_ENGINE:-thread}"
+case "$HTTP_ENGINE" in
+    thread|async|raw) ;;
+    *)
+        echo "[ERROR] HTTP_ENGINE must be 'thread', 'async' or 'raw'. Got: $HTTP_ENGINE"
+        exit 1
+        ;;
+esac
+HTTP_CONNECTIONS="${HTTP_CONNECTIONS:-100}"
+if ! [[ "$HTTP_CONNECTIONS" =~ ^[1-9][0-9]*$ ]]; then
+    echo "[ERROR] HTTP_CONNECTIONS must be a positive integer. Got: $HTTP_CONNECTIONS"
+    exit 1
+fi
+HTTP_PROCESSES="${HTTP_PROCESSES:-1}"
+if ! [[ "$HTTP_PROCESSES" =~ ^[1-9][0-9]*$ ]]; then
+    echo "[ERROR] HTTP_PROCESSES must be a positive integer. Got: $HTTP_PROCESSES"
+    exit 1
+fi
+# Duration-bounded HTTP runs: seconds of load per container instead of the request-count sweep.
+HTTP_DURATION="${HTTP_DURATION:-}"
+if [ -n "$HTTP_DURATION" ] && ! [[ "$HTTP_DURATION" =~ ^[1-9][0-9]*$ ]]; then
+    echo "[ERROR] HTTP_DURATION must be a positive integer number of seconds. Got: $HTTP_DURATION"
+    exit 1
+fi
+# HTTP request-count sweep in one measure_docker.py process (container + Scaphandre started once).
+HTTP_SWEEP="${HTTP_SWEEP:-0}"
+HTTP_SWEEP_RESTART="${HTTP_SWEEP_RESTART:-0}"
+for var in HTTP_SWEEP HTTP_SWEEP_RESTART; do
+    if [ "${!var}" != "0" ] && [ "${!var}" != "1" ]; then
+        echo "[ERROR] $var must be 0 or 1. Got: ${!var}"
+        exit 1
+    fi
+done
+# Adaptive HTTP repetitions: repeat each point until the 95% CI is within HTTP_TARGET_CI percent.
+HTTP_TARGET_CI="${HTTP_TARGET_CI:-}"
+HTTP_MAX_REPETITIONS="${HTTP_MAX_REPETITIONS:-10}"
+if [ -n "$HTTP_TARGET_CI" ] && ! [[ "$HTTP_TARGET_CI" =~ ^[0-9]+(\.[0-9]+)?$ ]]; then
+    echo "[ERROR] HTTP_TARGET_CI must be a positive percentage. Got: $HTTP_TARGET_CI"
+    exit 1
+fi
+if ! [[ "$HTTP_MAX_REPETITIONS" =~ ^[0-9]+$ ]] || [ "$HTTP_MAX_REPETITIONS" -lt 3 ]; then
+    echo "[ERROR] HTTP_MAX_REPETITIONS must be an integer of at least 3. Got: $HTTP_MAX_REPETITIONS"
+    exit 1
+fi
 # HTTP measurements: 1 = one-line measure_docker output (default); 0 = full logs.
 BENCH_MEASURE_QUIET="${BENCH_MEASURE_QUIET:-1}"
 
@@ -174,7 +249,9 @@ print_section() {
 }
 
 bench_http_steps_per_container() {
-    if [[ $SUPER_QUICK_BENCH -eq 1 ]]; then echo 1
+    if [ -n "$HTTP_DURATION" ]; then echo 1
+    elif [ "$HTTP_SWEEP" = "1" ]; then echo 1
+    elif [[ $SUPER_QUICK_BENCH -eq 1 ]]; then echo 1
     elif [[ $QUICK_BENCH -eq 1 ]]; then echo 3
     else echo 13
     fi
@@ -494,8 +571,30 @@ case "${1:-}" in
         echo "  HTTP_MAX_WORKERS     Max HTTP client workers for measure_docker.py (default: 100)"
         echo "                       Set to 'system' to use Python ThreadPoolExecutor default (CSV: System default)."
         echo "                       Applies to HTTP (static/dynamic) only; WebSocket is unaffected."
+        echo "  HTTP_ENGINE          HTTP load engine for measure_docker.py: thread (default), async or raw"
+        echo "  HTTP_CONNECTIONS     Keep-alive connections for HTTP_ENGINE=async|raw (default: 100)"
+        echo "  HTTP_PROCESSES       Load generator processes, one per CPU (default: 1)"
+        echo "  HTTP_DURATION        Seconds per HTTP run; replaces the request-count sweep with one"
+        echo "                       duration-bounded run per container (default: unset = request counts)"
+        echo "  HTTP_SWEEP           1 = run all request counts in one measure_docker.py --sweep call,"
+        echo "                       reusing one container and Scaphandre session (default: 0)"
+        echo "  HTTP_SWEEP_RESTART   1 = with HTTP_SWEEP, recreate the container between points (default: 0)"
+        echo "  HTTP_TARGET_CI       Repeat each HTTP point until the 95% CI of Requests/s and Total Energy"
+        echo "                       is within this percent of the mean (default: unset = single run)"
+        echo "  HTTP_MAX_REPETITIONS Upper bound on repetitions with HTTP_TARGET_CI (default: 10, min: 3)"
         echo "  BENCH_MEASURE_QUIET  logs: 1=compact [MEASURE]+heartbeats (default), 0=verbose"
         echo "  MEASURE_HEARTBEAT_SEC  Seconds between quiet-mode load progress lines (default: 60, min: 10)"
+        echo "  MEASURE_IDLE_SECONDS   Idle baseline before load (HTTP + WebSocket); CSV adds Idle Power (W)"
+        echo "                       and Energy Above Idle (J) (default: 0 = off; use 10+ for a stable baseline)"
+        echo "  MEASURE_SERVER_CPUS    Pin the server container to a cpuset, e.g. 2-5 (HTTP + WebSocket)"
+        echo "  MEASURE_CLIENT_CPUS    Pin the load generator and Scaphandre to CPUs, e.g. 0-1 (HTTP + WebSocket)"
+        echo "  MEASURE_CORE_SWEEP     Core-scaling study: rerun each container with these CPU counts, e.g. 1,2,4,8"
+        echo "  MEASURE_CORE_LIMIT     How MEASURE_CORE_SWEEP limits the container: quota (default) or cpuset"
+        echo "  MEASURE_BEAM_SCHEDULERS  1 = also pass ERL_FLAGS='+S N:N' to match BEAM schedulers to the CPU count"
+        echo "  MEASURE_WS_VERIFY      WebSocket echo check: sampled (sequence + sampled CRC, default) or full (byte-for-byte)"
+        echo "  MEASURE_WS_WINDOW      WebSocket messages in flight per client (default: 1 = ping-pong), e.g. 16"
+        echo "  MEASURE_WS_PROCESSES   WebSocket client processes, one per CPU, --clients split across them (default: 1)"
+        echo "  MEASURE_WS_EVENT_LOOP  WebSocket client event loop: auto (uvloop when installed, default), asyncio or uvloop"
         echo "  clean       Clean repository to fresh state"
         echo ""
         echo "Examples:"
@@ -507,6 +606,14 @@ case "${1:-}" in
         echo "  $0 --quick static     # Quick static benchmarks"
         echo "  HTTP_MAX_WORKERS=100 $0 static   # Override HTTP worker count"
         echo "  HTTP_MAX_WORKERS=system $0 static   # Use ThreadPoolExecutor default"
+        echo "  HTTP_ENGINE=async HTTP_CONNECTIONS=200 $0 static   # Asyncio keep-alive engine"
+        echo "  HTTP_ENGINE=raw HTTP_CONNECTIONS=200 $0 static     # Raw-socket engine (lowest client overhead)"
+        echo "  HTTP_DURATION=60 $0 static   # 60 s of load per container (equal power samples)"
+        echo "  MEASURE_IDLE_SECONDS=15 $0 static   # 15 s idle baseline before each run"
+        echo "  MEASURE_SERVER_CPUS=2-5 MEASURE_CLIENT_CPUS=0-1 $0 static   # Server and client on separate cores"
+        echo "  MEASURE_CORE_SWEEP=1,2,4 MEASURE_BEAM_SCHEDULERS=1 $0 static   # Throughput/energy vs. server cores"
+        echo "  HTTP_SWEEP=1 $0 static   # One container boot per image for the whole request sweep"
+        echo "  HTTP_TARGET_CI=5 $0 static   # Repeat each point until the 95% CI is within ±5%"
         echo "  BENCH_MEASURE_QUIET=0 $0 static # Verbose logs"
         echo "  BENCH_MEASURE_QUIET=1 MEASURE_HEARTBEAT_SEC=60 $0 static # Compact mode for both + heartbeat interval"
         echo ""
@@ -836,21 +943,62 @@ run_docker_tests() {
     else
         test_counts=("${full_http_requests[@]}")
     fi
+    if [ -n "$HTTP_DURATION" ]; then
+        test_counts=("${test_counts[0]}")
+    fi
     ntests=${#test_counts[@]}
+    local repeat_arg=()
+    if [ -n "$HTTP_TARGET_CI" ]; then
+        repeat_arg=(--target-ci "$HTTP_TARGET_CI" --max-repetitions "$HTTP_MAX_REPETITIONS")
+    fi
+    if [ "$HTTP_SWEEP" = "1" ] && [ -z "$HTTP_DURATION" ]; then
+        local csv_file="$RESULTS_DIR/$test_type/${image}.csv"
+        local sweep_arg=(--sweep "$(IFS=,; echo "${test_counts[*]}")")
+        if [ -n "$HTTP_MAX_WORKERS" ]; then
+            sweep_arg+=(--max_workers "$HTTP_MAX_WORKERS")
+        fi
+        if [ "$HTTP_SWEEP_RESTART" = "1" ]; then
+            sweep_arg+=(--restart-between-points)
+        fi
+        print_bench_progress "${image} | levels 1-${ntests}/${ntests} | sweep ${test_counts[*]} requests"
+        "$PYTHON_PATH" ./tools/measure_docker.py \
+            --server_image "$image" \
+            --port_mapping "$port_mapping" \
+            --output_csv "$csv_file" \
+            --measurement_type "$test_type" \
+            --engine "$HTTP_ENGINE" \
+            --connections "$HTTP_CONNECTIONS" \
+            --processes "$HTTP_PROCESSES" \
+            "${repeat_arg[@]}" \
+            "${sweep_arg[@]}"
+        if [ "${BENCH_MEASURE_QUIET:-1}" = "0" ]; then
+            print_csv_summary "$csv_file"
+        fi
+        return
+    fi
     local idx=1
     for num_requests in "${test_counts[@]}"; do
         local csv_file="$RESULTS_DIR/$test_type/${image}.csv"
-        print_bench_progress "${image} | level ${idx}/${ntests} | ${num_requests} requests"
         local worker_arg=()
         if [ -n "$HTTP_MAX_WORKERS" ]; then
             worker_arg=(--max_workers "$HTTP_MAX_WORKERS")
         fi
+        if [ -n "$HTTP_DURATION" ]; then
+            print_bench_progress "${image} | level ${idx}/${ntests} | ${HTTP_DURATION}s duration-bounded"
+            worker_arg+=(--duration "$HTTP_DURATION")
+        else
+            print_bench_progress "${image} | level ${idx}/${ntests} | ${num_requests} requests"
+        fi
         "$PYTHON_PATH" ./tools/measure_docker.py \
             --server_image "$image" \
             --port_mapping "$port_mapping" \
             --num_requests "$num_requests" \
             --output_csv "$csv_file" \
             --measurement_type "$test_type" \
+            --engine "$HTTP_ENGINE" \
+            --connections "$HTTP_CONNECTIONS" \
+            --processes "$HTTP_PROCESSES" \
+            "${repeat_arg[@]}" \
             "${worker_arg[@]}"
         if [ "${BENCH_MEASURE_QUIET:-1}" = "0" ]; then
             print_csv_summary "$csv_file"
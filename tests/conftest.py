@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The measure scripts live in tools/ as standalone modules, not a package.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
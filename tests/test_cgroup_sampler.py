@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+
+import measure_docker
+import measure_websocket
+
+MIB = 1024 * 1024
+
+
+@pytest.fixture(params=[measure_docker, measure_websocket], ids=["http", "websocket"])
+def measure(request):
+    return request.param
+
+
+def write_cgroup(path, usage_usec, current, inactive_file):
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "cpu.stat").write_text(f"usage_usec {usage_usec}\nuser_usec {usage_usec // 2}\nsystem_usec 0\n")
+    (path / "memory.current").write_text(f"{current}\n")
+    (path / "memory.stat").write_text(f"anon 1000\nfile 5000\nactive_file 100\ninactive_file {inactive_file}\n")
+
+
+def test_read_cgroup_sample_parses_usage_and_subtracts_inactive_file(measure, tmp_path):
+    write_cgroup(tmp_path, usage_usec=1234567, current=300 * MIB, inactive_file=100 * MIB)
+    assert measure.read_cgroup_sample(str(tmp_path)) == (1234567, 200 * MIB)
+
+
+def test_read_cgroup_sample_without_memory_stat(measure, tmp_path):
+    write_cgroup(tmp_path, usage_usec=10, current=4096, inactive_file=0)
+    (tmp_path / "memory.stat").unlink()
+    assert measure.read_cgroup_sample(str(tmp_path)) == (10, 4096)
+
+
+def test_read_cgroup_sample_clamps_memory_at_zero(measure, tmp_path):
+    write_cgroup(tmp_path, usage_usec=10, current=100, inactive_file=200)
+    assert measure.read_cgroup_sample(str(tmp_path)) == (10, 0)
+
+
+def test_find_container_cgroup_dir_layouts(measure, tmp_path):
+    container_id = "abc123"
+    assert measure.find_container_cgroup_dir(container_id, str(tmp_path)) is None
+    systemd = tmp_path / "system.slice" / f"docker-{container_id}.scope"
+    write_cgroup(systemd, 0, 0, 0)
+    assert measure.find_container_cgroup_dir(container_id, str(tmp_path)) == str(systemd)
+    assert measure.find_container_cgroup_dir(None, str(tmp_path)) is None
+
+
+def test_summarize_cgroup_samples_avg_peak_total(measure):
+    # 1 s at 50% of a core, then 1 s at 150%; memory 100 MiB -> 300 MiB -> 200 MiB
+    samples = [(0.0, 0, 100 * MIB), (1.0, 500_000, 300 * MIB), (2.0, 2_000_000, 200 * MIB)]
+    cpu, mem = measure.summarize_cgroup_samples(samples)
+    assert cpu["total"] == pytest.approx(200.0)   # 2 CPU-seconds = 200 %*s
+    assert cpu["avg"] == pytest.approx(100.0)
+    assert cpu["peak"] == pytest.approx(150.0)
+    assert mem["total"] == pytest.approx(200.0 + 250.0)  # trapezoids, MB*s
+    assert mem["avg"] == pytest.approx(225.0)
+    assert mem["peak"] == pytest.approx(300.0)
+
+
+def test_summarize_cgroup_samples_single_sample(measure):
+    cpu, mem = measure.summarize_cgroup_samples([(5.0, 100, 64 * MIB)])
+    assert cpu == {"avg": 0.0, "peak": 0.0, "total": 0.0}
+    assert mem == {"avg": 64.0, "peak": 64.0, "total": 0.0}
+
+
+def test_collect_resources_cgroup_samples_until_stopped(measure, tmp_path):
+    write_cgroup(tmp_path, usage_usec=0, current=50 * MIB, inactive_file=0)
+    stop_event = threading.Event()
+    samples = []
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(
+        metrics=measure.collect_resources_cgroup(str(tmp_path), stop_event, interval=0.01, samples=samples)))
+    thread.start()
+    stop_event.wait(0.05)
+    write_cgroup(tmp_path, usage_usec=1_000_000, current=80 * MIB, inactive_file=0)
+    stop_event.wait(0.05)
+    stop_event.set()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert len(samples) >= 2
+    assert samples[0][1:] == (0, 50 * MIB)
+    assert samples[-1][1:] == (1_000_000, 80 * MIB)
+    cpu, mem = result["metrics"]
+    assert cpu["total"] == pytest.approx(100.0)
+    assert mem["peak"] == pytest.approx(80.0)
+
+
+def test_collect_resources_cgroup_survives_vanished_cgroup(measure, tmp_path):
+    stop_event = threading.Event()
+    stop_event.set()
+    cpu, mem = measure.collect_resources_cgroup(str(tmp_path / "gone"), stop_event, interval=0.01)
+    assert cpu == {"avg": 0.0, "peak": 0.0, "total": 0.0}
+    assert mem["peak"] == 0.0
@@ -0,0 +1,202 @@
+import json
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import measure_docker
+import measure_websocket
+
+STATS_DOCS = [
+    {"read": "t0", "cpu_stats": {"cpu_usage": {"total_usage": 1_000_000_000}},
+     "memory_stats": {"usage": 300 * 1024 * 1024, "stats": {"inactive_file": 100 * 1024 * 1024}}},
+    {"read": "t1", "cpu_stats": {}},  # first document of a fresh stream can lack CPU data
+    {"read": "t2", "cpu_stats": {"cpu_usage": {"total_usage": 1_500_000_000}},
+     "memory_stats": {"usage": 64 * 1024 * 1024, "stats": {"total_inactive_file": 4 * 1024 * 1024}}},
+]
+
+
+class _StubDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path):
+        super().__init__(path, _StubHandler)
+        self.calls = []
+        self.containers = {}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Just enough of the Engine API for DockerAPI: keep-alive JSON replies and a chunked stats stream."""
+
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self):
+        return "unix"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+    def _handle(self):
+        parts = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        query = parse_qs(parts.query)
+        self.server.calls.append((self.command, parts.path, query, body))
+        segments = parts.path.strip("/").split("/")
+        containers = self.server.containers
+        if self.command == "POST" and parts.path == "/containers/create":
+            name = query["name"][0]
+            containers[name] = {"Id": f"id-{name}", "Names": [f"/{name}"], "running": False}
+            return self._reply(201, {"Id": f"id-{name}", "Warnings": []})
+        if segments[0] != "containers":
+            return self._reply(404, {"message": "page not found"})
+        if segments[1] == "json":
+            wanted = json.loads(query.get("filters", ["{}"])[0]).get("name", [])
+            return self._reply(200, [{"Names": c["Names"]} for n, c in containers.items()
+                                     if not wanted or any(w in n for w in wanted)])
+        name = next((n for n, c in containers.items() if segments[1] in (n, c["Id"])), None)
+        if name is None:
+            return self._reply(404, {"message": f"No such container: {segments[1]}"})
+        action = segments[2] if len(segments) > 2 else None
+        if self.command == "POST" and action == "start":
+            containers[name]["running"] = True
+            return self._reply(204)
+        if self.command == "POST" and action == "stop":
+            if not containers[name]["running"]:
+                return self._reply(304)
+            containers[name]["running"] = False
+            return self._reply(204)
+        if self.command == "DELETE" and action is None:
+            del containers[name]
+            return self._reply(204)
+        if self.command == "GET" and action == "json":
+            return self._reply(200, {"Id": containers[name]["Id"],
+                                     "State": {"Status": "running" if containers[name]["running"] else "exited"}})
+        if self.command == "GET" and action == "stats":
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for doc in STATS_DOCS:
+                # Split each document over two chunks: the reader must reassemble lines, not chunks
+                line = json.dumps(doc).encode() + b"\n"
+                for piece in (line[:7], line[7:]):
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+            return None
+        return self._reply(404, {"message": "unsupported"})
+
+    do_GET = do_POST = do_DELETE = _handle
+
+
+@pytest.fixture(params=[measure_docker, measure_websocket], ids=["http", "websocket"])
+def measure(request):
+    return request.param
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    server = _StubDaemon(str(tmp_path / "docker.sock"))
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_run_sends_host_config(measure, daemon):
+    api = measure.DockerAPI(daemon.server_address)
+    container_id = api.run("img:1", "web", port_mapping="8080:80", env={"ERL_FLAGS": "+S 2:2"},
+                           cpuset_cpus="2-3", nano_cpus=2_000_000_000)
+    assert container_id == "id-web"
+    method, path, query, body = daemon.calls[0]
+    assert (method, path, query["name"]) == ("POST", "/containers/create", ["web"])
+    assert body["Image"] == "img:1"
+    assert body["Env"] == ["ERL_FLAGS=+S 2:2"]
+    assert body["ExposedPorts"] == {"80/tcp": {}}
+    host_config = body["HostConfig"]
+    assert host_config["CgroupnsMode"] == "host"
+    assert host_config["Ulimits"] == [{"Name": "nofile", "Soft": 100000, "Hard": 100000}]
+    assert host_config["PortBindings"] == {"80/tcp": [{"HostPort": "8080"}]}
+    assert host_config["CpusetCpus"] == "2-3"
+    assert host_config["NanoCpus"] == 2_000_000_000
+    assert daemon.calls[1][:2] == ("POST", "/containers/id-web/start")
+    api.close()
+
+
+def test_run_host_network_and_host_ip(measure, daemon):
+    api = measure.DockerAPI(daemon.server_address)
+    api.run("img", "hostnet", port_mapping="8080:80", network="host")
+    host_config = daemon.calls[0][3]["HostConfig"]
+    assert host_config["NetworkMode"] == "host"
+    assert "PortBindings" not in host_config and "CpusetCpus" not in host_config
+    api.run("img", "bound", port_mapping="127.0.0.1:8081:80")
+    assert daemon.calls[2][3]["HostConfig"]["PortBindings"] == {"80/tcp": [{"HostPort": "8081", "HostIp": "127.0.0.1"}]}
+
+
+def test_lifecycle_ps_inspect_stop_remove(measure, daemon):
+    api = measure.DockerAPI(daemon.server_address)
+    api.run("img", "web")
+    api.run("img", "other")
+    assert sorted(api.ps()) == ["other", "web"]
+    assert api.ps("web") == ["web"]
+    assert api.inspect("web")["State"]["Status"] == "running"
+    api.stop("web", timeout=3)
+    assert daemon.calls[-1][:3] == ("POST", "/containers/web/stop", {"t": ["3"]})
+    api.stop("web")  # already stopped: 304 is fine
+    assert api.inspect("web")["State"]["Status"] == "exited"
+    api.remove("web", force=True)
+    assert daemon.calls[-1][:3] == ("DELETE", "/containers/web", {"force": ["1"]})
+    assert api.inspect("web") is None
+    assert api.ps() == ["other"]
+    with pytest.raises(measure.DockerAPIError) as excinfo:
+        api.remove("web")
+    assert excinfo.value.status == 404
+    api.remove("web", missing_ok=True)
+    api.stop("web", missing_ok=True)
+    api.close()
+
+
+def test_requests_share_one_keep_alive_connection(measure, daemon):
+    api = measure.DockerAPI(daemon.server_address)
+    api.run("img", "web")
+    conn = api._conn
+    api.ps()
+    api.inspect("web")
+    assert api._conn is conn
+
+
+def test_stats_stream_reads_chunked_documents(measure, daemon):
+    api = measure.DockerAPI(daemon.server_address)
+    api.run("img", "web")
+    docs = list(api.stats_stream("web"))
+    assert [d["read"] for d in docs] == ["t0", "t1", "t2"]
+    assert measure.docker_stats_sample(docs[0]) == (1_000_000, 200 * 1024 * 1024)
+    assert measure.docker_stats_sample(docs[2]) == (1_500_000, 60 * 1024 * 1024)
+    with pytest.raises(measure.DockerAPIError):
+        list(api.stats_stream("missing"))
+
+
+def test_collect_resources_docker_api(measure, daemon):
+    api = measure.DockerAPI(daemon.server_address)
+    api.run("img", "web")
+    first_sample = threading.Event()
+    samples = []
+    cpu, mem = measure.collect_resources_docker_api(api, "web", threading.Event(), samples=samples,
+                                                    first_sample=first_sample)
+    assert first_sample.is_set()
+    assert [s[1:] for s in samples] == [(1_000_000, 200 * 1024 * 1024), (1_500_000, 60 * 1024 * 1024)]
+    assert cpu["total"] == pytest.approx(50.0)  # 0.5 CPU-seconds between the two documents
+    assert mem["peak"] == pytest.approx(200.0)
@@ -0,0 +1,85 @@
+import asyncio
+import socket
+import socketserver
+import threading
+
+import pytest
+
+import measure_docker
+
+RESPONSE = b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: keep-alive\r\n\r\nok"
+
+
+class _ClosingServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """Keep-alive HTTP server that closes connections like a real one: after *idle_timeout* seconds without
+    a request, or (``answer_once``) on the second request of a connection, before replying to it."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, idle_timeout=None, answer_once=False):
+        super().__init__(("127.0.0.1", 0), _ClosingHandler)
+        self.idle_timeout = idle_timeout
+        self.answer_once = answer_once
+        self.connections = 0
+
+
+class _ClosingHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.server.connections += 1
+        answered = 0
+        while True:
+            try:
+                line = self.rfile.readline()
+                while line not in (b"\r\n", b""):
+                    line = self.rfile.readline()
+            except socket.timeout:
+                return
+            if not line or (self.server.answer_once and answered):
+                return
+            self.wfile.write(RESPONSE)
+            answered += 1
+            if self.server.idle_timeout is not None:
+                self.connection.settimeout(self.server.idle_timeout)
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(**kwargs):
+        server = _ClosingServer(**kwargs)
+        threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/", server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def run_engine(engine, url, schedule):
+    measure_docker.reset_load_state()
+    if engine == "async":
+        asyncio.run(measure_docker.run_async_load(url, schedule, 1))
+    else:
+        measure_docker.run_raw_load(url, schedule, 1)
+    return dict(measure_docker.results_counter)
+
+
+@pytest.mark.parametrize("engine", ["async", "raw"])
+def test_idle_timeout_closes_are_not_failures(engine, serve):
+    url, server = serve(idle_timeout=0.05)
+    counts = run_engine(engine, url, measure_docker.OpenLoopSchedule(rate=10, duration=0.5))
+    assert counts == {"total": 5, "success": 5}
+    assert server.connections == 5
+
+
+@pytest.mark.parametrize("engine", ["async", "raw"])
+def test_request_on_a_connection_closed_under_it_is_retried_once(engine, serve):
+    url, server = serve(answer_once=True)
+    counts = run_engine(engine, url, measure_docker.ClosedLoopSchedule(num_requests=4))
+    assert counts == {"total": 4, "success": 4}
+    assert server.connections == 4
+    assert measure_docker.merged_latency_histogram().count == 4
@@ -0,0 +1,45 @@
+import threading
+from collections import Counter
+
+import measure_docker
+
+
+def test_bins_hold_each_seconds_latency_buckets():
+    measure_docker.reset_load_state()
+    timeline = measure_docker.LoadTimeline(interval=3600).start()
+    hist = measure_docker.new_latency_histogram()
+    for latency in (0.001, 0.001, 0.250):
+        hist.record(latency)
+    with measure_docker.results_lock:
+        measure_docker.results_counter.update(total=3, failure=0)
+    timeline._cut()
+    hist.record(0.002)
+    bins = timeline.stop()
+    assert [b[2] for b in bins] == [3, 0]
+    assert bins[0][4] == {hist._index(1000): 2, hist._index(250000): 1}
+    assert bins[1][4] == {hist._index(2000): 1}
+    assert measure_docker.latency_bucket_log == []
+
+
+def test_concurrent_workers_lose_no_buckets_across_cuts():
+    measure_docker.reset_load_state()
+    timeline = measure_docker.LoadTimeline(interval=0.001).start()
+
+    def worker(seed):
+        hist = measure_docker.worker_latency_histogram()
+        for i in range(20000):
+            hist.record(((seed * 7919 + i) % 5000) / 1e5)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    bins = timeline.stop()
+    assert len(bins) > 1
+    from_bins = Counter()
+    for b in bins:
+        from_bins.update(b[4])
+    merged = measure_docker.merged_latency_histogram()
+    assert merged.count == 80000
+    assert from_bins == Counter({i: c for i, c in enumerate(merged.counts) if c})
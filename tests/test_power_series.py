@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+import measure_docker
+import measure_websocket
+
+
+@pytest.fixture(params=[measure_docker, measure_websocket], ids=["http", "websocket"])
+def measure(request):
+    return request.param
+
+
+def write_reports(path, reports):
+    """Scaphandre JSON with container=null consumers, as on cgroup v2 hosts; reports are (timestamp, {pid: watts})."""
+    entries = [{"host": {"timestamp": t},
+                "consumers": [{"pid": pid, "consumption": watts * 1e6, "container": None} for pid, watts in power.items()]}
+               for t, power in reports]
+    path.write_text(json.dumps(entries))
+    return str(path)
+
+
+def test_fallback_matches_each_report_against_its_own_boot(measure, monkeypatch, tmp_path):
+    # Boot 1 runs PIDs 10/11 and is stopped; boot 2 reuses the name with PID 20. PID 99 is some other process.
+    running = {"id-1": {10, 11}, "id-2": {20}}
+    ids = iter(["id-1", "id-2"])
+    monkeypatch.setattr(measure, "get_container_id", lambda *args: next(ids))
+    monkeypatch.setattr(measure, "container_pids", lambda container_id: set(running[container_id]))
+    boots = measure.ContainerBoots("web", "docker")
+    boots.started()
+    boots.stopping()
+    boots.stopped_at[-1] = 15.0
+    running["id-1"] = set()  # gone from /proc once stopped
+    boots.started()
+    boots.snapshot()
+    assert boots.pids_at(5.0) == {10, 11} and boots.pids_at(15.0) == {10, 11} and boots.pids_at(25.0) == {20}
+
+    file_name = write_reports(tmp_path / "power.json", [
+        (10.0, {10: 3.0, 11: 1.0, 99: 50.0}),
+        (20.0, {20: 2.0, 10: 7.0, 99: 50.0}),  # PID 10 reused by another process after boot 1 stopped
+    ])
+    series = measure.load_container_power_series(file_name, "web", boots=boots)
+    assert series == [(10.0, pytest.approx(4.0)), (20.0, pytest.approx(2.0))]
+
+
+def test_named_consumers_win_over_the_pid_fallback(measure, monkeypatch, tmp_path):
+    monkeypatch.setattr(measure, "get_container_id", lambda *args: "id-1")
+    monkeypatch.setattr(measure, "container_pids", lambda container_id: {10})
+    boots = measure.ContainerBoots("web", "docker")
+    boots.started()
+    entries = [{"host": {"timestamp": 1.0}, "consumers": [
+        {"pid": 10, "consumption": 9e6, "container": None},
+        {"pid": 30, "consumption": 2e6, "container": {"name": "web"}},
+    ]}]
+    (tmp_path / "power.json").write_text(json.dumps(entries))
+    series = measure.load_container_power_series(str(tmp_path / "power.json"), "web", boots=boots)
+    assert series == [(1.0, pytest.approx(2.0))]
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import pytest
+import websockets
+
+import measure_websocket
+
+
+@pytest.mark.parametrize("full", [False, True], ids=["sampled", "full"])
+def test_message_stamps_sequence_into_the_client_buffer(full):
+    payload = measure_websocket.EchoPayload(4096, full=full)
+    buf = payload.buffer()
+    assert payload.message(buf, 7) is buf
+    assert payload.check(bytes(buf), 7)
+    payload.message(buf, 8)
+    assert payload.check(bytes(buf), 8) and not payload.check(bytes(buf), 7)
+    assert buf[measure_websocket.ECHO_HEADER.size:] == payload.body
+
+
+def test_clients_get_separate_buffers_over_one_shared_body():
+    first, second = measure_websocket.EchoPayload(1024), measure_websocket.EchoPayload(1024)
+    assert first.body.obj is second.body.obj
+    a, b = first.buffer(), second.buffer()
+    first.message(a, 1)
+    second.message(b, 2)
+    assert first.check(bytes(a), 1) and second.check(bytes(b), 2)
+
+
+def test_check_rejects_wrong_length_and_corrupted_body():
+    payload = measure_websocket.EchoPayload(1024, full=True)
+    buf = payload.message(payload.buffer(), 3)
+    assert not payload.check(bytes(buf[:-1]), 3)
+    corrupted = bytearray(buf)
+    corrupted[-1] ^= 0xFF
+    assert not payload.check(bytes(corrupted), 3)
+
+
+def echo_server_tracking_in_flight(delay):
+    """websockets handler echoing each message after *delay*; ``stats['peak']`` is the most messages it held at once."""
+    stats = {'held': 0, 'peak': 0, 'received': 0}
+
+    async def handler(ws):
+        async def echo_later(message):
+            await asyncio.sleep(delay)
+            stats['held'] -= 1
+            await ws.send(message)
+
+        pending = set()
+        async for message in ws:
+            stats['received'] += 1
+            stats['held'] += 1
+            stats['peak'] = max(stats['peak'], stats['held'])
+            task = asyncio.create_task(echo_later(message))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    return handler, stats
+
+
+def client_results():
+    return {'success': 0, 'fail': 0, 'total': 0, 'hist': measure_websocket.LatencyHistogram(),
+            'timeline': measure_websocket.EchoTimeline(time.time())}
+
+
+@pytest.mark.parametrize("window", [1, 4])
+def test_burst_window_keeps_several_messages_in_flight(window):
+    handler, stats = echo_server_tracking_in_flight(delay=0.05)
+    results = client_results()
+
+    async def run():
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+            payload = measure_websocket.EchoPayload(1024)
+            await measure_websocket.echo_window_client(url, payload, window, results, 0, count=8, pause=0.2)
+
+    asyncio.run(asyncio.wait_for(run(), timeout=30))
+    # The pause follows each group of `window` messages, not each message, so a whole group is in flight at once
+    assert stats['peak'] == window
+    assert (results['total'], results['success'], results['fail']) == (8, 8, 0)
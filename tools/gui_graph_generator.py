@@ -573,6 +573,7 @@ XAXIS_DISPLAY_NAMES = {
     "Duration (s)": "Duration (s)",
     "Interval (s)": "Interval (s)",
     "Total Requests": "Total requests",
+    "Server Cores": "Server CPU cores",
 }
 
 def detect_websocket_subtype(filepath, header, rows):
@@ -596,8 +597,22 @@ def detect_websocket_subtype(filepath, header, rows):
         return WS_SUBTYPE_STREAM
     return None
 
+def core_sweep_column(header, rows):
+    """Return "Server Cores" when the rows come from a core-scaling sweep (--core-sweep), else None."""
+    if "Server Cores" not in header:
+        return None
+    vals = {safe_float(r.get("Server Cores")) for r in rows if r.get("Server Cores") not in (None, "")}
+    return "Server Cores" if len(vals) > 1 else None
+
+def http_xaxis_column(header, rows):
+    """Choose the x-axis column for HTTP plots: Server Cores for a core sweep, else Total Requests."""
+    return core_sweep_column(header, rows) or ("Total Requests" if "Total Requests" in header else None)
+
 def websocket_xaxis_column(header, rows, subtype):
     """Choose the best x-axis column for WebSocket plot from subtype and data."""
+    cores_col = core_sweep_column(header, rows)
+    if cores_col:
+        return cores_col
     if subtype == WS_SUBTYPE_CONCURRENCY and "Num Clients" in header:
         return "Num Clients"
     if subtype == WS_SUBTYPE_PAYLOAD and "Message Size (KB)" in header:
@@ -639,7 +654,8 @@ def read_csv(filepath):
     with open(filepath, newline='', encoding='utf-8', errors='replace') as f:
         reader = csv.DictReader(f)
         header = reader.fieldnames or []
-        rows = list(reader)
+        # --target-ci summary rows aggregate the repetition rows next to them; plot the repetitions only
+        rows = [r for r in reader if (r.get("Repetition") or "").strip() != "summary"]
     return header, rows
 
 def summarize_column(rows, col):
@@ -3342,8 +3358,9 @@ class BenchmarkGrapher(QMainWindow):
             if not y:
                 y = [0.0] * len(rows)
             return x, y, label
-        if header_list and "Total Requests" in header_list:
-            x = [safe_float(_row_value(r, "Total Requests", header_list)) for r in rows]
+        xcol = http_xaxis_column(header_list, rows) if header_list else None
+        if xcol:
+            x = [safe_float(_row_value(r, xcol, header_list)) for r in rows]
             y = [safe_float(_row_value(r, metric, header_list)) for r in rows]
         else:
             x = list(range(1, len(rows) + 1))
@@ -3359,9 +3376,7 @@ class BenchmarkGrapher(QMainWindow):
             if xcol:
                 return xcol
             return "Test Parameter"
-        if "Total Requests" in header:
-            return "Total Requests"
-        return "Test Parameter"
+        return http_xaxis_column(header, rows) or "Test Parameter"
 
     def _default_save_stem(self):
         """Default path stem: graphs/<category>/<metric>[-<ws-subtype>]-<N>bench-<YYYYMMDD-HHMM>."""
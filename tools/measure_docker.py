@@ -8,10 +8,27 @@ from concurrent.futures import ThreadPoolExecutor
 from collections import Counter
 import argparse
 import json
+import math
+import statistics
+import re
+import bisect
+import itertools
+import uuid
 import threading
+import glob
+import socket
+import selectors
+import heapq
+import errno
+import http.client
+from urllib.parse import quote, urlencode, urlsplit
 from datetime import datetime
 import logging
 import psutil
+import numpy as np
+import asyncio
+import multiprocessing
+import queue
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger()
@@ -35,6 +52,24 @@ def http_max_workers_label(args):
     return "System default" if args.max_workers is None else str(int(args.max_workers))
 
 
+def load_description(args):
+    if args.rate is not None:
+        return f"open-loop {args.rate:g} req/s for {args.duration:g}s"
+    if args.duration is not None:
+        return f"GET for {args.duration:g}s"
+    return f"{args.num_requests} GET"
+
+
+def http_engine_label(args):
+    if args.engine == "thread":
+        label = "thread"
+    else:
+        label = f"{args.engine} ({args.connections} keep-alive connections)"
+    if args.processes > 1:
+        label += f" x {args.processes} processes"
+    return label
+
+
 def measure_quiet_msg(body: str) -> None:
     print(f"{_M_MAGENTA}[MEASURE]{_M_NC} {body}", flush=True)
 
@@ -50,6 +85,201 @@ results_counter = Counter()
 runtime_data = {}
 results_lock = threading.Lock()
 
+
+class LatencyHistogram:
+    """Fixed-memory log-bucketed latency histogram (HDR-style), recorded in microseconds.
+
+    Values below ``2**SUB_BUCKET_BITS`` us get exact buckets; above that every power of two is split
+    into ``2**(SUB_BUCKET_BITS - 1)`` linear sub-buckets, so the relative error stays under ~1.6%.
+    Each worker owns one instance and records without locking; instances are merged once load ends.
+    A histogram given a *log* list also appends each bucket index to it for ``LoadTimeline``.
+    """
+
+    SUB_BUCKET_BITS = 7
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+    HALF_SUB_BUCKETS = SUB_BUCKETS // 2
+    MAX_VALUE_US = (1 << 40) - 1  # ~12.7 days; larger values are clamped into the last bucket
+
+    def __init__(self, log=None):
+        self.log = log
+        self.counts = [0] * (self._index(self.MAX_VALUE_US) + 1)
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    @classmethod
+    def _index(cls, value_us):
+        shift = value_us.bit_length() - cls.SUB_BUCKET_BITS
+        if shift <= 0:
+            return value_us
+        return shift * cls.HALF_SUB_BUCKETS + (value_us >> shift)
+
+    @classmethod
+    def _bucket_bounds(cls, index):
+        """Inclusive lower bound and width (us) of bucket *index*."""
+        if index < cls.SUB_BUCKETS:
+            return index, 1
+        shift = (index - cls.SUB_BUCKETS) // cls.HALF_SUB_BUCKETS + 1
+        return (index - shift * cls.HALF_SUB_BUCKETS) << shift, 1 << shift
+
+    def record(self, seconds):
+        value_us = min(max(int(seconds * 1e6), 0), self.MAX_VALUE_US)
+        index = self._index(value_us)
+        self.counts[index] += 1
+        if self.log is not None:
+            self.log.append(index)
+        self.count += 1
+        self.total_us += value_us
+        if self.min_us is None or value_us < self.min_us:
+            self.min_us = value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def merge(self, other):
+        counts = self.counts
+        for i, c in enumerate(other.counts):
+            if c:
+                counts[i] += c
+        self.count += other.count
+        self.total_us += other.total_us
+        if other.min_us is not None and (self.min_us is None or other.min_us < self.min_us):
+            self.min_us = other.min_us
+        self.max_us = max(self.max_us, other.max_us)
+        return self
+
+    def percentile_ms(self, pct):
+        """Latency (ms) at percentile *pct* (0-100), using the bucket midpoint clamped to min/max."""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, int(round(self.count * pct / 100.0)))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if not c:
+                continue
+            seen += c
+            if seen >= rank:
+                low, width = self._bucket_bounds(i)
+                value_us = min(max(low + (width - 1) / 2.0, self.min_us), self.max_us)
+                return value_us / 1000.0
+        return self.max_us / 1000.0
+
+    def mean_ms(self):
+        return (self.total_us / self.count) / 1000.0 if self.count else 0.0
+
+    def min_ms(self):
+        return (self.min_us or 0) / 1000.0
+
+    def max_ms(self):
+        return self.max_us / 1000.0
+
+    def state(self):
+        """Plain-data snapshot for shipping between processes (see ``from_state``)."""
+        return (self.counts, self.count, self.total_us, self.min_us, self.max_us)
+
+    @classmethod
+    def from_state(cls, state):
+        hist = cls()
+        hist.counts, hist.count, hist.total_us, hist.min_us, hist.max_us = state
+        hist.counts = list(hist.counts)
+        return hist
+
+    @classmethod
+    def from_counts(cls, buckets):
+        """Histogram from sparse ``{bucket_index: count}`` (one timeline bin); sum, min and max use bucket midpoints/bounds."""
+        hist = cls()
+        for i, c in buckets.items():
+            low, width = cls._bucket_bounds(i)
+            hist.counts[i] = c
+            hist.count += c
+            hist.total_us += c * (low + (width - 1) // 2)
+        if buckets:
+            hist.min_us = cls._bucket_bounds(min(buckets))[0]
+            low, width = cls._bucket_bounds(max(buckets))
+            hist.max_us = low + width - 1
+        return hist
+
+
+# Every worker's histogram is registered here once; merged after the load phase.
+latency_histograms = []
+# Bucket index of every latency the workers record, drained each second by LoadTimeline. Appends from
+# any thread are atomic under the GIL, so workers keep recording without a lock.
+latency_bucket_log = []
+_worker_state = threading.local()
+
+
+def new_latency_histogram():
+    """Return a new worker histogram, registered for merging and feeding ``latency_bucket_log``."""
+    hist = LatencyHistogram(log=latency_bucket_log)
+    latency_histograms.append(hist)
+    return hist
+
+
+def worker_latency_histogram():
+    """Return the calling thread's own histogram, creating and registering it on first use."""
+    hist = getattr(_worker_state, "histogram", None)
+    if hist is None:
+        hist = _worker_state.histogram = new_latency_histogram()
+    return hist
+
+
+def merged_latency_histogram():
+    merged = LatencyHistogram()
+    for hist in latency_histograms:
+        merged.merge(hist)
+    return merged
+
+
+LATENCY_PERCENTILES = ((50, "P50"), (90, "P90"), (99, "P99"), (99.9, "P99.9"))
+
+# Per-request phases timed by the socket-level engines: TCP connect (new connections only), request
+# sent -> first response byte, first byte -> last body byte.
+TIMING_PHASES = (("connect", "Connect"), ("ttfb", "TTFB"), ("transfer", "Transfer"))
+phase_histograms = {phase: [] for phase, _ in TIMING_PHASES}
+
+
+def new_phase_histograms():
+    """Return a fresh {phase: LatencyHistogram} for one worker, registered for merging."""
+    hists = {}
+    for phase, _ in TIMING_PHASES:
+        hists[phase] = LatencyHistogram()
+        phase_histograms[phase].append(hists[phase])
+    return hists
+
+
+def merged_phase_histograms():
+    merged = {}
+    for phase, _ in TIMING_PHASES:
+        merged[phase] = LatencyHistogram()
+        for hist in phase_histograms[phase]:
+            merged[phase].merge(hist)
+    return merged
+
+
+def phase_csv_fields(phase_hists):
+    """Avg/P50/P99 per timing phase; empty for engines that do not time phases (thread)."""
+    fields = {}
+    for phase, label in TIMING_PHASES:
+        hist = phase_hists.get(phase) if phase_hists else None
+        has_data = hist is not None and hist.count > 0
+        fields[f"{label} Count"] = hist.count if hist is not None else ""
+        fields[f"{label} Avg (ms)"] = hist.mean_ms() if has_data else ""
+        fields[f"{label} P50 (ms)"] = hist.percentile_ms(50) if has_data else ""
+        fields[f"{label} P99 (ms)"] = hist.percentile_ms(99) if has_data else ""
+    return fields
+
+
+def latency_csv_fields(hist):
+    """CSV ``extra_fields`` for an HTTP latency histogram (ms), matching the WebSocket CSV naming."""
+    fields = {
+        "Avg Latency (ms)": hist.mean_ms(),
+        "Min Latency (ms)": hist.min_ms(),
+        "Max Latency (ms)": hist.max_ms(),
+    }
+    for pct, label in LATENCY_PERCENTILES:
+        fields[f"{label} Latency (ms)"] = hist.percentile_ms(pct)
+    return fields
+
 def get_binary_path(binary_name):
     result = subprocess.run(["which", binary_name], capture_output=True, text=True, check=True)
     return result.stdout.strip() or f"'{binary_name}' not found"
@@ -74,11 +304,127 @@ def check_prerequisites():
             logger.error("  - %s: %s", name, install_hint)
         sys.exit(1)
 
-def send_request(url, request_num, verbose=False):
+# =====================
+# Request schedules (closed-loop budget / open-loop timeline)
+# =====================
+OPEN_LOOP_LATE_THRESHOLD = 0.010  # seconds behind its slot before a request counts as late (well above sleep wake-up jitter)
+
+
+class ClosedLoopSchedule:
+    """Closed-loop job source: each slot is due the moment a worker is free.
+
+    Bounded by *num_requests* slots, or, with *duration*, by a wall-clock window: no new slot is handed
+    out once *duration* seconds have passed, and the achieved request count is whatever completed.
+    """
+
+    open_loop = False
+
+    def __init__(self, num_requests=None, duration=None):
+        self.scheduled = num_requests
+        self.duration = duration
+        self.end = time.perf_counter() + duration if duration is not None else None
+        self.issued = 0
+        self.late = 0
+        self._lock = threading.Lock()
+
+    def claim(self):
+        """Return the due time (``time.perf_counter``) of the next slot, or None when the budget is spent."""
+        now = time.perf_counter()
+        with self._lock:
+            if self.end is not None:
+                if now >= self.end:
+                    return None
+            elif self.issued >= self.scheduled:
+                return None
+            self.issued += 1
+        return now
+
+    def note_sent(self, due):
+        pass
+
+    @property
+    def dropped(self):
+        return 0
+
+
+class OpenLoopSchedule:
+    """Open-loop job source: slot *i* is due at ``start + i / rate`` for *duration* seconds.
+
+    Workers claim slots in order and sleep until the slot is due; a slot claimed after its due time is
+    sent at once. Latency is measured from the due time, so time spent queued behind a stalled server
+    is charged to the request (coordinated-omission correction). A request that leaves more than
+    ``OPEN_LOOP_LATE_THRESHOLD`` after its slot is late; slots still unclaimed when the duration ends
+    are dropped.
+    """
+
+    open_loop = True
+
+    def __init__(self, rate, duration, phase=0.0):
+        self.rate = rate
+        self.duration = duration
+        self.interval = 1.0 / rate
+        self.scheduled = int(rate * duration)
+        self.start = time.perf_counter() + phase
+        self.end = self.start + duration
+        self.issued = 0
+        self.late = 0
+        self._lock = threading.Lock()
+
+    def claim(self):
+        with self._lock:
+            if self.issued >= self.scheduled or time.perf_counter() >= self.end:
+                return None
+            due = self.start + self.issued * self.interval
+            self.issued += 1
+        return due
+
+    def note_sent(self, due):
+        if time.perf_counter() - due > OPEN_LOOP_LATE_THRESHOLD:
+            with self._lock:
+                self.late += 1
+
+    @property
+    def dropped(self):
+        return self.scheduled - self.issued
+
+
+def make_schedule(args):
+    if args.rate is not None:
+        return OpenLoopSchedule(args.rate, args.duration)
+    if args.duration is not None:
+        return ClosedLoopSchedule(duration=args.duration)
+    return ClosedLoopSchedule(args.num_requests)
+
+
+def schedule_csv_fields(schedule):
+    """CSV ``extra_fields`` describing the load model; open-loop columns stay empty for closed-loop runs."""
+    duration = schedule.duration if schedule.duration is not None else ""
+    if not schedule.open_loop:
+        return {"Load Duration (s)": duration, "Target Rate (req/s)": "", "Scheduled Requests": "",
+                "Late Requests": "", "Dropped Requests": ""}
+    return {
+        "Load Duration (s)": duration,
+        "Target Rate (req/s)": schedule.rate,
+        "Scheduled Requests": schedule.scheduled,
+        "Late Requests": schedule.late,
+        "Dropped Requests": schedule.dropped,
+    }
+
+
+# =====================
+# Threaded engine (--engine thread)
+# =====================
+def send_request(url, request_num, verbose=False, due=None):
+    """GET *url* once; latency is measured from *due* (open-loop slot time) when given."""
+    hist = worker_latency_histogram()
     try:
+        t0 = time.perf_counter() if due is None else due
         response = requests.get(url, timeout=5)
+        latency = time.perf_counter() - t0
         if verbose:
             logger.debug(f'{url} "GET / HTTP/1.1" {response.status_code} {len(response.content)}')
+        if 200 <= response.status_code < 300:
+            hist.record(latency)
         with results_lock:
             if 200 <= response.status_code < 300:
                 results_counter['success'] += 1
@@ -91,32 +437,1126 @@ def send_request(url, request_num, verbose=False):
         with results_lock:
             results_counter['total'] += 1
 
-def cleanup_existing_container(container_name, docker_path):
-    logger.info(f"Cleaning up any existing container named '{container_name}'...")
-    subprocess.run([docker_path, "stop", container_name], capture_output=True, text=True, check=False)
-    subprocess.run([docker_path, "rm", "-f", container_name], capture_output=True, text=True, check=False)
-    # Wait and check if container is really gone
-    for _ in range(5):
-        result = subprocess.run([docker_path, "ps", "-a", "--filter", f"name={container_name}", "--format", "{{{{.Names}}}}"], capture_output=True, text=True)
-        if container_name not in result.stdout:
+
+def _thread_load_worker(url, schedule, verbose=False):
+    while True:
+        due = schedule.claim()
+        if due is None:
+            return
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        schedule.note_sent(due)
+        send_request(url, schedule.issued, verbose, due=due)
+
+
+def run_thread_load(url, schedule, max_workers=None, verbose=False):
+    """Drive *schedule* with a ThreadPoolExecutor-sized pool of blocking ``requests`` workers."""
+    workers = max_workers or min(32, (os.cpu_count() or 1) + 4)  # ThreadPoolExecutor's own default
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for _ in range(workers):
+            executor.submit(_thread_load_worker, url, schedule, verbose)
+
+# =====================
+# Async keep-alive engine (--engine async)
+# =====================
+HTTP_REQUEST_TIMEOUT = 5  # seconds; same per-request budget as the threaded engine's requests.get
+
+
+def build_get_request(url):
+    """Return (host, port, raw GET bytes) for a keep-alive HTTP/1.1 request to *url*."""
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path = f"{path}?{parts.query}"
+    request = (
+        f"GET {path} HTTP/1.1\r\n"
+        f"Host: {parts.netloc}\r\n"
+        "Connection: keep-alive\r\n"
+        "\r\n"
+    ).encode("ascii")
+    return parts.hostname or "localhost", parts.port or 80, request
+
+
+async def read_http_response(reader, marks=None):
+    """Read one HTTP/1.1 response from *reader*; return (status_code, body_length, keep_alive).
+
+    Handles Content-Length, chunked and read-until-close framing; the body is discarded. When *marks*
+    is a list, the ``time.perf_counter()`` at which the status line arrived is appended to it, so it
+    stays empty when the connection fails before any response byte.
+    """
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed by server")
+    if marks is not None:
+        marks.append(time.perf_counter())
+    status = int(status_line.split(None, 2)[1])
+    keep_alive = not status_line.startswith(b"HTTP/1.0")
+    content_length = None
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.partition(b":")
+        name = name.strip().lower()
+        if name == b"content-length":
+            content_length = int(value.strip())
+        elif name == b"transfer-encoding":
+            chunked = b"chunked" in value.lower()
+        elif name == b"connection":
+            token = value.strip().lower()
+            if token == b"close":
+                keep_alive = False
+            elif token == b"keep-alive":
+                keep_alive = True
+    if status in (204, 304) or 100 <= status < 200:
+        return status, 0, keep_alive
+    if chunked:
+        body_length = 0
+        while True:
+            size = int((await reader.readline()).split(b";", 1)[0].strip(), 16)
+            if size == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return status, body_length, keep_alive
+            await reader.readexactly(size + 2)
+            body_length += size
+    if content_length is not None:
+        await reader.readexactly(content_length)
+        return status, content_length, keep_alive
+    body = await reader.read()
+    return status, len(body), False
+
+
+async def _async_connection_worker(host, port, request, schedule, verbose=False):
+    """One persistent connection: keep sending GETs until *schedule* runs out of slots."""
+    hist = new_latency_histogram()
+    phases = new_phase_histograms()
+    reader = writer = None
+    while True:
+        due = schedule.claim()
+        if due is None:
             break
-        time.sleep(1)
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        schedule.note_sent(due)
+        try:
+            if writer is not None and reader.at_eof():
+                # The server closed the idle keep-alive connection (e.g. its idle timeout): reconnect
+                writer.close()
+                writer = None
+            # A reused connection can still be closed under us; retry such a request once on a fresh
+            # connection if it fails before any response byte, instead of counting a failure
+            retry = writer is not None
+            while True:
+                if writer is None:
+                    connect_start = time.perf_counter()
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(host, port), HTTP_REQUEST_TIMEOUT
+                    )
+                    phases["connect"].record(time.perf_counter() - connect_start)
+                marks = []
+                sent = time.perf_counter()
+                try:
+                    writer.write(request)
+                    status, body_length, keep_alive = await asyncio.wait_for(
+                        read_http_response(reader, marks), HTTP_REQUEST_TIMEOUT
+                    )
+                except ConnectionError:
+                    if not retry or marks:
+                        raise
+                    retry = False
+                    writer.close()
+                    writer = None
+                    continue
+                break
+            done = time.perf_counter()
+            latency = done - due
+            if verbose:
+                logger.debug(f'{host}:{port} "GET / HTTP/1.1" {status} {body_length}')
+            if 200 <= status < 300:
+                hist.record(latency)
+                phases["ttfb"].record(marks[0] - sent)
+                phases["transfer"].record(done - marks[0])
+                results_counter['success'] += 1
+            else:
+                results_counter['failure'] += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, EOFError, ValueError, IndexError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            results_counter['failure'] += 1
+            if writer is not None:
+                writer.close()
+                writer = None
+        finally:
+            results_counter['total'] += 1
+    if writer is not None:
+        writer.close()
+
+
+async def run_async_load(url, schedule, connections, verbose=False):
+    """Drive *schedule* over a pool of *connections* persistent keep-alive connections.
+
+    Runs on a single event loop thread, so ``results_counter`` is updated without ``results_lock``.
+    """
+    host, port, request = build_get_request(url)
+    workers = connections if schedule.scheduled is None else max(1, min(connections, schedule.scheduled))
+    await asyncio.gather(*(
+        _async_connection_worker(host, port, request, schedule, verbose) for _ in range(workers)
+    ))
+
+
+# =====================
+# Raw socket engine (--engine raw)
+# =====================
+RAW_RECV_BUFFER = 65536  # bytes preallocated per connection; a response head must fit in it
+RAW_TIMEOUT_SCAN_INTERVAL = 0.1  # seconds between sweeps for requests past HTTP_REQUEST_TIMEOUT
+
+
+class _RawConnection:
+    """One keep-alive socket of the raw engine and the parse state of its response in flight.
+
+    Bytes are received with ``recv_into`` into a buffer allocated once per connection; ``start:end``
+    is the unparsed window. Bodies are skipped by advancing ``start``, never copied.
+    """
+
+    __slots__ = ("sock", "buf", "view", "start", "end", "out", "connecting", "due", "sent", "first_byte",
+                 "connect_start", "deadline", "reused", "state", "remaining", "status", "keep_alive", "body_length")
+
+    def __init__(self):
+        self.sock = None
+        self.buf = bytearray(RAW_RECV_BUFFER)
+        self.view = memoryview(self.buf)
+        self.start = self.end = 0
+        self.out = b""
+        self.connecting = False
+        self.due = self.sent = self.first_byte = self.connect_start = self.deadline = None
+        self.reused = False
+        self.reset_response()
+
+    def reset_response(self):
+        self.state = "head"
+        self.remaining = 0
+        self.status = 0
+        self.keep_alive = True
+        self.body_length = 0
+        self.first_byte = None
+
+    def close(self, selector):
+        if self.sock is not None:
+            selector.unregister(self.sock)
+            self.sock.close()
+            self.sock = None
+        self.start = self.end = 0
+        self.connecting = False
+
+    def recv(self):
+        """Receive into the free tail of the buffer; return the byte count (0 on EOF)."""
+        if self.start == self.end:
+            self.start = self.end = 0
+        elif self.end == len(self.buf):
+            if self.start == 0:
+                raise ValueError(f"response head exceeds {len(self.buf)} bytes")
+            pending = self.end - self.start
+            self.buf[:pending] = self.view[self.start:self.end]
+            self.start, self.end = 0, pending
+        n = self.sock.recv_into(self.view[self.end:])
+        self.end += n
+        return n
+
+    def _parse_head(self, head):
+        lines = head.split(b"\r\n")
+        status_line = lines[0]
+        self.status = int(status_line.split(None, 2)[1])
+        self.keep_alive = not status_line.startswith(b"HTTP/1.0")
+        content_length = None
+        chunked = False
+        for line in lines[1:]:
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            if name == b"content-length":
+                content_length = int(value.strip())
+            elif name == b"transfer-encoding":
+                chunked = b"chunked" in value.lower()
+            elif name == b"connection":
+                token = value.strip().lower()
+                if token == b"close":
+                    self.keep_alive = False
+                elif token == b"keep-alive":
+                    self.keep_alive = True
+        if self.status in (204, 304) or 100 <= self.status < 200:
+            self.state = "done"
+        elif chunked:
+            self.state = "chunk-size"
+        elif content_length is not None:
+            self.remaining = self.body_length = content_length
+            self.state = "length" if content_length else "done"
+        else:
+            self.state = "close"
+            self.keep_alive = False
+
+    def parse(self):
+        """Advance over the buffered bytes; return True once the response is complete.
+
+        Same framing rules as ``read_http_response``: Content-Length, chunked, or read-until-close
+        (completed by ``finish_on_eof``).
+        """
+        buf = self.buf
+        while True:
+            state = self.state
+            if state == "head":
+                idx = buf.find(b"\r\n\r\n", self.start, self.end)
+                if idx < 0:
+                    return False
+                self._parse_head(bytes(self.view[self.start:idx]))
+                self.start = idx + 4
+            elif state == "length" or state == "chunk-data":
+                take = min(self.remaining, self.end - self.start)
+                self.start += take
+                self.remaining -= take
+                if self.remaining:
+                    return False
+                self.state = "done" if state == "length" else "chunk-size"
+            elif state == "chunk-size":
+                idx = buf.find(b"\r\n", self.start, self.end)
+                if idx < 0:
+                    return False
+                size = int(bytes(self.view[self.start:idx]).split(b";", 1)[0].strip(), 16)
+                self.start = idx + 2
+                if size:
+                    self.body_length += size
+                    self.remaining = size + 2
+                    self.state = "chunk-data"
+                else:
+                    self.state = "trailer"
+            elif state == "trailer":
+                idx = buf.find(b"\r\n", self.start, self.end)
+                if idx < 0:
+                    return False
+                last = idx == self.start
+                self.start = idx + 2
+                if last:
+                    self.state = "done"
+            elif state == "close":
+                self.body_length += self.end - self.start
+                self.start = self.end
+                return False
+            if self.state == "done":
+                return True
+
+    def finish_on_eof(self):
+        """Return True when EOF legitimately ends the response (read-until-close framing)."""
+        if self.state == "close":
+            self.state = "done"
+            return True
+        return False
+
+
+def run_raw_load(url, schedule, connections, verbose=False):
+    """Drive *schedule* over *connections* keep-alive sockets from a single ``selectors`` loop.
+
+    The leanest engine: no asyncio tasks, no ``requests``, no per-response allocations beyond the
+    header block. Sockets are non-blocking with TCP_NODELAY; idle connections wait on a heap keyed by
+    their next slot's due time. Runs on one thread, so ``results_counter`` is updated without
+    ``results_lock``.
+    """
+    host, port, request = build_get_request(url)
+    family, socktype, proto, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+    workers = connections if schedule.scheduled is None else max(1, min(connections, schedule.scheduled))
+    hist = new_latency_histogram()
+    phases = new_phase_histograms()
+    selector = selectors.DefaultSelector()
+    waiting = []  # heap of (due, seq, conn): connections idle until their next slot
+    in_flight = set()
+    seq = 0
+
+    def claim_next(conn):
+        nonlocal seq
+        due = schedule.claim()
+        if due is None:
+            conn.close(selector)
+            return
+        seq += 1
+        heapq.heappush(waiting, (due, seq, conn))
+
+    def complete(conn, ok):
+        done = time.perf_counter()
+        in_flight.discard(conn)
+        results_counter['total'] += 1
+        if ok and 200 <= conn.status < 300:
+            hist.record(done - conn.due)
+            phases["ttfb"].record(conn.first_byte - conn.sent)
+            phases["transfer"].record(done - conn.first_byte)
+            results_counter['success'] += 1
+        else:
+            results_counter['failure'] += 1
+        if verbose and ok:
+            logger.debug(f'{host}:{port} "GET / HTTP/1.1" {conn.status} {conn.body_length}')
+        if not ok or not conn.keep_alive:
+            conn.close(selector)
+        claim_next(conn)
+
+    def send(conn):
+        if conn.sent is None:
+            conn.sent = time.perf_counter()
+        sent = conn.sock.send(conn.out)
+        conn.out = conn.out[sent:]
+        selector.modify(conn.sock, selectors.EVENT_WRITE if conn.out else selectors.EVENT_READ, conn)
+
+    def begin(conn):
+        schedule.note_sent(conn.due)
+        conn.reused = conn.sock is not None
+        issue(conn)
+
+    def issue(conn):
+        in_flight.add(conn)
+        conn.reset_response()
+        conn.deadline = time.perf_counter() + HTTP_REQUEST_TIMEOUT
+        conn.out = request
+        conn.sent = None
+        if conn.sock is not None:
+            send(conn)
+            return
+        sock = socket.socket(family, socktype, proto)
+        conn.sock = sock
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        selector.register(sock, selectors.EVENT_WRITE, conn)
+        conn.connecting = True
+        conn.connect_start = time.perf_counter()
+        err = sock.connect_ex(address)
+        if err not in (0, errno.EINPROGRESS):
+            raise OSError(err, os.strerror(err))
+
+    def fail(conn, exc):
+        # A reused keep-alive socket the server closed under us fails before any response byte:
+        # retry that request once on a fresh connection instead of counting a failure
+        if conn.reused and conn.first_byte is None and isinstance(exc, ConnectionError):
+            conn.reused = False
+            conn.close(selector)
+            try:
+                issue(conn)
+                return
+            except (OSError, ValueError):
+                pass
+        complete(conn, False)
+
+    def on_event(conn, mask):
+        if conn not in in_flight:
+            # Idle keep-alive socket became readable: the server closed it (or sent junk); reconnect later.
+            try:
+                if conn.recv():
+                    conn.start = conn.end = 0
+                    return
+            except BlockingIOError:
+                return
+            except OSError:
+                pass
+            conn.close(selector)
+            return
+        if conn.connecting:
+            err = conn.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if err:
+                raise OSError(err, os.strerror(err))
+            conn.connecting = False
+            phases["connect"].record(time.perf_counter() - conn.connect_start)
+            send(conn)
+        elif conn.out:
+            send(conn)
+        elif mask & selectors.EVENT_READ:
+            try:
+                received = conn.recv()
+            except BlockingIOError:
+                return
+            if not received:
+                if conn.finish_on_eof():
+                    complete(conn, True)
+                    return
+                raise ConnectionError("connection closed by server")
+            if conn.first_byte is None:
+                conn.first_byte = time.perf_counter()
+            if conn.parse():
+                complete(conn, True)
+
+    for _ in range(workers):
+        claim_next(_RawConnection())
+    next_scan = time.perf_counter() + RAW_TIMEOUT_SCAN_INTERVAL
+    try:
+        while waiting or in_flight:
+            now = time.perf_counter()
+            while waiting and waiting[0][0] <= now:
+                due, _, conn = heapq.heappop(waiting)
+                conn.due = due
+                try:
+                    begin(conn)
+                except (OSError, ValueError) as exc:
+                    fail(conn, exc)
+            timeout = max(0.0, waiting[0][0] - now) if waiting else RAW_TIMEOUT_SCAN_INTERVAL
+            if in_flight:
+                timeout = min(timeout, RAW_TIMEOUT_SCAN_INTERVAL)
+            for key, mask in selector.select(timeout):
+                conn = key.data
+                try:
+                    on_event(conn, mask)
+                except (OSError, ValueError, IndexError) as exc:
+                    if conn in in_flight:
+                        fail(conn, exc)
+                    else:
+                        conn.close(selector)
+            now = time.perf_counter()
+            if now >= next_scan:
+                next_scan = now + RAW_TIMEOUT_SCAN_INTERVAL
+                for conn in [c for c in in_flight if c.deadline <= now]:
+                    complete(conn, False)
+    finally:
+        for key in list(selector.get_map().values()):
+            key.fileobj.close()
+        selector.close()
+
+
+# =====================
+# Multi-process sharding (--processes N)
+# =====================
+# Per-shard completed-request counts, published by the children for the parent's heartbeat.
+shard_progress = None
+
+
+def completed_requests():
+    with results_lock:
+        done = results_counter["total"]
+    if shard_progress is not None:
+        done += sum(shard_progress)
+    return done
+
+
+def _split_evenly(total, parts, index):
+    return total // parts + (1 if index < total % parts else 0)
+
+
+def _load_shard_main(index, cpu, url, engine, workers, num_requests, rate, duration, phase, verbose,
+                     ready, go, progress, results):
+    """Child process entry: pin to *cpu*, wait for the common start, run one engine, ship the results."""
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+    ready.wait()
+    go.wait()
+    if rate is not None:
+        schedule = OpenLoopSchedule(rate, duration, phase)
+    elif duration is not None:
+        schedule = ClosedLoopSchedule(duration=duration)
+    else:
+        schedule = ClosedLoopSchedule(num_requests)
+    stop = threading.Event()
+
+    def _report_progress():
+        while not stop.wait(0.5):
+            progress[index] = results_counter["total"]
+
+    threading.Thread(target=_report_progress, daemon=True).start()
+    timeline = LoadTimeline().start()
+    if engine == "async":
+        asyncio.run(run_async_load(url, schedule, workers, verbose))
+    elif engine == "raw":
+        run_raw_load(url, schedule, workers, verbose)
     else:
+        run_thread_load(url, schedule, workers, verbose)
+    stop.set()
+    results.put({
+        "timeline": timeline.stop(),
+        "counter": dict(results_counter),
+        "histogram": merged_latency_histogram().state(),
+        "phases": {phase: hist.state() for phase, hist in merged_phase_histograms().items()},
+        "scheduled": schedule.scheduled,
+        "issued": schedule.issued,
+        "late": schedule.late,
+    })
+
+
+def start_load_shards(url, args):
+    """Spawn ``args.processes`` load generators, one per CPU of our affinity set, and wait until all are ready.
+
+    The request budget, connections/workers and open-loop rate are split across shards; open-loop
+    shards are phase-shifted so the combined timeline stays evenly spaced. Load begins only when
+    ``run_load_shards`` releases them, so process start-up stays outside the measured window.
+    """
+    nproc = args.processes
+    cpus = sorted(os.sched_getaffinity(0))
+    if nproc > len(cpus):
+        logger.warning("--processes %d exceeds the %d CPUs available; shards will share cores.", nproc, len(cpus))
+    ctx = multiprocessing.get_context("spawn")
+    shards = {
+        "ready": ctx.Barrier(nproc + 1),
+        "go": ctx.Barrier(nproc + 1),
+        "progress": ctx.Array("q", nproc, lock=False),
+        "results": ctx.Queue(),
+        "procs": [],
+    }
+    pool_size = args.connections if args.engine in ("async", "raw") else args.max_workers
+    for i in range(nproc):
+        workers = max(1, _split_evenly(pool_size, nproc, i)) if pool_size else None
+        rate = args.rate / nproc if args.rate is not None else None
+        phase = i / args.rate if args.rate is not None else 0.0
+        shards["procs"].append(ctx.Process(
+            target=_load_shard_main,
+            args=(i, cpus[i % len(cpus)], url, args.engine, workers, _split_evenly(args.num_requests, nproc, i),
+                  rate, args.duration, phase, args.verbose,
+                  shards["ready"], shards["go"], shards["progress"], shards["results"]),
+            daemon=True,
+        ))
+    for p in shards["procs"]:
+        p.start()
+    try:
+        shards["ready"].wait(timeout=60)
+    except threading.BrokenBarrierError:
+        for p in shards["procs"]:
+            p.terminate()
+        raise RuntimeError("Load generator processes failed to start")
+    return shards
+
+
+def run_load_shards(shards, schedule):
+    """Release the shards, wait for them, and merge their counters and histograms into this process.
+
+    Totals land in ``results_counter``/``latency_histograms`` and the slot accounting in *schedule*;
+    returns the shards' merged ``LoadTimeline`` bins.
+    """
+    global shard_progress
+    procs = shards["procs"]
+    shard_progress = shards["progress"]
+    shards["go"].wait()
+    shard_results = []
+    while len(shard_results) < len(procs):
+        try:
+            shard_results.append(shards["results"].get(timeout=1))
+        except queue.Empty:
+            if not any(p.is_alive() for p in procs):
+                break
+    for p in procs:
+        p.join(timeout=5)
+    shard_progress = None
+    if len(shard_results) < len(procs):
+        logger.warning("Only %d of %d load generator processes reported results.", len(shard_results), len(procs))
+    schedule.issued = schedule.late = 0
+    if schedule.open_loop:
+        schedule.scheduled = 0
+    for r in shard_results:
+        results_counter.update(r["counter"])
+        latency_histograms.append(LatencyHistogram.from_state(r["histogram"]))
+        for phase, state in r["phases"].items():
+            phase_histograms[phase].append(LatencyHistogram.from_state(state))
+        schedule.issued += r["issued"]
+        schedule.late += r["late"]
+        if schedule.open_loop:
+            schedule.scheduled += r["scheduled"]
+    return LoadTimeline.merge([r["timeline"] for r in shard_results])
+
+
+# =====================
+# Load generator self-accounting (psutil)
+# =====================
+CLIENT_SAMPLE_INTERVAL = 0.25  # seconds between psutil samples of the load generator's own processes
+CLIENT_BOUND_CPU = 90.0        # % of one core at which a generator process or thread counts as saturated
+
+
+def collect_client_resources(pids, stop_event, interval=CLIENT_SAMPLE_INTERVAL):
+    """Sample the load generator's own processes (*pids*) with psutil until *stop_event* is set.
+
+    CPU time is accumulated per process and per thread between samples (100% = one core); the
+    busiest process or thread shows whether one core of the harness was saturated. Returns
+    ``{'cpu_avg','cpu_peak','rss_peak','busiest_process','busiest_thread'}`` (RSS in MB), or None
+    when the run was too short for two samples.
+    """
+    procs = {}
+    for pid in pids:
+        try:
+            procs[pid] = psutil.Process(pid)
+        except psutil.NoSuchProcess:
+            pass
+    last_proc, last_thread = {}, {}
+    proc_cpu, thread_cpu = Counter(), Counter()
+    cpu_peak = rss_peak = elapsed = 0.0
+    last_t = None
+    stopping = False
+    while True:
+        now = time.perf_counter()
+        interval_cpu = 0.0
+        rss = 0
+        for pid, proc in list(procs.items()):
+            try:
+                with proc.oneshot():
+                    times = proc.cpu_times()
+                    threads = proc.threads()
+                    rss += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                del procs[pid]
+                continue
+            used = times.user + times.system
+            if pid in last_proc:
+                proc_cpu[pid] += used - last_proc[pid]
+                interval_cpu += used - last_proc[pid]
+            last_proc[pid] = used
+            for thread in threads:
+                key = (pid, thread.id)
+                used = thread.user_time + thread.system_time
+                if key in last_thread:
+                    thread_cpu[key] += used - last_thread[key]
+                last_thread[key] = used
+        if last_t is not None and now > last_t:
+            elapsed += now - last_t
+            cpu_peak = max(cpu_peak, interval_cpu / (now - last_t) * 100.0)
+        last_t = now
+        rss_peak = max(rss_peak, rss)
+        if stopping:
+            break
+        stopping = stop_event.wait(interval)
+    if elapsed <= 0:
+        return None
+    return {
+        'cpu_avg': sum(proc_cpu.values()) / elapsed * 100.0,
+        'cpu_peak': cpu_peak,
+        'rss_peak': rss_peak / (1024 * 1024),
+        'busiest_process': max(proc_cpu.values(), default=0.0) / elapsed * 100.0,
+        'busiest_thread': max(thread_cpu.values(), default=0.0) / elapsed * 100.0,
+    }
+
+
+def start_client_collector(pids):
+    """Start the load generator sampler thread; returns (thread, stop_event, client_results)."""
+    stop_event = threading.Event()
+    client_results = {}
+
+    def collect():
+        client_results['metrics'] = collect_client_resources(pids, stop_event)
+
+    client_thread = threading.Thread(target=collect, daemon=True)
+    client_thread.start()
+    return client_thread, stop_event, client_results
+
+
+def client_bound(client, server_cpu_avg, server_cores):
+    """True when a generator process or thread sat at ``CLIENT_BOUND_CPU`` of a core while the server
+    averaged below ``CLIENT_BOUND_CPU`` of its *server_cores*: the harness, not the server, capped throughput."""
+    busiest = max(client['busiest_process'], client['busiest_thread'])
+    return busiest >= CLIENT_BOUND_CPU and server_cpu_avg < CLIENT_BOUND_CPU * max(1, server_cores or 1)
+
+
+def client_csv_fields(client, server_cpu_avg, server_cores):
+    """CSV ``extra_fields`` for the load generator's own usage; empty when it was not sampled."""
+    if client is None:
+        return {"Client CPU Avg (%)": "", "Client CPU Peak (%)": "", "Client RSS Peak (MB)": "",
+                "Client Busiest Process CPU (%)": "", "Client Busiest Thread CPU (%)": "", "Client Bound": ""}
+    return {
+        "Client CPU Avg (%)": client['cpu_avg'],
+        "Client CPU Peak (%)": client['cpu_peak'],
+        "Client RSS Peak (MB)": client['rss_peak'],
+        "Client Busiest Process CPU (%)": client['busiest_process'],
+        "Client Busiest Thread CPU (%)": client['busiest_thread'],
+        "Client Bound": "yes" if client_bound(client, server_cpu_avg, server_cores) else "no",
+    }
+
+
+# =====================
+# Per-second timeline sidecar (<csv>_timeline/<run_id>.npz)
+# =====================
+TIMELINE_INTERVAL = 1.0  # seconds per timeline bin
+TIMELINE_PERCENTILES = (50, 90, 99, 99.9)
+
+
+def new_run_id():
+    """Identifier linking a CSV row to its timeline file: start time plus a short random suffix."""
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def timeline_path(output_csv, run_id):
+    """``results_docker/<name>.csv`` -> ``results_docker/<name>_timeline/<run_id>.npz``."""
+    return os.path.join(f"{os.path.splitext(output_csv)[0]}_timeline", f"{run_id}.npz")
+
+
+def _interpolate(times, values, t):
+    """Linear interpolation of a sampled series at *t*; NaN outside the sampled range."""
+    if not times or t < times[0] or t > times[-1]:
+        return math.nan
+    i = bisect.bisect_left(times, t)
+    if times[i] == t:
+        return values[i]
+    return values[i - 1] + (values[i] - values[i - 1]) * (t - times[i - 1]) / (times[i] - times[i - 1])
+
+
+def resource_timeline(samples, windows):
+    """Container CPU% and memory (MB) per ``(t_start, t_end)`` window from ``(time, cpu_usage_usec, mem_bytes)`` samples.
+
+    CPU interpolates the cumulative usage counter at both window edges, so ~1 s docker API samples work
+    as well as 50 ms cgroup ones; memory is the peak sample inside the window, else the interpolated value.
+    """
+    times = [s[0] for s in samples]
+    usage = [s[1] for s in samples]
+    mem = [s[2] / (1024 * 1024) for s in samples]
+    cpu_col, mem_col = [], []
+    for t0, t1 in windows:
+        used = _interpolate(times, usage, t1) - _interpolate(times, usage, t0)
+        cpu_col.append(used / 1e6 / (t1 - t0) * 100.0 if t1 > t0 else math.nan)
+        inside = mem[bisect.bisect_left(times, t0):bisect.bisect_right(times, t1)]
+        mem_col.append(max(inside) if inside else _interpolate(times, mem, (t0 + t1) / 2))
+    return cpu_col, mem_col
+
+
+def timeline_columns(rows, load_start, samples, series):
+    """Columns of the timeline file from ``(t_start, t_end, completed, errors, percentiles_ms)`` rows.
+
+    Times are offsets from *load_start*; CPU/memory come from the container sampler's *samples* and
+    power (W) from the Scaphandre *series*; missing data is NaN.
+    """
+    windows = [(row[0], row[1]) for row in rows]
+    cpu, mem = resource_timeline(samples or [], windows)
+    columns = {
+        "t": [t0 - load_start for t0, _ in windows],
+        "duration": [t1 - t0 for t0, t1 in windows],
+        "completed": [row[2] for row in rows],
+        "errors": [row[3] for row in rows],
+    }
+    for k, pct in enumerate(TIMELINE_PERCENTILES):
+        columns["p" + f"{pct:g}".replace(".", "") + "_ms"] = [row[4][k] for row in rows]
+    columns["cpu_pct"] = cpu
+    columns["mem_mb"] = mem
+    columns["power_w"] = [integrate_power(series, t0, t1) / (t1 - t0) if series and t1 > t0 else math.nan
+                          for t0, t1 in windows]
+    return columns
+
+
+def save_timeline(path, run_id, columns):
+    """Write one run's timeline as compressed numpy columns (read back with ``np.load``); returns *path*."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(path, run_id=np.array(run_id),
+                        **{name: np.asarray(values, dtype=np.float64) for name, values in columns.items()})
+    return path
+
+
+class LoadTimeline:
+    """Per-second request/error counts and latency buckets, cut from the cumulative load state.
+
+    A background thread wakes every ``TIMELINE_INTERVAL``, diffs ``results_counter`` against the
+    previous cut and counts the bucket indices appended to ``latency_bucket_log`` since then, so a cut
+    costs one pass over that second's requests however many worker histograms there are. Bins are
+    ``(t_start, t_end, total, failure, {bucket_index: count})`` in epoch seconds.
+    """
+
+    def __init__(self, interval=TIMELINE_INTERVAL):
+        self.interval = interval
+        self.bins = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._last = None
+
+    def _snapshot(self):
+        with results_lock:
+            totals = (results_counter["total"], results_counter["failure"])
+        # Workers only append, so everything before the length read now is this cut's to take
+        drained = len(latency_bucket_log)
+        buckets = Counter(latency_bucket_log[:drained])
+        del latency_bucket_log[:drained]
+        return time.time(), totals, buckets
+
+    def _cut(self):
+        now, totals, buckets = self._snapshot()
+        t_start, last_totals = self._last
+        self.bins.append((t_start, now, totals[0] - last_totals[0], totals[1] - last_totals[1], dict(buckets)))
+        self._last = (now, totals)
+
+    def start(self):
+        now, totals, _ = self._snapshot()
+        self._last = (now, totals)
+
+        def run():
+            while not self._stop.wait(self.interval):
+                self._cut()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._cut()
+        return self.bins
+
+    @staticmethod
+    def merge(shard_bins):
+        """Combine the bins of several shards second by second (they share the ``go`` barrier start)."""
+        merged = []
+        for group in itertools.zip_longest(*shard_bins):
+            group = [b for b in group if b is not None]
+            buckets = Counter()
+            for b in group:
+                buckets.update(b[4])
+            merged.append((min(b[0] for b in group), max(b[1] for b in group),
+                           sum(b[2] for b in group), sum(b[3] for b in group), dict(buckets)))
+        return merged
+
+    @staticmethod
+    def rows(bins):
+        """``timeline_columns`` rows: bucket counts become per-bin latency percentiles (NaN when empty)."""
+        rows = []
+        for t_start, t_end, total, failure, buckets in bins:
+            hist = LatencyHistogram.from_counts(buckets)
+            pcts = tuple(hist.percentile_ms(pct) if hist.count else math.nan for pct in TIMELINE_PERCENTILES)
+            rows.append((t_start, t_end, total, failure, pcts))
+        return rows
+
+
+# =====================
+# Core-scaling sweep (--core-sweep)
+# =====================
+def parse_core_sweep(value):
+    """argparse type for ``--core-sweep 1,2,4,8``: positive CPU allotments, in the order given."""
+    try:
+        cores = [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid core sweep {value!r} (expected e.g. 1,2,4,8)")
+    if not cores or min(cores) < 1:
+        raise argparse.ArgumentTypeError("--core-sweep needs positive CPU counts")
+    return cores
+
+
+def core_pool(args):
+    """CPUs a cpuset-limited allotment is carved from: --server-cpus, else the host minus --client-cpus."""
+    if args.server_cpus:
+        return list(args.server_cpus)
+    client = set(args.client_cpus or ())
+    return [cpu for cpu in range(os.cpu_count() or 1) if cpu not in client]
+
+
+def check_core_sweep(parser, args):
+    if args.core_limit not in ("quota", "cpuset"):
+        parser.error(f"--core-limit must be quota or cpuset, got {args.core_limit!r}")
+    if args.beam_schedulers and not args.core_sweep:
+        parser.error("--beam-schedulers requires --core-sweep")
+    if args.core_sweep:
+        available = len(core_pool(args)) if args.core_limit == "cpuset" else server_core_count(args, os.cpu_count() or 1)
+        if max(args.core_sweep) > available:
+            parser.error(f"--core-sweep goes up to {max(args.core_sweep)} CPUs but only {available} are available to the server")
+
+
+def server_limits(args, cores=None):
+    """CPU limits for ``start_server_container``: --server-cpus, narrowed to *cores* during a core sweep.
+
+    In cpuset mode the container gets the first *cores* CPUs of ``core_pool``; in quota mode it keeps
+    its cpuset and gets ``--cpus cores``. With --beam-schedulers, ``ERL_FLAGS=+S cores:cores`` is passed
+    so BEAM runs one scheduler per allotted core (non-BEAM servers ignore it).
+    """
+    cpuset = args.server_cpus
+    nano_cpus = None
+    env = None
+    if cores is not None:
+        if args.core_limit == "cpuset":
+            cpuset = core_pool(args)[:cores]
+        else:
+            nano_cpus = cores * 10**9
+        if args.beam_schedulers:
+            env = {"ERL_FLAGS": f"+S {cores}:{cores}"}
+    return {"cpuset_cpus": format_cpu_list(cpuset) if cpuset else None, "nano_cpus": nano_cpus, "env": env}
+
+
+def core_csv_fields(args, cores, num_cores):
+    """CSV ``extra_fields`` for the server's CPU allotment; Server Cores is the x-axis of a core sweep."""
+    return {
+        "Server Cores": cores if cores is not None else server_core_count(args, num_cores),
+        "Core Limit": args.core_limit if cores is not None else ("cpuset" if args.server_cpus else ""),
+        "BEAM Schedulers": cores if cores is not None and args.beam_schedulers else "",
+    }
+
+
+# =====================
+# CPU placement (--server-cpus / --client-cpus)
+# =====================
+def parse_cpu_list(value):
+    """argparse type for a cpuset list such as ``0-3,6``; returns the sorted CPU ids."""
+    cpus = set()
+    try:
+        for part in value.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            first, sep, last = part.partition("-")
+            first, last = int(first), int(last) if sep else int(first)
+            if first < 0 or last < first:
+                raise ValueError(part)
+            cpus.update(range(first, last + 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid CPU list {value!r} (expected e.g. 0-3,6)")
+    if not cpus:
+        raise argparse.ArgumentTypeError("CPU list must not be empty")
+    return sorted(cpus)
+
+
+def format_cpu_list(cpus):
+    """Compact ``0-3,6`` form of a CPU id list, as ``docker run --cpuset-cpus`` takes it."""
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(f"{first}-{last}" if last > first else str(first) for first, last in ranges)
+
+
+def check_cpu_layout(parser, args):
+    """Validate --server-cpus/--client-cpus against this host; warn when the two sets share cores."""
+    host_cpus = os.cpu_count() or 1
+    if args.server_cpus and args.server_cpus[-1] >= host_cpus:
+        parser.error(f"--server-cpus {format_cpu_list(args.server_cpus)} exceeds the {host_cpus} CPUs of this host")
+    if args.client_cpus and not set(args.client_cpus) <= os.sched_getaffinity(0):
+        parser.error(f"--client-cpus {format_cpu_list(args.client_cpus)} is outside the CPUs this process may use "
+                     f"({format_cpu_list(os.sched_getaffinity(0))})")
+    if args.server_cpus and args.client_cpus:
+        shared = set(args.server_cpus) & set(args.client_cpus)
+        if shared:
+            logger.warning("--server-cpus and --client-cpus share CPUs %s; server and load generator will compete.",
+                           format_cpu_list(shared))
+
+
+def pin_client(args):
+    """Pin this process (and every thread and child started afterwards, Scaphandre included) to --client-cpus."""
+    if args.client_cpus:
+        os.sched_setaffinity(0, args.client_cpus)
+        logger.info(f"Load generator pinned to CPUs {format_cpu_list(args.client_cpus)}")
+
+
+def server_core_count(args, num_cores):
+    """CPUs the server container may run on: the --server-cpus set, else the whole host."""
+    return len(args.server_cpus) if args.server_cpus else num_cores
+
+
+def cpu_layout_csv_fields(args, cores=None):
+    """CSV ``extra_fields`` recording the CPU placement; empty when that side was left to the scheduler."""
+    return {
+        "Server CPUs": server_limits(args, cores)["cpuset_cpus"] or "",
+        "Client CPUs": format_cpu_list(args.client_cpus) if args.client_cpus else "",
+    }
+
+
+# =====================
+# Readiness waits (instead of fixed sleeps)
+# =====================
+READINESS_POLL_INTERVAL = 0.1
+CONTAINER_START_TIMEOUT = 30     # docker run -> State.Status "running"
+PORT_RELEASE_TIMEOUT = 15        # container removed -> host port bindable again
+SCAPHANDRE_SAMPLE_TIMEOUT = 15   # Scaphandre started / load ended -> a report newer than that
+PROCESS_EXIT_TIMEOUT = 5
+DOCKER_STATS_FIRST_SAMPLE_TIMEOUT = 10
+
+
+def wait_until(predicate, timeout, what, interval=READINESS_POLL_INTERVAL):
+    """Poll predicate until it returns something truthy or timeout seconds pass; returns the last result."""
+    deadline = time.monotonic() + timeout
+    while True:
+        result = predicate()
+        if result or time.monotonic() >= deadline:
+            break
+        time.sleep(interval)
+    if not result:
+        logger.warning(f"Timed out after {timeout:g}s waiting for {what}")
+    return result
+
+
+def readiness_port(port_mapping, network="bridge"):
+    """Port the server is reachable on from the host: the published port, or the container port with --network host."""
+    parts = port_mapping.split(":")
+    return int(parts[-1] if network == "host" else parts[0])
+
+
+def port_accepting(host, port, timeout=0.5):
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def port_released(port):
+    """True once no listener holds port on the host (a new container could publish it)."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind(("0.0.0.0", port))
+            return True
+        except PermissionError:
+            # Privileged port without root: fall back to "nothing accepts connections"
+            return not port_accepting("127.0.0.1", port)
+        except OSError:
+            return False
+
+
+def container_state(container_name, docker_path, docker_api=None):
+    """Docker State.Status of the container ('running', 'exited', ...) or None when it does not exist."""
+    if docker_api is not None:
+        info = docker_api.inspect(container_name)
+        return info.get("State", {}).get("Status") if info else None
+    result = subprocess.run([docker_path, "inspect", "-f", "{{.State.Status}}", container_name],
+                            capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def container_exists(container_name, docker_path, docker_api=None):
+    if docker_api is not None:
+        return container_name in docker_api.ps(container_name)
+    result = subprocess.run([docker_path, "ps", "-a", "--filter", f"name={container_name}", "--format", "{{.Names}}"],
+                            capture_output=True, text=True)
+    return container_name in result.stdout.split()
+
+
+def latest_scaphandre_timestamp(output_json, tail_bytes=65536):
+    """Newest report timestamp in the tail of a Scaphandre JSON file, or None before the first report."""
+    try:
+        with open(output_json, "rb") as file:
+            file.seek(0, os.SEEK_END)
+            file.seek(max(0, file.tell() - tail_bytes))
+            tail = file.read().decode("utf-8", "ignore")
+    except OSError:
+        return None
+    stamps = re.findall(r'"timestamp"\s*:\s*([0-9]+(?:\.[0-9]+)?)', tail)
+    return max(float(s) for s in stamps) if stamps else None
+
+
+def wait_scaphandre_sample(output_json, after, scaphandre_process=None, timeout=SCAPHANDRE_SAMPLE_TIMEOUT):
+    """Block until Scaphandre has written a report stamped at or after `after` (or its process exited)."""
+    def ready():
+        if scaphandre_process is not None and scaphandre_process.poll() is not None:
+            return True
+        return (latest_scaphandre_timestamp(output_json) or 0.0) >= after
+    return wait_until(ready, timeout, f"a Scaphandre sample in {output_json}")
+
+def cleanup_existing_container(container_name, docker_path, docker_api=None, port=None):
+    logger.info(f"Cleaning up any existing container named '{container_name}'...")
+    if docker_api is not None:
+        docker_api.remove(container_name, force=True, missing_ok=True)
+    else:
+        subprocess.run([docker_path, "stop", container_name], capture_output=True, text=True, check=False)
+        subprocess.run([docker_path, "rm", "-f", container_name], capture_output=True, text=True, check=False)
+    if not wait_until(lambda: not container_exists(container_name, docker_path, docker_api), PROCESS_EXIT_TIMEOUT,
+                      f"container '{container_name}' to be removed"):
         logger.warning(f"Container '{container_name}' could not be removed after multiple attempts.")
-    time.sleep(3)  # Ensure port and resources released (important after long runs)
+    if port is not None:
+        # Ensure the port is released (docker-proxy can linger after long runs)
+        wait_until(lambda: port_released(port), PORT_RELEASE_TIMEOUT, f"port {port} to be released")
 
 def cleanup_existing_scaphandre():
     subprocess.run(["sudo", "pkill", "-9", "scaphandre"], capture_output=True, text=True, check=False)
-    time.sleep(2)  # Ensure OS releases resources
+    wait_until(lambda: subprocess.run(["pgrep", "-x", "scaphandre"], capture_output=True).returncode != 0,
+               PROCESS_EXIT_TIMEOUT, "old Scaphandre processes to exit")
 
 def start_scaphandre(output_json, scaphandre_path):
     os.makedirs("output", exist_ok=True)
     cmd = ["sudo", scaphandre_path, "json", "--containers", "-f", output_json]
+    launched = time.time()
     scaphandre_process = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
     )
-    time.sleep(2)
+    wait_scaphandre_sample(output_json, launched, scaphandre_process)
     if scaphandre_process.poll() is not None:
         out, err = scaphandre_process.communicate(timeout=1)
         err = (err or "").strip()
@@ -131,96 +1571,417 @@ def start_scaphandre(output_json, scaphandre_path):
 
 def stop_scaphandre(scaphandre_process):
     scaphandre_process.terminate()
-    scaphandre_process.wait(timeout=5)
-    time.sleep(2)  # Ensure OS releases resources
+    scaphandre_process.wait(timeout=PROCESS_EXIT_TIMEOUT)
 
 def check_container_health(url, retries=None, delay=None, startup_wait=None):
-    """Wait for container to respond with HTTP 200. BEAM/Elixir apps often need 15–60s to boot, especially after long runs."""
+    """Wait for container to respond with HTTP 200. BEAM/Elixir apps often need 15–60s to boot, especially after long runs.
+
+    Polls the port and then the URL from the start; MEASURE_STARTUP_WAIT + MEASURE_HEALTH_RETRIES *
+    MEASURE_HEALTH_DELAY is only the overall timeout, so a fast server is measured without idle waits.
+    """
     startup_wait = int(os.environ.get("MEASURE_STARTUP_WAIT", startup_wait or 15))
     retries = int(os.environ.get("MEASURE_HEALTH_RETRIES", retries or 25))
     delay = int(os.environ.get("MEASURE_HEALTH_DELAY", delay or 2))
     total_max = startup_wait + retries * delay
-    logger.info("Waiting up to %ds for container (initial %ds, then %d retries every %ds)...", total_max, startup_wait, retries, delay)
-    time.sleep(startup_wait)
-    for attempt in range(1, retries + 1):
+    logger.info("Waiting up to %ds for container to answer HTTP 200...", total_max)
+    parts = urlsplit(url)
+    host, port = parts.hostname or "localhost", parts.port or 80
+    attempts = 0
+
+    def ready():
+        nonlocal attempts
+        if not port_accepting(host, port):
+            return False
+        attempts += 1
         try:
-            if requests.get(url, timeout=10).status_code == 200:
-                logger.info("Container ready after %d attempt(s).", attempt)
-                return True
+            return requests.get(url, timeout=10).status_code == 200
         except requests.exceptions.RequestException:
-            if attempt < retries:
-                time.sleep(delay)
+            return False
+
+    if wait_until(ready, total_max, f"HTTP 200 from {url}", interval=0.25):
+        logger.info("Container ready after %d attempt(s).", attempts)
+        return True
     return False
 
-def start_server_container(server_image, port_mapping, container_name, docker_path, network="bridge"):
-    cleanup_existing_container(container_name, docker_path)
+def start_server_container(server_image, port_mapping, container_name, docker_path, network="bridge", docker_api=None,
+                           cpuset_cpus=None, nano_cpus=None, env=None):
+    cleanup_existing_container(container_name, docker_path, docker_api, port=readiness_port(port_mapping, network))
     # --cgroupns=host: needed for Scaphandre to detect container names on cgroups v2
-    cmd = [docker_path, "run", "-d", "--cgroupns=host", "--ulimit", "nofile=100000:100000", "--name", container_name]
-    if network == "host":
-        cmd.extend(["--network", "host"])
+    if docker_api is not None:
+        try:
+            docker_api.run(server_image, container_name, port_mapping, network, env=env,
+                           cpuset_cpus=cpuset_cpus, nano_cpus=nano_cpus)
+        except DockerAPIError as e:
+            logger.error("Failed to start container: %s", e)
+            raise RuntimeError("Container failed to start")
     else:
-        cmd.extend(["-p", port_mapping])
-    cmd.append(server_image)
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        logger.error("Failed to start container. Docker stderr: %s", result.stderr or "(none)")
-        logger.error("If --cgroupns=host is unsupported, try: docker run --rm --cgroupns=host hello-world")
-        raise RuntimeError("Container failed to start")
-    time.sleep(5)
-
-def stop_server_container(container_name, docker_path):
-    subprocess.run([docker_path, "stop", container_name], capture_output=True, text=True, check=True)
-    subprocess.run([docker_path, "rm", container_name], capture_output=True, text=True, check=True)
-    time.sleep(2)  # Ensure Docker/OS releases resources
-
-def collect_resources_docker_stats(container_name, stop_event, docker_path, interval=0.5):
-    import re
+        cmd = [docker_path, "run", "-d", "--cgroupns=host", "--ulimit", "nofile=100000:100000", "--name", container_name]
+        if network == "host":
+            cmd.extend(["--network", "host"])
+        else:
+            cmd.extend(["-p", port_mapping])
+        if cpuset_cpus:
+            cmd.extend(["--cpuset-cpus", cpuset_cpus])
+        if nano_cpus:
+            cmd.extend(["--cpus", f"{nano_cpus / 1e9:g}"])
+        for key, value in (env or {}).items():
+            cmd.extend(["-e", f"{key}={value}"])
+        cmd.append(server_image)
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            logger.error("Failed to start container. Docker stderr: %s", result.stderr or "(none)")
+            logger.error("If --cgroupns=host is unsupported, try: docker run --rm --cgroupns=host hello-world")
+            raise RuntimeError("Container failed to start")
+    wait_until(lambda: container_state(container_name, docker_path, docker_api) not in (None, "created", "restarting"),
+               CONTAINER_START_TIMEOUT, f"container '{container_name}' to start")
+    state = container_state(container_name, docker_path, docker_api)
+    if state != "running":
+        logger.warning("Container '%s' is %s after start.", container_name, state or "missing")
+
+def stop_server_container(container_name, docker_path, docker_api=None, port=None):
+    if docker_api is not None:
+        docker_api.stop(container_name)
+        docker_api.remove(container_name)
+    else:
+        subprocess.run([docker_path, "stop", container_name], capture_output=True, text=True, check=True)
+        subprocess.run([docker_path, "rm", container_name], capture_output=True, text=True, check=True)
+    if port is not None:
+        wait_until(lambda: port_released(port), PORT_RELEASE_TIMEOUT, f"port {port} to be released")
+
+def collect_resources_docker_stats(container_name, stop_event, docker_path, interval=0.5, first_sample=None):
+    """Fallback sampler: poll ``docker stats --no-stream``.
+
+    One call can take about a second, so every sample is weighted by the measured gap since the
+    previous one rather than the nominal *interval*. *first_sample* (an Event) is set once the
+    first sample is in.
+    """
     cpu_usage = []
     mem_usage = []
-    sample_count = 0
+    sample_dts = []
+    last_t = time.time()
     while not stop_event.is_set():
+        cpu_val = 0.0
+        mem_val = 0.0
         try:
             stats_format = "{{.CPUPerc}},{{.MemUsage}}"
             cmd = [docker_path, "stats", container_name, "--no-stream", "--format", stats_format]
             result = subprocess.run(cmd, capture_output=True, text=True, check=True)
             output = result.stdout.strip()
-            if not output:
-                cpu_usage.append(0.0)
-                mem_usage.append(0.0)
-                time.sleep(interval)
-                sample_count += 1
-                continue
-            cpu_str, mem_str = output.split(',')
-            cpu_val = float(cpu_str.strip().replace('%',''))
-            mem_usage_part = mem_str.strip().split('/')[0].strip()
-            mem_match = re.match(r"([\d.]+)([KMG]iB)", mem_usage_part)
-            mem_val = 0.0
-            if mem_match:
-                mem_num = float(mem_match.group(1))
-                mem_unit = mem_match.group(2)
-                if mem_unit == 'KiB':
-                    mem_val = mem_num / 1024
-                elif mem_unit == 'MiB':
-                    mem_val = mem_num
-                elif mem_unit == 'GiB':
-                    mem_val = mem_num * 1024
-            cpu_usage.append(cpu_val)
-            mem_usage.append(mem_val)
+            if output:
+                cpu_str, mem_str = output.split(',')
+                cpu_val = float(cpu_str.strip().replace('%',''))
+                mem_usage_part = mem_str.strip().split('/')[0].strip()
+                mem_match = re.match(r"([\d.]+)([KMG]iB)", mem_usage_part)
+                if mem_match:
+                    mem_num = float(mem_match.group(1))
+                    mem_unit = mem_match.group(2)
+                    if mem_unit == 'KiB':
+                        mem_val = mem_num / 1024
+                    elif mem_unit == 'MiB':
+                        mem_val = mem_num
+                    elif mem_unit == 'GiB':
+                        mem_val = mem_num * 1024
         except Exception:
-            cpu_usage.append(0.0)
-            mem_usage.append(0.0)
+            cpu_val = 0.0
+            mem_val = 0.0
+        now = time.time()
+        cpu_usage.append(cpu_val)
+        mem_usage.append(mem_val)
+        sample_dts.append(now - last_t)
+        last_t = now
+        if first_sample is not None:
+            first_sample.set()
         time.sleep(interval)
-        sample_count += 1
-    cpu_avg = sum(cpu_usage) / len(cpu_usage) if cpu_usage else 0.0
+    elapsed = sum(sample_dts)
+    cpu_total = sum(c * dt for c, dt in zip(cpu_usage, sample_dts))  # cumulative CPU (%*s)
+    mem_total = sum(m * dt for m, dt in zip(mem_usage, sample_dts))  # cumulative memory (MB*s)
+    cpu_avg = cpu_total / elapsed if elapsed > 0 else 0.0
     cpu_peak = max(cpu_usage) if cpu_usage else 0.0
-    cpu_total = sum(cpu_usage) * interval if cpu_usage else 0.0  # cumulative CPU (%*s)
-    mem_avg = sum(mem_usage) / len(mem_usage) if mem_usage else 0.0
+    mem_avg = mem_total / elapsed if elapsed > 0 else 0.0
     mem_peak = max(mem_usage) if mem_usage else 0.0
-    mem_total = sum(mem_usage) * interval if mem_usage else 0.0  # cumulative memory (MB*s)
     return {'avg': cpu_avg, 'peak': cpu_peak, 'total': cpu_total}, \
            {'avg': mem_avg, 'peak': mem_peak, 'total': mem_total}
 
 
+# =====================
+# cgroup v2 sampler (--resource-sampler cgroup)
+# =====================
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+def get_container_id(container_name, docker_path, docker_api=None):
+    """Full container ID (cgroup directories are named after it), or None if the container is unknown."""
+    if docker_api is not None:
+        info = docker_api.inspect(container_name)
+        return info["Id"] if info else None
+    result = subprocess.run([docker_path, "inspect", "--format", "{{.Id}}", container_name],
+                            capture_output=True, text=True)
+    container_id = result.stdout.strip()
+    return container_id if result.returncode == 0 and container_id else None
+
+
+def find_container_cgroup_dir(container_id, cgroup_root=CGROUP_ROOT):
+    """Locate the container's cgroup v2 directory under *cgroup_root* (systemd or cgroupfs driver layout)."""
+    if not container_id:
+        return None
+    for rel in (os.path.join("system.slice", f"docker-{container_id}.scope"), os.path.join("docker", container_id)):
+        path = os.path.join(cgroup_root, rel)
+        if os.path.isfile(os.path.join(path, "cpu.stat")):
+            return path
+    for pattern in (f"*/*{container_id}*", f"*/*/*{container_id}*"):
+        for path in sorted(glob.glob(os.path.join(cgroup_root, pattern))):
+            if os.path.isfile(os.path.join(path, "cpu.stat")):
+                return path
+    return None
+
+
+def read_cgroup_sample(cgroup_dir):
+    """Return ``(cpu_usage_usec, memory_bytes)`` from cpu.stat, memory.current and memory.stat.
+
+    Memory excludes inactive page cache (``inactive_file``), which is what ``docker stats`` reports on cgroup v2.
+    """
+    usage_usec = 0
+    with open(os.path.join(cgroup_dir, "cpu.stat")) as f:
+        for line in f:
+            key, _, value = line.partition(" ")
+            if key == "usage_usec":
+                usage_usec = int(value)
+                break
+    with open(os.path.join(cgroup_dir, "memory.current")) as f:
+        mem_bytes = int(f.read().strip())
+    try:
+        with open(os.path.join(cgroup_dir, "memory.stat")) as f:
+            for line in f:
+                key, _, value = line.partition(" ")
+                if key == "inactive_file":
+                    mem_bytes -= int(value)
+                    break
+    except OSError:
+        pass
+    return usage_usec, max(mem_bytes, 0)
+
+
+def summarize_cgroup_samples(samples):
+    """Reduce ``(timestamp, cpu_usage_usec, mem_bytes)`` samples to the ``{'avg','peak','total'}`` CPU/memory dicts.
+
+    CPU% between two samples is usage delta over wall-clock delta (100% = one core); averages and the
+    cumulative totals (%*s, MB*s) integrate over the real timestamps.
+    """
+    mib = 1024 * 1024
+    cpu_pcts = []
+    elapsed = 0.0
+    mem_total = 0.0
+    for (t0, u0, m0), (t1, u1, m1) in zip(samples, samples[1:]):
+        dt = t1 - t0
+        if dt <= 0:
+            continue
+        cpu_pcts.append((u1 - u0) / 1e6 / dt * 100.0)
+        mem_total += (m0 + m1) / 2.0 / mib * dt
+        elapsed += dt
+    cpu_total = (samples[-1][1] - samples[0][1]) / 1e6 * 100.0 if len(samples) > 1 else 0.0
+    cpu_avg = cpu_total / elapsed if elapsed > 0 else 0.0
+    cpu_peak = max(cpu_pcts) if cpu_pcts else 0.0
+    if elapsed > 0:
+        mem_avg = mem_total / elapsed
+    else:
+        mem_avg = samples[0][2] / mib if samples else 0.0
+    mem_peak = max(m for _, _, m in samples) / mib if samples else 0.0
+    return {'avg': cpu_avg, 'peak': cpu_peak, 'total': cpu_total}, \
+           {'avg': mem_avg, 'peak': mem_peak, 'total': mem_total}
+
+
+def collect_resources_cgroup(cgroup_dir, stop_event, interval=0.05, samples=None):
+    """Sample the container's cgroup v2 files every *interval* seconds until *stop_event* is set.
+
+    Each sample is ``(time.time(), cpu_usage_usec, mem_bytes)`` and is also appended to *samples* when
+    given. A final sample is taken when the event fires, unless the previous one is under half an
+    interval old (a very short last gap would turn counter granularity into a bogus CPU peak).
+    Returns the same dicts as ``collect_resources_docker_stats``.
+    """
+    samples = [] if samples is None else samples
+    next_t = time.perf_counter()
+    while True:
+        try:
+            usage_usec, mem_bytes = read_cgroup_sample(cgroup_dir)
+            now = time.time()
+            if not (stop_event.is_set() and samples and now - samples[-1][0] < interval / 2):
+                samples.append((now, usage_usec, mem_bytes))
+        except (OSError, ValueError):
+            pass  # cgroup disappears when the container stops
+        if stop_event.is_set():
+            break
+        next_t += interval
+        stop_event.wait(max(0.0, next_t - time.perf_counter()))
+    return summarize_cgroup_samples(samples)
+
+
+# =====================
+# Docker Engine API over the unix socket (--docker-backend api)
+# =====================
+DOCKER_SOCKET = "/var/run/docker.sock"
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP/1.1 connection to a unix domain socket (the Docker daemon's API endpoint)."""
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class DockerAPIError(RuntimeError):
+    def __init__(self, status, message):
+        super().__init__(f"Docker API error {status}: {message}")
+        self.status = status
+
+
+class DockerAPI:
+    """Minimal Docker Engine API client: run/stop/rm/ps/inspect plus the streaming stats endpoint.
+
+    Requests share one persistent keep-alive connection to *socket_path*; stats streams get their own.
+    Stop and remove are synchronous in the API, so no polling is needed after them.
+    """
+
+    def __init__(self, socket_path=DOCKER_SOCKET, timeout=60):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._conn = None
+
+    def _request(self, method, path, body=None, ok=(200, 201, 204)):
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        for attempt in (1, 2):
+            conn = self._conn or _UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+                self._conn = conn
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # Daemon closed the idle keep-alive connection: reconnect once.
+                conn.close()
+                self._conn = None
+                if attempt == 2:
+                    raise
+        if resp.status not in ok:
+            try:
+                message = json.loads(data).get("message", "")
+            except ValueError:
+                message = data.decode(errors="replace")
+            raise DockerAPIError(resp.status, message)
+        return resp.status, json.loads(data) if data else None
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def inspect(self, name):
+        """Container JSON for *name*, or None if it does not exist."""
+        status, data = self._request("GET", f"/containers/{quote(name)}/json", ok=(200, 404))
+        return data if status == 200 else None
+
+    def ps(self, name=None, all=True):
+        """Names of containers (optionally filtered by *name*, like ``docker ps -a --filter name=``)."""
+        query = {"all": "1" if all else "0"}
+        if name:
+            query["filters"] = json.dumps({"name": [name]})
+        _, data = self._request("GET", f"/containers/json?{urlencode(query)}")
+        return [n.lstrip("/") for c in data or [] for n in c.get("Names", [])]
+
+    def run(self, image, name, port_mapping=None, network="bridge", env=None, cpuset_cpus=None, nano_cpus=None):
+        """Create and start a detached container, like ``docker run -d --cgroupns=host --ulimit nofile=...``."""
+        host_config = {
+            "CgroupnsMode": "host",
+            "Ulimits": [{"Name": "nofile", "Soft": 100000, "Hard": 100000}],
+        }
+        if cpuset_cpus:
+            host_config["CpusetCpus"] = cpuset_cpus
+        if nano_cpus:
+            host_config["NanoCpus"] = nano_cpus
+        body = {"Image": image, "HostConfig": host_config}
+        if env:
+            body["Env"] = [f"{k}={v}" for k, v in env.items()]
+        if network == "host":
+            host_config["NetworkMode"] = "host"
+        elif port_mapping:
+            parts = port_mapping.split(":")
+            container_port = parts[-1] if "/" in parts[-1] else f"{parts[-1]}/tcp"
+            binding = {"HostPort": parts[-2]}
+            if len(parts) == 3:
+                binding["HostIp"] = parts[0]
+            body["ExposedPorts"] = {container_port: {}}
+            host_config["PortBindings"] = {container_port: [binding]}
+        _, created = self._request("POST", f"/containers/create?{urlencode({'name': name})}", body)
+        self._request("POST", f"/containers/{created['Id']}/start", ok=(204, 304))
+        return created["Id"]
+
+    def stop(self, name, timeout=10, missing_ok=False):
+        ok = (204, 304, 404) if missing_ok else (204, 304)
+        self._request("POST", f"/containers/{quote(name)}/stop?t={int(timeout)}", ok=ok)
+
+    def remove(self, name, force=False, missing_ok=False):
+        ok = (204, 404) if missing_ok else (204,)
+        self._request("DELETE", f"/containers/{quote(name)}?force={'1' if force else '0'}", ok=ok)
+
+    def stats_stream(self, name):
+        """Yield decoded stats documents from ``/containers/{name}/stats?stream=1`` (about one per second)."""
+        conn = _UnixHTTPConnection(self.socket_path)
+        try:
+            conn.request("GET", f"/containers/{quote(name)}/stats?stream=1")
+            resp = conn.getresponse()
+            if resp.status != 200:
+                raise DockerAPIError(resp.status, resp.read().decode(errors="replace"))
+            for line in resp:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        finally:
+            conn.close()
+
+
+def docker_stats_sample(stats):
+    """Turn one Engine API stats document into a cgroup-style ``(cpu_usage_usec, mem_bytes)`` pair.
+
+    Memory excludes inactive page cache as ``docker stats`` does (``inactive_file`` on cgroup v2,
+    ``total_inactive_file`` on v1).
+    """
+    usage_usec = stats.get("cpu_stats", {}).get("cpu_usage", {}).get("total_usage", 0) // 1000
+    mem = stats.get("memory_stats", {})
+    mem_stats = mem.get("stats", {})
+    inactive = mem_stats.get("inactive_file", mem_stats.get("total_inactive_file", 0))
+    return usage_usec, max(mem.get("usage", 0) - inactive, 0)
+
+
+def collect_resources_docker_api(docker_api, container_name, stop_event, samples=None, first_sample=None):
+    """Read the streaming stats endpoint over one long-lived connection until *stop_event* is set.
+
+    Samples are ``(time.time(), cpu_usage_usec, mem_bytes)`` like the cgroup sampler's, and are
+    summarised the same way. The daemon emits a document roughly every second; *first_sample*
+    (an Event) is set once the first one is in.
+    """
+    samples = [] if samples is None else samples
+    try:
+        for stats in docker_api.stats_stream(container_name):
+            if stats.get("cpu_stats"):
+                usage_usec, mem_bytes = docker_stats_sample(stats)
+                samples.append((time.time(), usage_usec, mem_bytes))
+                if first_sample is not None:
+                    first_sample.set()
+            if stop_event.is_set():
+                break
+    except (OSError, ValueError, http.client.HTTPException, DockerAPIError) as e:
+        logger.warning("Docker API stats stream for '%s' ended: %s", container_name, e)
+    return summarize_cgroup_samples(samples)
+
+
 def _pid_in_container(pid, container_id):
     """Check if pid belongs to container via /proc/pid/cgroup (fallback when Scaphandre reports container=null)."""
     if not container_id or pid <= 0:
@@ -233,53 +1994,237 @@ def _pid_in_container(pid, container_id):
         return False
 
 
-def parse_json_and_compute_energy(file_name, container_name, runtime, container_id=None):
-    """Extract energy from Scaphandre JSON. Prefers Scaphandre's container field; falls back to cgroup when all container=null."""
+def container_pids(container_id):
+    """PIDs currently in the container, found by scanning /proc/<pid>/cgroup; empty once it has stopped."""
+    if not container_id:
+        return set()
+    return {int(name) for name in os.listdir("/proc") if name.isdigit() and _pid_in_container(int(name), container_id)}
+
+
+class ContainerBoots:
+    """Each boot of the server container during one Scaphandre recording, with the PIDs seen in it.
+
+    Restarts reuse the container name but not its ID or processes, and a stopped container's PIDs can no longer
+    be resolved through /proc. So PIDs are collected while each boot runs (``snapshot`` after every load point,
+    ``stopping`` right before it is stopped), and the container=null fallback matches each report against the
+    boot that was up at its timestamp.
+    """
+
+    def __init__(self, container_name, docker_path, docker_api=None):
+        self.container_name = container_name
+        self.docker_path = docker_path
+        self.docker_api = docker_api
+        self.container_ids = []
+        self.pids = []
+        self.stopped_at = []
+
+    def started(self):
+        """Record a boot that just passed its health check."""
+        container_id = get_container_id(self.container_name, self.docker_path, self.docker_api)
+        self.container_ids.append(container_id)
+        self.pids.append(container_pids(container_id))
+
+    def snapshot(self):
+        """Add the running boot's current PIDs."""
+        if self.container_ids:
+            self.pids[-1] |= container_pids(self.container_ids[-1])
+
+    def stopping(self):
+        """Take a last snapshot of the running boot before it is stopped; later reports belong to the next boot."""
+        self.snapshot()
+        self.stopped_at.append(time.time())
+
+    def pids_at(self, timestamp):
+        """PIDs of the boot that was up (or booting) at timestamp."""
+        if not self.pids:
+            return set()
+        return self.pids[min(bisect.bisect_left(self.stopped_at, timestamp), len(self.pids) - 1)]
+
+
+SCAPHANDRE_READ_CHUNK = 1 << 20          # characters read per chunk while streaming the JSON
+SCAPHANDRE_PROGRESS_EVERY = 256 << 20    # log parse progress every this many characters on big files
+
+
+def iter_scaphandre_entries(file_name, chunk_size=SCAPHANDRE_READ_CHUNK):
+    """Yield Scaphandre reports one at a time without loading the whole file.
+
+    Accepts a top-level JSON array as well as newline-delimited reports. Memory is bounded by one
+    read chunk plus the report being decoded. A truncated trailing report (Scaphandre stopped
+    mid-write) is skipped with a warning instead of failing the whole parse.
+    """
+    decoder = json.JSONDecoder()
+    total_size = os.path.getsize(file_name)
+    report_progress = total_size > SCAPHANDRE_PROGRESS_EVERY
+    next_progress = SCAPHANDRE_PROGRESS_EVERY
+    consumed = 0
+    buf = ""
+    pos = 0
+    eof = False
     with open(file_name, "r") as file:
-        data = json.load(file)
+        while True:
+            # Skip array brackets, separators and whitespace between reports
+            while pos < len(buf) and buf[pos] in " \t\r\n,[]":
+                pos += 1
+            if pos < len(buf):
+                try:
+                    entry, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        logger.warning(f"Ignoring truncated trailing data in Scaphandre output {file_name}")
+                        return
+                else:
+                    pos = end
+                    if isinstance(entry, dict):
+                        yield entry
+                    continue
+            elif eof:
+                return
+            chunk = file.read(chunk_size)
+            if not chunk:
+                eof = True
+                continue
+            buf = buf[pos:] + chunk
+            pos = 0
+            consumed += len(chunk)
+            if report_progress and consumed >= next_progress:
+                logger.info(f"Parsing Scaphandre output: {consumed >> 20}/{total_size >> 20} MB "
+                            f"({100.0 * consumed / total_size:.0f}%)")
+                next_progress += SCAPHANDRE_PROGRESS_EVERY
+
 
-    total_power_microwatts = 0.0
-    number_samples = 0
+def load_container_power_series(file_name, container_name, container_id=None, boots=None):
+    """Collect the container's power over time in a single streaming pass.
+
+    Returns [(timestamp_s, watts)] with one point per Scaphandre report, summed over the container's
+    processes. Prefers Scaphandre's container field; consumers with container=null are kept aside as
+    cgroup fallback candidates and only used when no consumer carries container metadata at all. The
+    fallback matches PIDs recorded per boot in ``boots`` (a ContainerBoots) when given, else it looks up
+    container_id in /proc, which only works while that container is still running.
+    """
+    named_series = []
+    fallback_series = []
     found_containers = set()
+    pid_matches = {}
 
-    for entry in data:
+    for entry in iter_scaphandre_entries(file_name):
+        timestamp = (entry.get("host") or {}).get("timestamp")
+        named_power = fallback_power = 0.0
         for consumer in entry.get("consumers", []):
+            power = consumer.get("consumption", 0.0)
+            if timestamp is None:
+                timestamp = consumer.get("timestamp")
             container = consumer.get("container")
             if container:
                 found_containers.add(container.get("name"))
-            if container and container.get("name") == container_name:
-                power = consumer.get("consumption", 0.0)
-                if power > 0:
-                    total_power_microwatts += power
-                    number_samples += 1
+                if container.get("name") == container_name and power > 0:
+                    named_power += power
+            elif boots is not None and not found_containers and power > 0:
+                if timestamp is not None and consumer.get("pid", 0) in boots.pids_at(float(timestamp)):
+                    fallback_power += power
+            elif container_id and not found_containers and power > 0:
+                pid = consumer.get("pid", 0)
+                if pid not in pid_matches:
+                    pid_matches[pid] = _pid_in_container(pid, container_id)
+                if pid_matches[pid]:
+                    fallback_power += power
+        if timestamp is None:
+            continue
+        if named_power > 0:
+            named_series.append((float(timestamp), named_power * 1e-6))
+        if fallback_power > 0:
+            fallback_series.append((float(timestamp), fallback_power * 1e-6))
 
+    series = named_series
     # Fallback: when Scaphandre reports container=null for all (e.g. cgroups v2), attribute by cgroup path
-    if number_samples == 0 and container_id and not found_containers:
-        for entry in data:
-            for consumer in entry.get("consumers", []):
-                if consumer.get("container"):
-                    continue
-                pid = consumer.get("pid", 0)
-                power = consumer.get("consumption", 0.0)
-                if power > 0 and _pid_in_container(pid, container_id):
-                    total_power_microwatts += power
-                    number_samples += 1
-        if number_samples > 0:
+    if not series and (container_id or boots is not None) and not found_containers:
+        series = fallback_series
+        if series:
             logger.info(f"Using cgroup fallback for '{container_name}' (Scaphandre container=null on this system)")
 
-    if not found_containers and number_samples == 0:
+    if not found_containers and not series:
         logger.warning(f"No containers found in Scaphandre output {file_name}")
     elif found_containers:
         logger.info(f"Containers found in Scaphandre output: {found_containers}")
-    if container_name not in found_containers and number_samples == 0:
+    if container_name not in found_containers and not series:
         logger.warning(f"Container '{container_name}' not found in Scaphandre output!")
-    if number_samples == 0:
-        logger.warning(f"No energy samples found for container '{container_name}' in {file_name}")
-        return 0.0, 0.0, 0
+    series.sort()
+    return series
 
-    avg_power_watts = (total_power_microwatts / number_samples) * 1e-6
-    total_energy_joules = avg_power_watts * runtime
-    return total_energy_joules, avg_power_watts, number_samples
+
+def _power_at(series, t):
+    """Linearly interpolated power at t; held flat before the first and after the last point."""
+    i = bisect.bisect_left(series, (t,))
+    if i == 0:
+        return series[0][1]
+    if i == len(series):
+        return series[-1][1]
+    (t0, p0), (t1, p1) = series[i - 1], series[i]
+    if t1 == t0:
+        return p1
+    return p0 + (p1 - p0) * (t - t0) / (t1 - t0)
+
+
+def integrate_power(series, t_start, t_end):
+    """Energy in joules between t_start and t_end by the trapezoidal rule over (timestamp_s, watts) points."""
+    if not series or t_end <= t_start:
+        return 0.0
+    points = [(t_start, _power_at(series, t_start))]
+    points += [p for p in series if t_start < p[0] < t_end]
+    points.append((t_end, _power_at(series, t_end)))
+    return sum((t1 - t0) * (p0 + p1) / 2 for (t0, p0), (t1, p1) in zip(points, points[1:]))
+
+
+def idle_csv_fields(idle_seconds, phase_energy):
+    """CSV columns for the idle baseline; empty when no idle window was recorded."""
+    if phase_energy['idle_power'] is None:
+        return {"Idle Window (s)": idle_seconds or '', "Idle Power (W)": '', "Energy Above Idle (J)": ''}
+    return {
+        "Idle Window (s)": idle_seconds,
+        "Idle Power (W)": phase_energy['idle_power'],
+        "Energy Above Idle (J)": phase_energy['above_idle'],
+    }
+
+
+def record_idle_window(idle_seconds, container_name, verbose=False):
+    """Leave the container unloaded for idle_seconds while Scaphandre runs; return the (start, end) window or None."""
+    if idle_seconds <= 0:
+        return None
+    if is_measure_quiet() and not verbose:
+        measure_quiet_msg(f"{container_name} | idle baseline {idle_seconds:g}s …")
+    logger.info(f"Recording idle baseline for {idle_seconds:g}s...")
+    idle_start = time.time()
+    time.sleep(idle_seconds)
+    return idle_start, time.time()
+
+
+def compute_window_energy(series, start_time, runtime, idle_window=None, bounds=None):
+    """Energy figures for the load window start_time..start_time+runtime of a power series.
+
+    Returns (total_energy_joules, avg_power_watts, number_samples, phase_energy) where phase_energy holds
+    the joules Scaphandre saw before ('warmup') and after ('cooldown') the load window. With an
+    idle_window (t_start, t_end) it also holds the baseline 'idle_power' in watts and the load-window
+    energy above that baseline as 'above_idle'; both stay None without one.
+
+    Warmup and cooldown run from the load window out to bounds (t_start, t_end), which default to the
+    first and last sample; sweeps pass the neighbouring points' windows so phases do not overlap.
+    """
+    phase_energy = {'warmup': 0.0, 'cooldown': 0.0, 'idle_power': None, 'above_idle': None}
+    if not series:
+        return 0.0, 0.0, 0, phase_energy
+
+    end_time = start_time + runtime
+    lower, upper = bounds or (series[0][0], series[-1][0])
+    lower, upper = max(lower, series[0][0]), min(upper, series[-1][0])
+    number_samples = sum(1 for t, _ in series if start_time <= t <= end_time)
+    total_energy_joules = integrate_power(series, start_time, end_time)
+    avg_power_watts = total_energy_joules / runtime if runtime > 0 else 0.0
+    phase_energy['warmup'] = integrate_power(series, lower, min(start_time, upper))
+    phase_energy['cooldown'] = integrate_power(series, max(end_time, lower), upper)
+    if idle_window is not None and idle_window[1] > idle_window[0]:
+        idle_start, idle_end = idle_window
+        phase_energy['idle_power'] = integrate_power(series, idle_start, idle_end) / (idle_end - idle_start)
+        phase_energy['above_idle'] = total_energy_joules - phase_energy['idle_power'] * runtime
+    return total_energy_joules, avg_power_watts, number_samples, phase_energy
 
 def save_results_to_csv(filename, results, total_energy, average_power, runtime, requests_per_second, total_samples, 
                        cpu_metrics, mem_metrics, num_cores, container_name, measurement_type, extra_fields=None):
@@ -349,19 +2294,313 @@ def save_results_to_csv(filename, results, total_energy, average_power, runtime,
         w.writerow(headers)
         w.writerows(migrated)
 
-def print_summary(results, total_energy, average_power, runtime, requests_per_second, cpu_metrics, mem_metrics, num_cores, output_json, output_csv, container_name, http_max_workers_label=None):
+def print_summary(results, total_energy, average_power, runtime, requests_per_second, cpu_metrics, mem_metrics, num_cores, output_json, output_csv, container_name, http_max_workers_label=None, http_engine_label=None, latency_hist=None, schedule=None, phase_energy=None, warmup=None, phase_hists=None, client=None, client_bound_flag=False, server_cores=None):
     logger.info("=== Measurement Summary ===")
-    logger.info(f"Container: {container_name}")
+    logger.info(f"Container: {container_name}" + (f" ({server_cores} CPUs)" if server_cores is not None else ""))
+    if http_engine_label is not None:
+        logger.info("HTTP engine: %s", http_engine_label)
     if http_max_workers_label is not None:
         logger.info("HTTP max workers: %s", http_max_workers_label)
     logger.info(f"Total Requests: {results['total']}, Successful: {results['success']}, Failed: {results['failure']}")
     logger.info(f"Execution Time: {runtime:.2f} s, Requests/s: {requests_per_second:.2f}")
+    if warmup is not None:
+        logger.info(f"Warmup: {warmup['requests']} requests in {warmup['duration']:.2f} s ({warmup['throughput']:.2f} req/s), not measured")
+    if schedule is not None and schedule.open_loop:
+        logger.info(f"Open-loop: target {schedule.rate:g} req/s, scheduled {schedule.scheduled}, late {schedule.late}, dropped {schedule.dropped}")
+    if latency_hist is not None and latency_hist.count:
+        logger.info(f"Latency: Avg {latency_hist.mean_ms():.2f} ms, " + ", ".join(
+            f"{label} {latency_hist.percentile_ms(pct):.2f} ms" for pct, label in LATENCY_PERCENTILES
+        ) + f", Max {latency_hist.max_ms():.2f} ms")
+    if phase_hists:
+        logger.info("Phases: " + ", ".join(
+            f"{label} avg {phase_hists[phase].mean_ms():.3f} ms / P99 {phase_hists[phase].percentile_ms(99):.3f} ms (n={phase_hists[phase].count})"
+            for phase, label in TIMING_PHASES if phase_hists[phase].count
+        ))
     logger.info(f"Energy: Total {total_energy:.2f} J, Avg Power {average_power:.2f} W")
+    if phase_energy is not None:
+        logger.info(f"Energy outside load window: Warmup {phase_energy['warmup']:.2f} J, Cooldown {phase_energy['cooldown']:.2f} J")
+        if phase_energy['idle_power'] is not None:
+            logger.info(f"Idle baseline: {phase_energy['idle_power']:.2f} W, Energy above idle {phase_energy['above_idle']:.2f} J")
     logger.info(f"CPU: Avg {cpu_metrics['avg']:.2f}%, Peak {cpu_metrics['peak']:.2f}%, Total {cpu_metrics['total']:.2f} %*s")
     logger.info(f"Memory: Avg {mem_metrics['avg']:.2f} MB, Peak {mem_metrics['peak']:.2f} MB, Total {mem_metrics['total']:.2f} MB*s")
+    if client is not None:
+        logger.info(f"Load generator: CPU Avg {client['cpu_avg']:.2f}%, Peak {client['cpu_peak']:.2f}%, RSS Peak {client['rss_peak']:.2f} MB, "
+                    f"busiest process {client['busiest_process']:.2f}%, busiest thread {client['busiest_thread']:.2f}%")
+        if client_bound_flag:
+            logger.warning("Load generator saturated a core while the server did not: throughput is client-bound")
     logger.info(f"JSON: {output_json}, CSV: {output_csv or f'results_docker/{container_name}.csv'}")
     logger.info("==========================")
 
+# =====================
+# Adaptive repetitions (--target-ci)
+# =====================
+# Two-sided 95% Student t critical values for 1..30 degrees of freedom; beyond that the normal 1.96 is close enough
+T95_CRITICAL = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+                2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+                2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+
+
+def mean_stddev_ci95(values):
+    """(mean, sample stddev, 95% CI half-width) of values; the half-width is inf with fewer than two values."""
+    mean = statistics.fmean(values) if values else 0.0
+    if len(values) < 2:
+        return mean, 0.0, float("inf")
+    stddev = statistics.stdev(values)
+    df = len(values) - 1
+    t = T95_CRITICAL[df - 1] if df <= len(T95_CRITICAL) else 1.96
+    return mean, stddev, t * stddev / math.sqrt(len(values))
+
+
+def ci_converged(values, target_pct):
+    """True when the 95% CI half-width is at most target_pct percent of the mean."""
+    mean, _, half_width = mean_stddev_ci95(values)
+    return half_width <= abs(mean) * target_pct / 100.0
+
+
+def repetition_csv_fields(repetition, summary=None):
+    """Repetition number plus, on summary rows, the spread of Requests/s and Total Energy (J)."""
+    fields = {
+        "Repetition": repetition if repetition is not None else "",
+        "Requests/s Stddev": "",
+        "Requests/s CI95 Half-Width": "",
+        "Total Energy Stddev (J)": "",
+        "Total Energy CI95 Half-Width (J)": "",
+        "CI Target (%)": "",
+        "CI Converged": "",
+    }
+    if summary is not None:
+        fields.update(summary)
+    return fields
+
+
+def save_repetition_summary(filename, reps, num_cores, container_name, measurement_type, target_ci):
+    """Append one summary row for a point's repetitions: means in the usual columns, stddev and CI alongside.
+
+    Latency and phase columns come from the merged histograms of all repetitions; other numeric extra columns are
+    averaged and text or unchanging columns are taken from the last repetition.
+    """
+    def mean_of(values):
+        return statistics.fmean(values) if values else 0.0
+
+    rows = [r["row"] for r in reps]
+    rps_mean, rps_stddev, rps_ci = mean_stddev_ci95([row["requests_per_second"] for row in rows])
+    energy_mean, energy_stddev, energy_ci = mean_stddev_ci95([row["total_energy"] for row in rows])
+    converged = rps_ci <= abs(rps_mean) * target_ci / 100.0 and energy_ci <= abs(energy_mean) * target_ci / 100.0
+
+    extra_fields = {}
+    for key, last in rows[-1]["extra_fields"].items():
+        values = [row["extra_fields"].get(key) for row in rows]
+        numeric = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values)
+        extra_fields[key] = mean_of(values) if numeric and len(set(values)) > 1 else last
+    merged = LatencyHistogram()
+    for r in reps:
+        merged.merge(r["latency_hist"])
+    extra_fields.update(latency_csv_fields(merged))
+    if reps[-1]["phase_hists"] is not None:
+        merged_phases = {phase: LatencyHistogram() for phase, _ in TIMING_PHASES}
+        for r in reps:
+            for phase, hist in r["phase_hists"].items():
+                merged_phases[phase].merge(hist)
+        extra_fields.update(phase_csv_fields(merged_phases))
+    extra_fields["Run ID"] = ""
+    extra_fields.update(repetition_csv_fields("summary", {
+        "Requests/s Stddev": rps_stddev,
+        "Requests/s CI95 Half-Width": rps_ci if len(reps) > 1 else "",
+        "Total Energy Stddev (J)": energy_stddev,
+        "Total Energy CI95 Half-Width (J)": energy_ci if len(reps) > 1 else "",
+        "CI Target (%)": target_ci,
+        "CI Converged": "yes" if converged else "no",
+    }))
+
+    results = {key: round(mean_of([r["results"][key] for r in reps])) for key in ("total", "success", "failure")}
+    resources = {
+        kind: {stat: mean_of([r["resources"][kind].get(stat, 0.0) for r in reps]) for stat in ("avg", "peak", "total")}
+        for kind in ("cpu", "mem")
+    }
+    save_results_to_csv(filename, results, energy_mean, mean_of([row["average_power"] for row in rows]),
+                        mean_of([r["runtime"] for r in reps]), rps_mean, round(mean_of([row["total_samples"] for row in rows])),
+                        resources["cpu"], resources["mem"], num_cores, container_name, measurement_type,
+                        extra_fields=extra_fields)
+    logger.info(f"Summary over {len(reps)} repetitions: Requests/s {rps_mean:.2f} ± {rps_ci:.2f}, "
+                f"Total Energy {energy_mean:.2f} ± {energy_ci:.2f} J (95% CI, target ±{target_ci:g}%: "
+                f"{'converged' if converged else 'not converged'})")
+
+
+def parse_sweep(value):
+    """argparse type for --sweep: comma-separated positive request counts."""
+    try:
+        points = [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated request counts, got {value!r}")
+    if not points or any(p < 1 for p in points):
+        raise argparse.ArgumentTypeError(f"expected comma-separated positive request counts, got {value!r}")
+    return points
+
+
+def sweep_description(args):
+    restart = ", container restarted between points" if args.restart_between_points else ""
+    return f"sweep of {len(args.sweep)} points ({','.join(map(str, args.sweep))} requests{restart})"
+
+
+def boot_container(args, container_name, url, docker_path, docker_api=None, cores=None):
+    """Start the server container (with *cores* CPUs in a core sweep) and wait for HTTP 200; on failure log its
+    output, remove it and return False."""
+    logger.info(f"Starting container '{container_name}'" + (f" with {cores} CPUs..." if cores is not None else "..."))
+    start_server_container(args.server_image, args.port_mapping, container_name, docker_path, args.network, docker_api,
+                           **server_limits(args, cores))
+    if container_state(container_name, docker_path, docker_api) == "running" and check_container_health(url):
+        return True
+    logger.error("Container health check failed (no HTTP 200 within wait time).")
+    try:
+        out = subprocess.run(
+            [docker_path, "logs", "--tail", "30", container_name],
+            capture_output=True, text=True, timeout=5
+        )
+        if out.stdout or out.stderr:
+            logger.error("Container logs (last 30 lines):\n%s%s", out.stdout or "", out.stderr or "")
+    except Exception as e:
+        logger.debug("Could not get container logs: %s", e)
+    logger.error("To allow more boot time: MEASURE_STARTUP_WAIT=25 MEASURE_HEALTH_RETRIES=30 make run")
+    stop_server_container(container_name, docker_path, docker_api, port=readiness_port(args.port_mapping, args.network))
+    return False
+
+
+def start_resource_collector(args, container_name, docker_path, docker_api=None):
+    """Start the container CPU/memory sampler thread; returns (thread, stop_event, resource_results).
+
+    ``resource_results['samples']`` keeps the raw ``(time, cpu_usage_usec, mem_bytes)`` samples for the
+    timeline; it stays empty with the docker CLI sampler.
+    """
+    cgroup_dir = None
+    if args.resource_sampler == "cgroup":
+        cgroup_dir = find_container_cgroup_dir(get_container_id(container_name, docker_path, docker_api))
+        if cgroup_dir is None:
+            logger.warning("cgroup v2 directory for '%s' not found under %s; falling back to docker stats.", container_name, CGROUP_ROOT)
+    stop_event = threading.Event()
+    first_sample = threading.Event()
+    resource_results = {'cpu': {}, 'mem': {}, 'samples': []}
+    def collect():
+        if cgroup_dir is not None:
+            cpu_metrics, mem_metrics = collect_resources_cgroup(cgroup_dir, stop_event, args.sample_interval,
+                                                                samples=resource_results['samples'])
+        elif docker_api is not None:
+            cpu_metrics, mem_metrics = collect_resources_docker_api(docker_api, container_name, stop_event,
+                                                                    samples=resource_results['samples'], first_sample=first_sample)
+        else:
+            cpu_metrics, mem_metrics = collect_resources_docker_stats(container_name, stop_event, docker_path, first_sample=first_sample)
+        resource_results['cpu'] = cpu_metrics
+        resource_results['mem'] = mem_metrics
+
+    resource_thread = threading.Thread(target=collect)
+    resource_thread.start()
+
+    if cgroup_dir is None:
+        logger.info("Waiting for the first docker stats sample...")
+        wait_until(first_sample.is_set, DOCKER_STATS_FIRST_SAMPLE_TIMEOUT, "the first docker stats sample")
+    return resource_thread, stop_event, resource_results
+
+
+def reset_load_state():
+    """Clear the process-wide counters and latency histograms before a load phase."""
+    global _worker_state
+    results_counter.clear()
+    latency_histograms.clear()
+    latency_bucket_log.clear()
+    for hists in phase_histograms.values():
+        hists.clear()
+    _worker_state = threading.local()
+
+
+def run_load_point(url, args, container_name):
+    """Run one load phase as configured by args and return its start_time, runtime, results, latency_hist, schedule,
+    the load generator's own CPU/RSS usage (client) and the per-second ``LoadTimeline`` bins."""
+    reset_load_state()
+    shards = start_load_shards(url, args) if args.processes > 1 else None
+    hb_stop = threading.Event()
+    hb_thread = None
+    schedule = make_schedule(args)
+    load_t0 = time.time()
+    if is_measure_quiet() and not args.verbose:
+        iv = measure_quiet_heartbeat_interval_sec()
+
+        def _heartbeat_worker():
+            while not hb_stop.wait(iv):
+                done = completed_requests()
+                measure_quiet_msg(
+                    f"{container_name} | HTTP requests {done}/{schedule.scheduled or '?'} "
+                    f"({int(time.time() - load_t0)}s elapsed)"
+                )
+
+        hb_thread = threading.Thread(target=_heartbeat_worker, daemon=True)
+        hb_thread.start()
+
+    client_pids = [os.getpid()] + ([proc.pid for proc in shards["procs"]] if shards is not None else [])
+    client_thread, client_stop, client_results = start_client_collector(client_pids)
+    timeline = LoadTimeline().start() if shards is None else None
+    start_time = time.time()
+    try:
+        if shards is not None:
+            timeline_bins = run_load_shards(shards, schedule)
+        elif args.engine == "async":
+            asyncio.run(run_async_load(url, schedule, args.connections, args.verbose))
+        elif args.engine == "raw":
+            run_raw_load(url, schedule, args.connections, args.verbose)
+        else:
+            run_thread_load(url, schedule, args.max_workers, args.verbose)
+    finally:
+        client_stop.set()
+        if timeline is not None:
+            timeline_bins = timeline.stop()
+        if hb_thread is not None:
+            hb_stop.set()
+            hb_thread.join(timeout=3)
+    runtime = time.time() - start_time
+    runtime_data['runtime'] = runtime
+    client_thread.join()
+    return {
+        "start_time": start_time,
+        "runtime": runtime,
+        "results": Counter(results_counter),
+        "latency_hist": merged_latency_histogram(),
+        "phase_hists": merged_phase_histograms() if args.engine != "thread" else None,
+        "schedule": schedule,
+        "client": client_results.get('metrics'),
+        "timeline": timeline_bins,
+    }
+
+
+def run_warmup(url, args, container_name):
+    """Closed-loop warmup load before the measured phase; its counters and latencies are discarded.
+
+    Returns {'requests', 'duration', 'throughput'} for the CSV, or None when no warmup is configured.
+    """
+    if not args.warmup_requests and not args.warmup_seconds:
+        return None
+    # num_requests is ignored in duration mode but must stay a count for the shard split
+    warm_args = argparse.Namespace(**{**vars(args), "num_requests": args.warmup_requests or args.num_requests,
+                                      "duration": args.warmup_seconds, "rate": None})
+    if is_measure_quiet() and not args.verbose:
+        measure_quiet_msg(f"{container_name} | warmup {load_description(warm_args)} …")
+    logger.info(f"Warming up with {load_description(warm_args)}...")
+    warm = run_load_point(url, warm_args, container_name)
+    requests_done = warm["results"]["total"]
+    return {
+        "requests": requests_done,
+        "duration": warm["runtime"],
+        "throughput": requests_done / warm["runtime"] if warm["runtime"] > 0 else 0.0,
+    }
+
+
+def warmup_csv_fields(warmup):
+    if warmup is None:
+        return {"Warmup Requests": "", "Warmup Duration (s)": "", "Warmup Throughput (req/s)": ""}
+    return {
+        "Warmup Requests": warmup["requests"],
+        "Warmup Duration (s)": warmup["duration"],
+        "Warmup Throughput (req/s)": warmup["throughput"],
+    }
+
+
 def main():
     parser = argparse.ArgumentParser(description="Measure web server energy with Scaphandre in Docker")
     parser.add_argument('--server_image', type=str, required=True, help="Docker image of the server (e.g., nginx-deb)")
@@ -370,20 +2609,72 @@ def main():
     parser.add_argument('--network', type=str, default='bridge', choices=['bridge', 'host'], help="Network mode (default: bridge)")
     parser.add_argument('--num_requests', type=int, default=500, help="Number of requests to send (default: 500)")
     parser.add_argument('--max_workers', type=int, default=None, help="Max workers for ThreadPoolExecutor (default: None; CSV records System default when unset)")
+    parser.add_argument('--engine', type=str, default='thread', choices=['thread', 'async', 'raw'], help="HTTP load engine: thread (requests + ThreadPoolExecutor), async (asyncio keep-alive connection pool) or raw (non-blocking sockets on one selectors loop, lowest client overhead) (default: thread)")
+    parser.add_argument('--connections', type=int, default=100, help="Persistent keep-alive connections for --engine async/raw (default: 100)")
+    parser.add_argument('--processes', type=int, default=1, help="Load generator processes, each pinned to its own CPU; requests, connections/workers and --rate are split across them (default: 1)")
+    parser.add_argument('--rate', type=float, default=None, help="Open-loop mode: send requests on a fixed timeline at R req/s (requires --duration; ignores --num_requests)")
+    parser.add_argument('--sweep', type=parse_sweep, default=None, help="Comma-separated request counts (e.g. 100,1000,5000): boot the container and Scaphandre once, run every point and append one CSV row per point (replaces --num_requests)")
+    parser.add_argument('--restart-between-points', action='store_true', help="With --sweep: recreate the container before every point for cold-start measurements")
+    parser.add_argument('--duration', type=float, default=None, help="Run load for a fixed wall-clock window in seconds instead of --num_requests; the achieved count is reported (with --rate: length of the open-loop timeline)")
     parser.add_argument('--output_csv', type=str, default=None, help="Output CSV file path (default: results_docker/<container_name>.csv)")
     parser.add_argument('--output_json', type=str, default=None, help="Output JSON file path (default: output/<timestamp>.json)")
     parser.add_argument('--verbose', action='store_true', help="Enable verbose logging")
     parser.add_argument('--measurement_type', type=str, default=None, help="Type of measurement (static, dynamic, etc.)")
+    parser.add_argument('--resource-sampler', type=str, default='cgroup', choices=['cgroup', 'docker'], help="Container CPU/memory sampler: cgroup (read cgroup v2 files directly, falls back to docker when not found) or docker (docker stats via the --docker-backend) (default: cgroup)")
+    parser.add_argument('--docker-backend', type=str, default='cli', choices=['cli', 'api'], help="Container lifecycle and docker stats via the docker CLI or the Engine API on /var/run/docker.sock (default: cli)")
+    parser.add_argument('--sample-interval', type=float, default=0.05, help="cgroup sampler interval in seconds (default: 0.05)")
+    parser.add_argument('--target-ci', type=float, default=None, help="Repeat each point until the 95%% CI half-width of Requests/s and Total Energy (J) is within this percentage of the mean; writes one row per repetition plus a summary row")
+    parser.add_argument('--min-repetitions', type=int, default=3, help="With --target-ci: repetitions before convergence is checked (default: 3)")
+    parser.add_argument('--max-repetitions', type=int, default=10, help="With --target-ci: stop after this many repetitions even if not converged (default: 10)")
+    warmup_group = parser.add_mutually_exclusive_group()
+    warmup_group.add_argument('--warmup-requests', type=int, default=None, help="Send this many closed-loop requests before the measured phase (after each container boot in --sweep); excluded from counters, latency and the energy window")
+    warmup_group.add_argument('--warmup-seconds', type=float, default=None, help="Like --warmup-requests, but warm up for this many seconds")
+    parser.add_argument('--idle-seconds', type=float, default=float(os.environ.get("MEASURE_IDLE_SECONDS", "0")), help="Record the container's idle power for this many seconds before load (again after every container restart and core-sweep boot) and report energy above it; Scaphandre samples every ~2 s, so use 10+ (default: MEASURE_IDLE_SECONDS or 0 = off)")
+    parser.add_argument('--server-cpus', type=parse_cpu_list, default=os.environ.get("MEASURE_SERVER_CPUS") or None, help="Pin the server container to these CPUs with docker --cpuset-cpus, e.g. 2-5 (default: MEASURE_SERVER_CPUS or unpinned)")
+    parser.add_argument('--client-cpus', type=parse_cpu_list, default=os.environ.get("MEASURE_CLIENT_CPUS") or None, help="Pin the load generator, Scaphandre and docker stats to these CPUs with sched_setaffinity, e.g. 0-1 (default: MEASURE_CLIENT_CPUS or unpinned)")
+    parser.add_argument('--core-sweep', type=parse_core_sweep, default=os.environ.get("MEASURE_CORE_SWEEP") or None, help="Core-scaling study: restart the container with each CPU allotment in turn (e.g. 1,2,4,8) and append one CSV row per allotment (default: MEASURE_CORE_SWEEP or off)")
+    parser.add_argument('--core-limit', type=str, default=os.environ.get("MEASURE_CORE_LIMIT", "quota"), choices=['quota', 'cpuset'], help="How --core-sweep limits the container: quota (docker --cpus N) or cpuset (the first N CPUs of --server-cpus, else of the host minus --client-cpus) (default: MEASURE_CORE_LIMIT or quota)")
+    parser.add_argument('--beam-schedulers', action='store_true', default=os.environ.get("MEASURE_BEAM_SCHEDULERS") == "1", help="With --core-sweep: also pass ERL_FLAGS='+S N:N' so BEAM runs one scheduler per allotted core (default: on when MEASURE_BEAM_SCHEDULERS=1)")
     
     args = parser.parse_args()
+    if args.connections < 1:
+        parser.error("--connections must be a positive integer")
+    if not 0.01 <= args.sample_interval <= 1.0:
+        parser.error("--sample-interval must be between 0.01 and 1.0 seconds")
+    if args.processes < 1:
+        parser.error("--processes must be a positive integer")
+    if args.sweep and args.duration is not None:
+        parser.error("--sweep sweeps request counts and cannot be combined with --duration/--rate")
+    if args.restart_between_points and not args.sweep:
+        parser.error("--restart-between-points requires --sweep")
+    if args.warmup_requests is not None and args.warmup_requests < 1:
+        parser.error("--warmup-requests must be a positive integer")
+    if args.warmup_seconds is not None and args.warmup_seconds <= 0:
+        parser.error("--warmup-seconds must be positive")
+    if args.target_ci is not None and args.target_ci <= 0:
+        parser.error("--target-ci must be a positive percentage")
+    if not 2 <= args.min_repetitions <= args.max_repetitions:
+        parser.error("--min-repetitions must be at least 2 and not above --max-repetitions")
+    if args.idle_seconds < 0:
+        parser.error("--idle-seconds must not be negative")
+    if args.rate is not None and args.duration is None:
+        parser.error("--rate requires --duration")
+    if args.duration is not None and args.duration <= 0:
+        parser.error("--duration must be positive")
+    if args.rate is not None and args.rate <= 0:
+        parser.error("--rate must be positive")
+    check_cpu_layout(parser, args)
+    check_core_sweep(parser, args)
     if args.verbose:
         logger.setLevel(logging.DEBUG)
     elif is_measure_quiet():
         logger.setLevel(logging.WARNING)
 
     check_prerequisites()  # Exit with error before any measurement if anything is missing
+    pin_client(args)
     scaphandre_path = get_binary_path("scaphandre")
     docker_path = get_binary_path("docker")
+    docker_api = DockerAPI() if args.docker_backend == "api" else None
     num_cores = os.cpu_count()
     
     output_json = args.output_json or os.path.join("output", datetime.now().strftime("%Y-%m-%d-%H%M%S") + ".json")
@@ -405,120 +2696,163 @@ def main():
     cleanup_existing_scaphandre()
     if is_measure_quiet() and not args.verbose:
         measure_quiet_msg(f"{container_name} | Docker start + HTTP readiness wait …")
-    logger.info(f"Starting container '{container_name}'...")
-    start_server_container(args.server_image, args.port_mapping, container_name, docker_path, args.network)
-
-    if not check_container_health(url):
-        logger.error("Container health check failed (no HTTP 200 within wait time).")
-        try:
-            out = subprocess.run(
-                [docker_path, "logs", "--tail", "30", container_name],
-                capture_output=True, text=True, timeout=5
-            )
-            if out.stdout or out.stderr:
-                logger.error("Container logs (last 30 lines):\n%s%s", out.stdout or "", out.stderr or "")
-        except Exception as e:
-            logger.debug("Could not get container logs: %s", e)
-        logger.error("To allow more boot time: MEASURE_STARTUP_WAIT=25 MEASURE_HEALTH_RETRIES=30 make run")
-        stop_server_container(container_name, docker_path)
+    allotments = args.core_sweep or [None]
+    if not boot_container(args, container_name, url, docker_path, docker_api, cores=allotments[0]):
         return
+    port = readiness_port(args.port_mapping, args.network)
 
+    points = args.sweep or [args.num_requests]
     if is_measure_quiet() and not args.verbose:
+        cores_desc = f" | {args.core_limit} core sweep {','.join(map(str, args.core_sweep))}" if args.core_sweep else ""
         measure_quiet_msg(
             f"{container_name} | Scaphandre power sampling + HTTP load | "
-            f"{args.num_requests} GET → {url}"
+            f"{sweep_description(args) if args.sweep else load_description(args)}{cores_desc} → {url}"
         )
     logger.info("Starting Scaphandre...")
     scaphandre_process = start_scaphandre(output_json, scaphandre_path)
+    idle_window = record_idle_window(args.idle_seconds, container_name, args.verbose)
 
-    logger.info(f"Sending {args.num_requests} requests to {url}...")
-    time.sleep(2)
-
-    stop_event = threading.Event()
-    resource_results = {'cpu': {}, 'mem': {}}
-    def collect():
-        cpu_metrics, mem_metrics = collect_resources_docker_stats(container_name, stop_event, docker_path)
-        resource_results['cpu'] = cpu_metrics
-        resource_results['mem'] = mem_metrics
-
-    resource_thread = threading.Thread(target=collect)
-    resource_thread.start()
-
-    logger.info("Sleeping 1s to let docker stats stabilize...")
-    time.sleep(1)
-
-    hb_stop = threading.Event()
-    hb_thread = None
-    load_t0 = time.time()
-    if is_measure_quiet() and not args.verbose:
-        iv = measure_quiet_heartbeat_interval_sec()
-
-        def _heartbeat_worker():
-            while not hb_stop.wait(iv):
-                with results_lock:
-                    done = results_counter["total"]
-                measure_quiet_msg(
-                    f"{container_name} | HTTP requests {done}/{args.num_requests} "
-                    f"({int(time.time() - load_t0)}s elapsed)"
-                )
-
-        hb_thread = threading.Thread(target=_heartbeat_worker, daemon=True)
-        hb_thread.start()
-
-    start_time = time.time()
-    try:
-        with ThreadPoolExecutor(max_workers=args.max_workers) as executor:
-            executor.map(lambda i: send_request(url, i, args.verbose), range(args.num_requests))
-    finally:
-        if hb_thread is not None:
-            hb_stop.set()
-            hb_thread.join(timeout=3)
-    runtime = time.time() - start_time
-    runtime_data['runtime'] = runtime
-
-    time.sleep(3)
-    stop_event.set()
-    resource_thread.join()
-
-    requests_per_second = results_counter['total'] / runtime if runtime > 0 else 0
+    boots = ContainerBoots(container_name, docker_path, docker_api)
+    boots.started()
+    measured = []
+    container_up = True
+    for core_index, cores in enumerate(allotments):
+        if core_index > 0:
+            boots.stopping()
+            stop_server_container(container_name, docker_path, docker_api, port=port)
+            if is_measure_quiet() and not args.verbose:
+                measure_quiet_msg(f"{container_name} | core sweep {core_index + 1}/{len(allotments)} | {cores} CPUs")
+            if not boot_container(args, container_name, url, docker_path, docker_api, cores=cores):
+                container_up = False
+                break
+            boots.started()
+            idle_window = record_idle_window(args.idle_seconds, container_name, args.verbose)
+        for index, num_requests in enumerate(points):
+            point_args = argparse.Namespace(**{**vars(args), "num_requests": num_requests})
+            fresh = index == 0
+            if index > 0 and args.restart_between_points:
+                logger.info(f"Restarting container '{container_name}' before sweep point {index + 1}/{len(points)}...")
+                boots.stopping()
+                stop_server_container(container_name, docker_path, docker_api, port=port)
+                if not boot_container(args, container_name, url, docker_path, docker_api, cores=cores):
+                    container_up = False
+                    break
+                boots.started()
+                idle_window = record_idle_window(args.idle_seconds, container_name, args.verbose)
+                fresh = True
+            if args.sweep and is_measure_quiet() and not args.verbose:
+                measure_quiet_msg(f"{container_name} | sweep point {index + 1}/{len(points)} | {load_description(point_args)}")
+            warmup = run_warmup(url, point_args, container_name) if fresh else None
+            repetition = 0
+            while True:
+                repetition += 1
+                if args.target_ci is not None:
+                    logger.info(f"Repetition {repetition} (max {args.max_repetitions}):")
+                logger.info(f"Sending {load_description(point_args)} to {url}...")
+                resource_thread, stop_event, resource_results = start_resource_collector(point_args, container_name, docker_path, docker_api)
+                point = run_load_point(url, point_args, container_name)
+                stop_event.set()
+                resource_thread.join()
+                boots.snapshot()
+                point.update(args=point_args, resources=resource_results, fresh=fresh and repetition == 1,
+                             warmup=warmup if repetition == 1 else None, point_index=index, repetition=repetition,
+                             cores=cores, idle_window=idle_window)
+                measured.append(point)
+                if args.target_ci is None or repetition >= args.max_repetitions:
+                    break
+                if repetition >= args.min_repetitions:
+                    reps = measured[-repetition:]
+                    wait_scaphandre_sample(output_json, point["start_time"] + point["runtime"], scaphandre_process)
+                    series = load_container_power_series(output_json, container_name, boots=boots)
+                    rps = [r["results"]["total"] / r["runtime"] for r in reps]
+                    energies = [compute_window_energy(series, r["start_time"], r["runtime"])[0] for r in reps]
+                    if ci_converged(rps, args.target_ci) and ci_converged(energies, args.target_ci):
+                        logger.info(f"Requests/s and Total Energy 95% CI within ±{args.target_ci:g}% after {repetition} repetitions")
+                        break
+        if not container_up:
+            break
 
     if is_measure_quiet() and not args.verbose:
         measure_quiet_msg(f"{container_name} | stopping Scaphandre + appending CSV …")
     logger.info("Waiting for Scaphandre...")
-    time.sleep(5)
+    if measured:
+        # Energy is interpolated up to the window end, so one report past the last window is enough
+        wait_scaphandre_sample(output_json, measured[-1]["start_time"] + measured[-1]["runtime"], scaphandre_process)
     stop_scaphandre(scaphandre_process)
-    container_id = None
-    result = subprocess.run(
-        [docker_path, "ps", "-q", "-f", f"name={container_name}"],
-        capture_output=True, text=True
-    )
-    if result.returncode == 0 and result.stdout.strip():
-        container_id = result.stdout.strip()
-    total_energy, average_power, total_samples = parse_json_and_compute_energy(
-        output_json, container_name, runtime, container_id=container_id
-    )
-    stop_server_container(container_name, docker_path)
+    series = load_container_power_series(output_json, container_name, boots=boots)
+    if not series:
+        logger.warning(f"No energy samples found for container '{container_name}' in {output_json}")
+    if container_up:
+        stop_server_container(container_name, docker_path, docker_api, port=port)
+
     measurement_type = getattr(args, 'measurement_type', None) or "unknown"
     http_workers_label = http_max_workers_label(args)
-    save_results_to_csv(args.output_csv, results_counter, total_energy, average_power, runtime, requests_per_second, 
-                       int(total_samples), resource_results['cpu'], resource_results['mem'], num_cores, args.server_image, measurement_type,
-                       extra_fields={"HTTP Max Workers": http_workers_label})
     csv_disp = args.output_csv or os.path.join("results_docker", f"{container_name}.csv")
-    if is_measure_quiet() and not args.verbose:
-        ok = results_counter["success"] == results_counter["total"]
-        cnt = (
-            f"{_M_GREEN}{results_counter['success']}/{results_counter['total']} ok{_M_NC}"
-            if ok
-            else f"{results_counter['success']}/{results_counter['total']}"
+    for index, point in enumerate(measured):
+        point_args, runtime, results, schedule = point["args"], point["runtime"], point["results"], point["schedule"]
+        # Warmup/cooldown of a sweep point stop at the neighbouring points' load windows
+        lower = measured[index - 1]["start_time"] + measured[index - 1]["runtime"] if index > 0 else float("-inf")
+        upper = measured[index + 1]["start_time"] if index + 1 < len(measured) else float("inf")
+        total_energy, average_power, total_samples, phase_energy = compute_window_energy(
+            series, point["start_time"], runtime, point["idle_window"], bounds=(lower, upper)
         )
-        measure_quiet_msg(
-            f"{container_name} | {cnt} | {runtime:.1f}s | {requests_per_second:.0f} req/s | "
-            f"{csv_disp}"
+        requests_per_second = results['total'] / runtime if runtime > 0 else 0
+        run_id = new_run_id()
+        timeline_file = save_timeline(
+            timeline_path(csv_disp, run_id), run_id,
+            timeline_columns(LoadTimeline.rows(point["timeline"]), point["start_time"], point["resources"]["samples"], series)
         )
-    else:
-        print_summary(results_counter, total_energy, average_power, runtime, requests_per_second, 
-                      resource_results['cpu'], resource_results['mem'], num_cores, output_json, args.output_csv, container_name,
-                      http_max_workers_label=http_workers_label)
+        logger.info(f"Timeline: {timeline_file}")
+        extra_fields = {"HTTP Max Workers": http_workers_label,
+                        "HTTP Engine": args.engine,
+                        "HTTP Connections": args.connections if args.engine in ("async", "raw") else "",
+                        "Load Processes": args.processes,
+                        **latency_csv_fields(point["latency_hist"]),
+                        **phase_csv_fields(point["phase_hists"]),
+                        **schedule_csv_fields(schedule),
+                        **client_csv_fields(point["client"], point["resources"]['cpu'].get('avg', 0.0),
+                                            core_csv_fields(args, point["cores"], num_cores)["Server Cores"]),
+                        **cpu_layout_csv_fields(args, point["cores"]),
+                        **core_csv_fields(args, point["cores"], num_cores),
+                        "Warmup Energy (J)": phase_energy['warmup'],
+                        "Cooldown Energy (J)": phase_energy['cooldown'],
+                        **idle_csv_fields(args.idle_seconds, phase_energy),
+                        "Sweep Point": f"{point['point_index'] + 1}/{len(points)}" if args.sweep else "",
+                        "Container Start": "fresh" if point["fresh"] else "reused",
+                        **warmup_csv_fields(point["warmup"]),
+                        **repetition_csv_fields(point["repetition"] if args.target_ci is not None else None),
+                        "Run ID": run_id}
+        save_results_to_csv(args.output_csv, results, total_energy, average_power, runtime, requests_per_second,
+                           int(total_samples), point["resources"]['cpu'], point["resources"]['mem'], num_cores, args.server_image, measurement_type,
+                           extra_fields=extra_fields)
+        point["row"] = {"total_energy": total_energy, "average_power": average_power, "total_samples": total_samples,
+                        "requests_per_second": requests_per_second, "extra_fields": extra_fields}
+        if is_measure_quiet() and not args.verbose:
+            ok = results["success"] == results["total"]
+            cnt = (
+                f"{_M_GREEN}{results['success']}/{results['total']} ok{_M_NC}"
+                if ok
+                else f"{results['success']}/{results['total']}"
+            )
+            bound = " | client-bound" if extra_fields["Client Bound"] == "yes" else ""
+            cores = f" | {point['cores']} CPUs" if point["cores"] is not None else ""
+            measure_quiet_msg(
+                f"{container_name}{cores} | {cnt} | {runtime:.1f}s | {requests_per_second:.0f} req/s{bound} | "
+                f"{csv_disp}"
+            )
+        else:
+            print_summary(results, total_energy, average_power, runtime, requests_per_second,
+                          point["resources"]['cpu'], point["resources"]['mem'], num_cores, output_json, args.output_csv, container_name,
+                          http_max_workers_label=http_workers_label, http_engine_label=http_engine_label(point_args),
+                          server_cores=point["cores"],
+                          latency_hist=point["latency_hist"], schedule=schedule, phase_energy=phase_energy,
+                          warmup=point["warmup"], phase_hists=point["phase_hists"], client=point["client"],
+                          client_bound_flag=extra_fields["Client Bound"] == "yes")
+        last_repetition = (index + 1 == len(measured) or measured[index + 1]["point_index"] != point["point_index"]
+                           or measured[index + 1]["cores"] != point["cores"])
+        if args.target_ci is not None and last_repetition:
+            save_repetition_summary(args.output_csv, measured[index + 1 - point["repetition"]:index + 1], num_cores,
+                                    args.server_image, measurement_type, args.target_ci)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -5,12 +5,30 @@ import subprocess
 import csv
 import argparse
 import json
+import math
+import re
+import struct
+import zlib
+import bisect
 import threading
+import multiprocessing
+import queue
+import uuid
+import glob
+import socket
+import http.client
+from collections import Counter
+from urllib.parse import quote, urlencode, urlsplit
 from datetime import datetime
 import logging
 import psutil
+import numpy as np
 import asyncio
 import websockets
+try:
+    import uvloop
+except ImportError:  # optional: faster event loop for the echo clients (pip install uvloop)
+    uvloop = None
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger()
@@ -36,6 +54,148 @@ def measure_quiet_heartbeat_interval_sec():
     except ValueError:
         return 60
 
+class LatencyHistogram:
+    """Fixed-memory log-bucketed latency histogram (HDR-style), recorded in microseconds.
+
+    Values below ``2**SUB_BUCKET_BITS`` us get exact buckets; above that every power of two is split
+    into ``2**(SUB_BUCKET_BITS - 1)`` linear sub-buckets, so the relative error stays under ~1.6%.
+    All clients of one event loop share an instance (no locking needed); instances merge exactly.
+    The sum of squares is kept alongside the sum for the stddev column.
+    """
+
+    SUB_BUCKET_BITS = 7
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+    HALF_SUB_BUCKETS = SUB_BUCKETS // 2
+    MAX_VALUE_US = (1 << 40) - 1  # ~12.7 days; larger values are clamped into the last bucket
+
+    def __init__(self):
+        self.counts = [0] * (self._index(self.MAX_VALUE_US) + 1)
+        self.count = 0
+        self.total_us = 0
+        self.total_sq_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    @classmethod
+    def _index(cls, value_us):
+        shift = value_us.bit_length() - cls.SUB_BUCKET_BITS
+        if shift <= 0:
+            return value_us
+        return shift * cls.HALF_SUB_BUCKETS + (value_us >> shift)
+
+    @classmethod
+    def _bucket_bounds(cls, index):
+        """Inclusive lower bound and width (us) of bucket *index*."""
+        if index < cls.SUB_BUCKETS:
+            return index, 1
+        shift = (index - cls.SUB_BUCKETS) // cls.HALF_SUB_BUCKETS + 1
+        return (index - shift * cls.HALF_SUB_BUCKETS) << shift, 1 << shift
+
+    @classmethod
+    def to_us(cls, seconds):
+        return min(max(int(seconds * 1e6), 0), cls.MAX_VALUE_US)
+
+    def record(self, seconds):
+        value_us = self.to_us(seconds)
+        self.counts[self._index(value_us)] += 1
+        self.count += 1
+        self.total_us += value_us
+        self.total_sq_us += value_us * value_us
+        if self.min_us is None or value_us < self.min_us:
+            self.min_us = value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def merge(self, other):
+        counts = self.counts
+        for i, c in enumerate(other.counts):
+            if c:
+                counts[i] += c
+        self.count += other.count
+        self.total_us += other.total_us
+        self.total_sq_us += other.total_sq_us
+        if other.min_us is not None and (self.min_us is None or other.min_us < self.min_us):
+            self.min_us = other.min_us
+        self.max_us = max(self.max_us, other.max_us)
+        return self
+
+    def percentile_ms(self, pct):
+        """Latency (ms) at percentile *pct* (0-100), using the bucket midpoint clamped to min/max."""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, int(round(self.count * pct / 100.0)))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if not c:
+                continue
+            seen += c
+            if seen >= rank:
+                low, width = self._bucket_bounds(i)
+                value_us = min(max(low + (width - 1) / 2.0, self.min_us), self.max_us)
+                return value_us / 1000.0
+        return self.max_us / 1000.0
+
+    def mean_ms(self):
+        return (self.total_us / self.count) / 1000.0 if self.count else 0.0
+
+    def stddev_ms(self):
+        """Population standard deviation (ms) from the exact sum and sum of squares."""
+        if self.count == 0:
+            return 0.0
+        mean_us = self.total_us / self.count
+        return math.sqrt(max(self.total_sq_us / self.count - mean_us * mean_us, 0.0)) / 1000.0
+
+    def min_ms(self):
+        return (self.min_us or 0) / 1000.0
+
+    def max_ms(self):
+        return self.max_us / 1000.0
+
+    def state(self):
+        """Plain-data snapshot for shipping between processes (see ``from_state``)."""
+        return (self.counts, self.count, self.total_us, self.total_sq_us, self.min_us, self.max_us)
+
+    @classmethod
+    def from_state(cls, state):
+        hist = cls()
+        hist.counts, hist.count, hist.total_us, hist.total_sq_us, hist.min_us, hist.max_us = state
+        hist.counts = list(hist.counts)
+        return hist
+
+    @classmethod
+    def from_counts(cls, buckets):
+        """Histogram from sparse ``{bucket_index: count}`` (one timeline bin); sums, min and max use bucket midpoints/bounds."""
+        hist = cls()
+        for i, c in buckets.items():
+            low, width = cls._bucket_bounds(i)
+            mid = low + (width - 1) // 2
+            hist.counts[i] = c
+            hist.count += c
+            hist.total_us += c * mid
+            hist.total_sq_us += c * mid * mid
+        if buckets:
+            hist.min_us = cls._bucket_bounds(min(buckets))[0]
+            low, width = cls._bucket_bounds(max(buckets))
+            hist.max_us = low + width - 1
+        return hist
+
+
+LATENCY_PERCENTILES = ((50, "P50"), (90, "P90"), (99, "P99"), (99.9, "P99.9"))
+
+
+def latency_csv_fields(hist):
+    """Latency columns of the WebSocket CSV (ms), named like the HTTP CSV's."""
+    fields = {
+        "Avg Latency (ms)": hist.mean_ms(),
+        "Min Latency (ms)": hist.min_ms(),
+        "Max Latency (ms)": hist.max_ms(),
+    }
+    for pct, label in LATENCY_PERCENTILES:
+        fields[f"{label} Latency (ms)"] = hist.percentile_ms(pct)
+    fields["Latency Stddev (ms)"] = hist.stddev_ms()
+    return fields
+
+
 # =====================
 # Argument Parsing
 # =====================
@@ -58,8 +218,45 @@ def parse_args():
     parser.add_argument('--bursts', type=int, default=10, help='Number of bursts (burst mode only)')
     parser.add_argument('--interval', type=float, default=1.0, help='Interval between bursts (seconds)')
     parser.add_argument('--duration', type=int, default=30, help='Test duration in seconds (stream mode)')
+    parser.add_argument('--window', type=int, default=int(os.environ.get("MEASURE_WS_WINDOW", "1")), help="Messages each client keeps in flight; above 1 a reader task matches echoes by sequence number while the writer keeps sending, and burst mode sends the --bursts messages in back-to-back groups of this size with --interval between groups (default: MEASURE_WS_WINDOW or 1 = ping-pong)")
+    parser.add_argument('--processes', type=int, default=int(os.environ.get("MEASURE_WS_PROCESSES", "1")), help="Client processes, each pinned to its own CPU with its own event loop; --clients are split across them and their histograms merged (default: MEASURE_WS_PROCESSES or 1)")
+    parser.add_argument('--event-loop', type=str, default=os.environ.get("MEASURE_WS_EVENT_LOOP", "auto"), choices=['auto', 'asyncio', 'uvloop'], help="Event loop of the echo clients: auto uses uvloop when installed (default: MEASURE_WS_EVENT_LOOP or auto)")
+    parser.add_argument('--verify', type=str, default=os.environ.get("MEASURE_WS_VERIFY", "sampled"), choices=['sampled', 'full'], help="Echo check: sampled (length, sequence number and a CRC over ~64 sampled bytes) or full (byte-for-byte) (default: MEASURE_WS_VERIFY or sampled)")
     parser.add_argument('--url', type=str, default='ws://localhost:8001/ws', help='WebSocket server URL')
-    return parser.parse_args()
+    parser.add_argument('--resource-sampler', type=str, default='cgroup', choices=['cgroup', 'docker'], help="Container CPU/memory sampler: cgroup (read cgroup v2 files directly, falls back to docker when not found) or docker (docker stats via the --docker-backend) (default: cgroup)")
+    parser.add_argument('--docker-backend', type=str, default='cli', choices=['cli', 'api'], help="Container lifecycle and docker stats via the docker CLI or the Engine API on /var/run/docker.sock (default: cli)")
+    parser.add_argument('--sample-interval', type=float, default=0.05, help="cgroup sampler interval in seconds (default: 0.05)")
+    warmup_group = parser.add_mutually_exclusive_group()
+    warmup_group.add_argument('--warmup-requests', type=int, default=None, help="Echo this many messages (split across --clients) before the measured phase; excluded from counters, latency and the energy window")
+    warmup_group.add_argument('--warmup-seconds', type=float, default=None, help="Like --warmup-requests, but warm up for this many seconds")
+    parser.add_argument('--idle-seconds', type=float, default=float(os.environ.get("MEASURE_IDLE_SECONDS", "0")), help="Record the container's idle power for this many seconds before load (again after every core-sweep boot) and report energy above it; Scaphandre samples every ~2 s, so use 10+ (default: MEASURE_IDLE_SECONDS or 0 = off)")
+    parser.add_argument('--server-cpus', type=parse_cpu_list, default=os.environ.get("MEASURE_SERVER_CPUS") or None, help="Pin the server container to these CPUs with docker --cpuset-cpus, e.g. 2-5 (default: MEASURE_SERVER_CPUS or unpinned)")
+    parser.add_argument('--client-cpus', type=parse_cpu_list, default=os.environ.get("MEASURE_CLIENT_CPUS") or None, help="Pin the load generator, Scaphandre and docker stats to these CPUs with sched_setaffinity, e.g. 0-1 (default: MEASURE_CLIENT_CPUS or unpinned)")
+    parser.add_argument('--core-sweep', type=parse_core_sweep, default=os.environ.get("MEASURE_CORE_SWEEP") or None, help="Core-scaling study: restart the container with each CPU allotment in turn (e.g. 1,2,4,8) and append one CSV row per allotment (default: MEASURE_CORE_SWEEP or off)")
+    parser.add_argument('--core-limit', type=str, default=os.environ.get("MEASURE_CORE_LIMIT", "quota"), choices=['quota', 'cpuset'], help="How --core-sweep limits the container: quota (docker --cpus N) or cpuset (the first N CPUs of --server-cpus, else of the host minus --client-cpus) (default: MEASURE_CORE_LIMIT or quota)")
+    parser.add_argument('--beam-schedulers', action='store_true', default=os.environ.get("MEASURE_BEAM_SCHEDULERS") == "1", help="With --core-sweep: also pass ERL_FLAGS='+S N:N' so BEAM runs one scheduler per allotted core (default: on when MEASURE_BEAM_SCHEDULERS=1)")
+    args = parser.parse_args()
+    if not 0.01 <= args.sample_interval <= 1.0:
+        parser.error("--sample-interval must be between 0.01 and 1.0 seconds")
+    if args.warmup_requests is not None and args.warmup_requests < 1:
+        parser.error("--warmup-requests must be a positive integer")
+    if args.warmup_seconds is not None and args.warmup_seconds <= 0:
+        parser.error("--warmup-seconds must be positive")
+    if args.idle_seconds < 0:
+        parser.error("--idle-seconds must not be negative")
+    if args.pattern == 'stream' and args.rate < 1:
+        parser.error("--rate must be a positive integer")
+    if args.window < 1:
+        parser.error("--window must be a positive integer")
+    if args.processes < 1:
+        parser.error("--processes must be a positive integer")
+    if args.processes > args.clients:
+        parser.error("--processes must not exceed --clients")
+    if args.event_loop == "uvloop" and uvloop is None:
+        parser.error("--event-loop uvloop needs the uvloop package (pip install uvloop)")
+    check_cpu_layout(parser, args)
+    check_core_sweep(parser, args)
+    return args
 
 # =====================
 # Resource Measurement (Scaphandre, CPU, Mem)
@@ -88,18 +285,111 @@ def check_prerequisites():
             logger.error("  - %s: %s", name, install_hint)
         sys.exit(1)
 
+# =====================
+# Readiness waits (instead of fixed sleeps)
+# =====================
+READINESS_POLL_INTERVAL = 0.1
+CONTAINER_START_TIMEOUT = 30     # docker run -> State.Status "running"
+PORT_RELEASE_TIMEOUT = 15        # container removed -> host port bindable again
+SCAPHANDRE_SAMPLE_TIMEOUT = 15   # Scaphandre started / load ended -> a report newer than that
+PROCESS_EXIT_TIMEOUT = 5
+DOCKER_STATS_FIRST_SAMPLE_TIMEOUT = 10
+
+
+def wait_until(predicate, timeout, what, interval=READINESS_POLL_INTERVAL):
+    """Poll predicate until it returns something truthy or timeout seconds pass; returns the last result."""
+    deadline = time.monotonic() + timeout
+    while True:
+        result = predicate()
+        if result or time.monotonic() >= deadline:
+            break
+        time.sleep(interval)
+    if not result:
+        logger.warning(f"Timed out after {timeout:g}s waiting for {what}")
+    return result
+
+
+def readiness_port(port_mapping, network="bridge"):
+    """Port the server is reachable on from the host: the published port, or the container port with --network host."""
+    parts = port_mapping.split(":")
+    return int(parts[-1] if network == "host" else parts[0])
+
+
+def port_accepting(host, port, timeout=0.5):
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def port_released(port):
+    """True once no listener holds port on the host (a new container could publish it)."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind(("0.0.0.0", port))
+            return True
+        except PermissionError:
+            # Privileged port without root: fall back to "nothing accepts connections"
+            return not port_accepting("127.0.0.1", port)
+        except OSError:
+            return False
+
+
+def container_state(container_name, docker_path, docker_api=None):
+    """Docker State.Status of the container ('running', 'exited', ...) or None when it does not exist."""
+    if docker_api is not None:
+        info = docker_api.inspect(container_name)
+        return info.get("State", {}).get("Status") if info else None
+    result = subprocess.run([docker_path, "inspect", "-f", "{{.State.Status}}", container_name],
+                            capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def container_exists(container_name, docker_path, docker_api=None):
+    if docker_api is not None:
+        return container_name in docker_api.ps(container_name)
+    result = subprocess.run([docker_path, "ps", "-a", "--filter", f"name={container_name}", "--format", "{{.Names}}"],
+                            capture_output=True, text=True)
+    return container_name in result.stdout.split()
+
+
+def latest_scaphandre_timestamp(output_json, tail_bytes=65536):
+    """Newest report timestamp in the tail of a Scaphandre JSON file, or None before the first report."""
+    try:
+        with open(output_json, "rb") as file:
+            file.seek(0, os.SEEK_END)
+            file.seek(max(0, file.tell() - tail_bytes))
+            tail = file.read().decode("utf-8", "ignore")
+    except OSError:
+        return None
+    stamps = re.findall(r'"timestamp"\s*:\s*([0-9]+(?:\.[0-9]+)?)', tail)
+    return max(float(s) for s in stamps) if stamps else None
+
+
+def wait_scaphandre_sample(output_json, after, scaphandre_process=None, timeout=SCAPHANDRE_SAMPLE_TIMEOUT):
+    """Block until Scaphandre has written a report stamped at or after `after` (or its process exited)."""
+    def ready():
+        if scaphandre_process is not None and scaphandre_process.poll() is not None:
+            return True
+        return (latest_scaphandre_timestamp(output_json) or 0.0) >= after
+    return wait_until(ready, timeout, f"a Scaphandre sample in {output_json}")
+
 def cleanup_existing_scaphandre():
     subprocess.run(["sudo", "pkill", "-9", "scaphandre"], capture_output=True, text=True, check=False)
-    time.sleep(2)
+    wait_until(lambda: subprocess.run(["pgrep", "-x", "scaphandre"], capture_output=True).returncode != 0,
+               PROCESS_EXIT_TIMEOUT, "old Scaphandre processes to exit")
 
 def start_scaphandre(output_json, scaphandre_path):
     os.makedirs("output", exist_ok=True)
     cmd = ["sudo", scaphandre_path, "json", "--containers", "-f", output_json]
+    launched = time.time()
     scaphandre_process = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
     )
-    time.sleep(2)
+    wait_scaphandre_sample(output_json, launched, scaphandre_process)
     if scaphandre_process.poll() is not None:
         out, err = scaphandre_process.communicate(timeout=1)
         err = (err or "").strip()
@@ -114,57 +404,342 @@ def start_scaphandre(output_json, scaphandre_path):
 
 def stop_scaphandre(scaphandre_process):
     scaphandre_process.terminate()
-    scaphandre_process.wait(timeout=5)
-    time.sleep(2)
+    scaphandre_process.wait(timeout=PROCESS_EXIT_TIMEOUT)
 
-def collect_resources_docker_stats(container_name, stop_event, docker_path, interval=0.5):
-    import re
+def collect_resources_docker_stats(container_name, stop_event, docker_path, interval=0.5, first_sample=None):
+    """Fallback sampler: poll ``docker stats --no-stream``.
+
+    One call can take about a second, so every sample is weighted by the measured gap since the
+    previous one rather than the nominal *interval*. *first_sample* (an Event) is set once the
+    first sample is in.
+    """
     cpu_usage = []
     mem_usage = []
-    sample_count = 0
+    sample_dts = []
+    last_t = time.time()
     while not stop_event.is_set():
+        cpu_val = 0.0
+        mem_val = 0.0
         try:
             stats_format = "{{.CPUPerc}},{{.MemUsage}}"
             cmd = [docker_path, "stats", container_name, "--no-stream", "--format", stats_format]
             result = subprocess.run(cmd, capture_output=True, text=True, check=True)
             output = result.stdout.strip()
-            if not output:
-                cpu_usage.append(0.0)
-                mem_usage.append(0.0)
-                time.sleep(interval)
-                sample_count += 1
-                continue
-            cpu_str, mem_str = output.split(',')
-            cpu_val = float(cpu_str.strip().replace('%',''))
-            mem_usage_part = mem_str.strip().split('/')[0].strip()
-            mem_match = re.match(r"([\d.]+)([KMG]iB)", mem_usage_part)
-            mem_val = 0.0
-            if mem_match:
-                mem_num = float(mem_match.group(1))
-                mem_unit = mem_match.group(2)
-                if mem_unit == 'KiB':
-                    mem_val = mem_num / 1024
-                elif mem_unit == 'MiB':
-                    mem_val = mem_num
-                elif mem_unit == 'GiB':
-                    mem_val = mem_num * 1024
-            cpu_usage.append(cpu_val)
-            mem_usage.append(mem_val)
+            if output:
+                cpu_str, mem_str = output.split(',')
+                cpu_val = float(cpu_str.strip().replace('%',''))
+                mem_usage_part = mem_str.strip().split('/')[0].strip()
+                mem_match = re.match(r"([\d.]+)([KMG]iB)", mem_usage_part)
+                if mem_match:
+                    mem_num = float(mem_match.group(1))
+                    mem_unit = mem_match.group(2)
+                    if mem_unit == 'KiB':
+                        mem_val = mem_num / 1024
+                    elif mem_unit == 'MiB':
+                        mem_val = mem_num
+                    elif mem_unit == 'GiB':
+                        mem_val = mem_num * 1024
         except Exception:
-            cpu_usage.append(0.0)
-            mem_usage.append(0.0)
+            cpu_val = 0.0
+            mem_val = 0.0
+        now = time.time()
+        cpu_usage.append(cpu_val)
+        mem_usage.append(mem_val)
+        sample_dts.append(now - last_t)
+        last_t = now
+        if first_sample is not None:
+            first_sample.set()
         time.sleep(interval)
-        sample_count += 1
-    cpu_avg = sum(cpu_usage) / len(cpu_usage) if cpu_usage else 0.0
+    elapsed = sum(sample_dts)
+    cpu_total = sum(c * dt for c, dt in zip(cpu_usage, sample_dts))  # cumulative CPU (%*s)
+    mem_total = sum(m * dt for m, dt in zip(mem_usage, sample_dts))  # cumulative memory (MB*s)
+    cpu_avg = cpu_total / elapsed if elapsed > 0 else 0.0
     cpu_peak = max(cpu_usage) if cpu_usage else 0.0
-    cpu_total = sum(cpu_usage) * interval if cpu_usage else 0.0  # cumulative CPU (%*s)
-    mem_avg = sum(mem_usage) / len(mem_usage) if mem_usage else 0.0
+    mem_avg = mem_total / elapsed if elapsed > 0 else 0.0
     mem_peak = max(mem_usage) if mem_usage else 0.0
-    mem_total = sum(mem_usage) * interval if mem_usage else 0.0  # cumulative memory (MB*s)
     return {'avg': cpu_avg, 'peak': cpu_peak, 'total': cpu_total}, \
            {'avg': mem_avg, 'peak': mem_peak, 'total': mem_total}
 
 
+# =====================
+# cgroup v2 sampler (--resource-sampler cgroup)
+# =====================
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+def get_container_id(container_name, docker_path, docker_api=None):
+    """Full container ID (cgroup directories are named after it), or None if the container is unknown."""
+    if docker_api is not None:
+        info = docker_api.inspect(container_name)
+        return info["Id"] if info else None
+    result = subprocess.run([docker_path, "inspect", "--format", "{{.Id}}", container_name],
+                            capture_output=True, text=True)
+    container_id = result.stdout.strip()
+    return container_id if result.returncode == 0 and container_id else None
+
+
+def find_container_cgroup_dir(container_id, cgroup_root=CGROUP_ROOT):
+    """Locate the container's cgroup v2 directory under *cgroup_root* (systemd or cgroupfs driver layout)."""
+    if not container_id:
+        return None
+    for rel in (os.path.join("system.slice", f"docker-{container_id}.scope"), os.path.join("docker", container_id)):
+        path = os.path.join(cgroup_root, rel)
+        if os.path.isfile(os.path.join(path, "cpu.stat")):
+            return path
+    for pattern in (f"*/*{container_id}*", f"*/*/*{container_id}*"):
+        for path in sorted(glob.glob(os.path.join(cgroup_root, pattern))):
+            if os.path.isfile(os.path.join(path, "cpu.stat")):
+                return path
+    return None
+
+
+def read_cgroup_sample(cgroup_dir):
+    """Return ``(cpu_usage_usec, memory_bytes)`` from cpu.stat, memory.current and memory.stat.
+
+    Memory excludes inactive page cache (``inactive_file``), which is what ``docker stats`` reports on cgroup v2.
+    """
+    usage_usec = 0
+    with open(os.path.join(cgroup_dir, "cpu.stat")) as f:
+        for line in f:
+            key, _, value = line.partition(" ")
+            if key == "usage_usec":
+                usage_usec = int(value)
+                break
+    with open(os.path.join(cgroup_dir, "memory.current")) as f:
+        mem_bytes = int(f.read().strip())
+    try:
+        with open(os.path.join(cgroup_dir, "memory.stat")) as f:
+            for line in f:
+                key, _, value = line.partition(" ")
+                if key == "inactive_file":
+                    mem_bytes -= int(value)
+                    break
+    except OSError:
+        pass
+    return usage_usec, max(mem_bytes, 0)
+
+
+def summarize_cgroup_samples(samples):
+    """Reduce ``(timestamp, cpu_usage_usec, mem_bytes)`` samples to the ``{'avg','peak','total'}`` CPU/memory dicts.
+
+    CPU% between two samples is usage delta over wall-clock delta (100% = one core); averages and the
+    cumulative totals (%*s, MB*s) integrate over the real timestamps.
+    """
+    mib = 1024 * 1024
+    cpu_pcts = []
+    elapsed = 0.0
+    mem_total = 0.0
+    for (t0, u0, m0), (t1, u1, m1) in zip(samples, samples[1:]):
+        dt = t1 - t0
+        if dt <= 0:
+            continue
+        cpu_pcts.append((u1 - u0) / 1e6 / dt * 100.0)
+        mem_total += (m0 + m1) / 2.0 / mib * dt
+        elapsed += dt
+    cpu_total = (samples[-1][1] - samples[0][1]) / 1e6 * 100.0 if len(samples) > 1 else 0.0
+    cpu_avg = cpu_total / elapsed if elapsed > 0 else 0.0
+    cpu_peak = max(cpu_pcts) if cpu_pcts else 0.0
+    if elapsed > 0:
+        mem_avg = mem_total / elapsed
+    else:
+        mem_avg = samples[0][2] / mib if samples else 0.0
+    mem_peak = max(m for _, _, m in samples) / mib if samples else 0.0
+    return {'avg': cpu_avg, 'peak': cpu_peak, 'total': cpu_total}, \
+           {'avg': mem_avg, 'peak': mem_peak, 'total': mem_total}
+
+
+def collect_resources_cgroup(cgroup_dir, stop_event, interval=0.05, samples=None):
+    """Sample the container's cgroup v2 files every *interval* seconds until *stop_event* is set.
+
+    Each sample is ``(time.time(), cpu_usage_usec, mem_bytes)`` and is also appended to *samples* when
+    given. A final sample is taken when the event fires, unless the previous one is under half an
+    interval old (a very short last gap would turn counter granularity into a bogus CPU peak).
+    Returns the same dicts as ``collect_resources_docker_stats``.
+    """
+    samples = [] if samples is None else samples
+    next_t = time.perf_counter()
+    while True:
+        try:
+            usage_usec, mem_bytes = read_cgroup_sample(cgroup_dir)
+            now = time.time()
+            if not (stop_event.is_set() and samples and now - samples[-1][0] < interval / 2):
+                samples.append((now, usage_usec, mem_bytes))
+        except (OSError, ValueError):
+            pass  # cgroup disappears when the container stops
+        if stop_event.is_set():
+            break
+        next_t += interval
+        stop_event.wait(max(0.0, next_t - time.perf_counter()))
+    return summarize_cgroup_samples(samples)
+
+
+# =====================
+# Docker Engine API over the unix socket (--docker-backend api)
+# =====================
+DOCKER_SOCKET = "/var/run/docker.sock"
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP/1.1 connection to a unix domain socket (the Docker daemon's API endpoint)."""
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class DockerAPIError(RuntimeError):
+    def __init__(self, status, message):
+        super().__init__(f"Docker API error {status}: {message}")
+        self.status = status
+
+
+class DockerAPI:
+    """Minimal Docker Engine API client: run/stop/rm/ps/inspect plus the streaming stats endpoint.
+
+    Requests share one persistent keep-alive connection to *socket_path*; stats streams get their own.
+    Stop and remove are synchronous in the API, so no polling is needed after them.
+    """
+
+    def __init__(self, socket_path=DOCKER_SOCKET, timeout=60):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._conn = None
+
+    def _request(self, method, path, body=None, ok=(200, 201, 204)):
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        for attempt in (1, 2):
+            conn = self._conn or _UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+                self._conn = conn
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # Daemon closed the idle keep-alive connection: reconnect once.
+                conn.close()
+                self._conn = None
+                if attempt == 2:
+                    raise
+        if resp.status not in ok:
+            try:
+                message = json.loads(data).get("message", "")
+            except ValueError:
+                message = data.decode(errors="replace")
+            raise DockerAPIError(resp.status, message)
+        return resp.status, json.loads(data) if data else None
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def inspect(self, name):
+        """Container JSON for *name*, or None if it does not exist."""
+        status, data = self._request("GET", f"/containers/{quote(name)}/json", ok=(200, 404))
+        return data if status == 200 else None
+
+    def ps(self, name=None, all=True):
+        """Names of containers (optionally filtered by *name*, like ``docker ps -a --filter name=``)."""
+        query = {"all": "1" if all else "0"}
+        if name:
+            query["filters"] = json.dumps({"name": [name]})
+        _, data = self._request("GET", f"/containers/json?{urlencode(query)}")
+        return [n.lstrip("/") for c in data or [] for n in c.get("Names", [])]
+
+    def run(self, image, name, port_mapping=None, network="bridge", env=None, cpuset_cpus=None, nano_cpus=None):
+        """Create and start a detached container, like ``docker run -d --cgroupns=host --ulimit nofile=...``."""
+        host_config = {
+            "CgroupnsMode": "host",
+            "Ulimits": [{"Name": "nofile", "Soft": 100000, "Hard": 100000}],
+        }
+        if cpuset_cpus:
+            host_config["CpusetCpus"] = cpuset_cpus
+        if nano_cpus:
+            host_config["NanoCpus"] = nano_cpus
+        body = {"Image": image, "HostConfig": host_config}
+        if env:
+            body["Env"] = [f"{k}={v}" for k, v in env.items()]
+        if network == "host":
+            host_config["NetworkMode"] = "host"
+        elif port_mapping:
+            parts = port_mapping.split(":")
+            container_port = parts[-1] if "/" in parts[-1] else f"{parts[-1]}/tcp"
+            binding = {"HostPort": parts[-2]}
+            if len(parts) == 3:
+                binding["HostIp"] = parts[0]
+            body["ExposedPorts"] = {container_port: {}}
+            host_config["PortBindings"] = {container_port: [binding]}
+        _, created = self._request("POST", f"/containers/create?{urlencode({'name': name})}", body)
+        self._request("POST", f"/containers/{created['Id']}/start", ok=(204, 304))
+        return created["Id"]
+
+    def stop(self, name, timeout=10, missing_ok=False):
+        ok = (204, 304, 404) if missing_ok else (204, 304)
+        self._request("POST", f"/containers/{quote(name)}/stop?t={int(timeout)}", ok=ok)
+
+    def remove(self, name, force=False, missing_ok=False):
+        ok = (204, 404) if missing_ok else (204,)
+        self._request("DELETE", f"/containers/{quote(name)}?force={'1' if force else '0'}", ok=ok)
+
+    def stats_stream(self, name):
+        """Yield decoded stats documents from ``/containers/{name}/stats?stream=1`` (about one per second)."""
+        conn = _UnixHTTPConnection(self.socket_path)
+        try:
+            conn.request("GET", f"/containers/{quote(name)}/stats?stream=1")
+            resp = conn.getresponse()
+            if resp.status != 200:
+                raise DockerAPIError(resp.status, resp.read().decode(errors="replace"))
+            for line in resp:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        finally:
+            conn.close()
+
+
+def docker_stats_sample(stats):
+    """Turn one Engine API stats document into a cgroup-style ``(cpu_usage_usec, mem_bytes)`` pair.
+
+    Memory excludes inactive page cache as ``docker stats`` does (``inactive_file`` on cgroup v2,
+    ``total_inactive_file`` on v1).
+    """
+    usage_usec = stats.get("cpu_stats", {}).get("cpu_usage", {}).get("total_usage", 0) // 1000
+    mem = stats.get("memory_stats", {})
+    mem_stats = mem.get("stats", {})
+    inactive = mem_stats.get("inactive_file", mem_stats.get("total_inactive_file", 0))
+    return usage_usec, max(mem.get("usage", 0) - inactive, 0)
+
+
+def collect_resources_docker_api(docker_api, container_name, stop_event, samples=None, first_sample=None):
+    """Read the streaming stats endpoint over one long-lived connection until *stop_event* is set.
+
+    Samples are ``(time.time(), cpu_usage_usec, mem_bytes)`` like the cgroup sampler's, and are
+    summarised the same way. The daemon emits a document roughly every second; *first_sample*
+    (an Event) is set once the first one is in.
+    """
+    samples = [] if samples is None else samples
+    try:
+        for stats in docker_api.stats_stream(container_name):
+            if stats.get("cpu_stats"):
+                usage_usec, mem_bytes = docker_stats_sample(stats)
+                samples.append((time.time(), usage_usec, mem_bytes))
+                if first_sample is not None:
+                    first_sample.set()
+            if stop_event.is_set():
+                break
+    except (OSError, ValueError, http.client.HTTPException, DockerAPIError) as e:
+        logger.warning("Docker API stats stream for '%s' ended: %s", container_name, e)
+    return summarize_cgroup_samples(samples)
+
+
 def _pid_in_container(pid, container_id):
     """Check if pid belongs to container via /proc/pid/cgroup (fallback when Scaphandre reports container=null)."""
     if not container_id or pid <= 0:
@@ -177,151 +752,1336 @@ def _pid_in_container(pid, container_id):
         return False
 
 
-def parse_json_and_compute_energy(file_name, container_name, runtime, container_id=None):
-    """Extract energy from Scaphandre JSON. Prefers Scaphandre's container field; falls back to cgroup when all container=null."""
+def container_pids(container_id):
+    """PIDs currently in the container, found by scanning /proc/<pid>/cgroup; empty once it has stopped."""
+    if not container_id:
+        return set()
+    return {int(name) for name in os.listdir("/proc") if name.isdigit() and _pid_in_container(int(name), container_id)}
+
+
+class ContainerBoots:
+    """Each boot of the server container during one Scaphandre recording, with the PIDs seen in it.
+
+    Restarts reuse the container name but not its ID or processes, and a stopped container's PIDs can no longer
+    be resolved through /proc. So PIDs are collected while each boot runs (``snapshot`` after every load point,
+    ``stopping`` right before it is stopped), and the container=null fallback matches each report against the
+    boot that was up at its timestamp.
+    """
+
+    def __init__(self, container_name, docker_path, docker_api=None):
+        self.container_name = container_name
+        self.docker_path = docker_path
+        self.docker_api = docker_api
+        self.container_ids = []
+        self.pids = []
+        self.stopped_at = []
+
+    def started(self):
+        """Record a boot that just passed its health check."""
+        container_id = get_container_id(self.container_name, self.docker_path, self.docker_api)
+        self.container_ids.append(container_id)
+        self.pids.append(container_pids(container_id))
+
+    def snapshot(self):
+        """Add the running boot's current PIDs."""
+        if self.container_ids:
+            self.pids[-1] |= container_pids(self.container_ids[-1])
+
+    def stopping(self):
+        """Take a last snapshot of the running boot before it is stopped; later reports belong to the next boot."""
+        self.snapshot()
+        self.stopped_at.append(time.time())
+
+    def pids_at(self, timestamp):
+        """PIDs of the boot that was up (or booting) at timestamp."""
+        if not self.pids:
+            return set()
+        return self.pids[min(bisect.bisect_left(self.stopped_at, timestamp), len(self.pids) - 1)]
+
+
+SCAPHANDRE_READ_CHUNK = 1 << 20          # characters read per chunk while streaming the JSON
+SCAPHANDRE_PROGRESS_EVERY = 256 << 20    # log parse progress every this many characters on big files
+
+
+def iter_scaphandre_entries(file_name, chunk_size=SCAPHANDRE_READ_CHUNK):
+    """Yield Scaphandre reports one at a time without loading the whole file.
+
+    Accepts a top-level JSON array as well as newline-delimited reports. Memory is bounded by one
+    read chunk plus the report being decoded. A truncated trailing report (Scaphandre stopped
+    mid-write) is skipped with a warning instead of failing the whole parse.
+    """
+    decoder = json.JSONDecoder()
+    total_size = os.path.getsize(file_name)
+    report_progress = total_size > SCAPHANDRE_PROGRESS_EVERY
+    next_progress = SCAPHANDRE_PROGRESS_EVERY
+    consumed = 0
+    buf = ""
+    pos = 0
+    eof = False
     with open(file_name, "r") as file:
-        data = json.load(file)
-    total_power_microwatts = 0.0
-    number_samples = 0
+        while True:
+            # Skip array brackets, separators and whitespace between reports
+            while pos < len(buf) and buf[pos] in " \t\r\n,[]":
+                pos += 1
+            if pos < len(buf):
+                try:
+                    entry, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        logger.warning(f"Ignoring truncated trailing data in Scaphandre output {file_name}")
+                        return
+                else:
+                    pos = end
+                    if isinstance(entry, dict):
+                        yield entry
+                    continue
+            elif eof:
+                return
+            chunk = file.read(chunk_size)
+            if not chunk:
+                eof = True
+                continue
+            buf = buf[pos:] + chunk
+            pos = 0
+            consumed += len(chunk)
+            if report_progress and consumed >= next_progress:
+                logger.info(f"Parsing Scaphandre output: {consumed >> 20}/{total_size >> 20} MB "
+                            f"({100.0 * consumed / total_size:.0f}%)")
+                next_progress += SCAPHANDRE_PROGRESS_EVERY
+
+
+def load_container_power_series(file_name, container_name, container_id=None, boots=None):
+    """Collect the container's power over time in a single streaming pass.
+
+    Returns [(timestamp_s, watts)] with one point per Scaphandre report, summed over the container's
+    processes. Prefers Scaphandre's container field; consumers with container=null are kept aside as
+    cgroup fallback candidates and only used when no consumer carries container metadata at all. The
+    fallback matches PIDs recorded per boot in ``boots`` (a ContainerBoots) when given, else it looks up
+    container_id in /proc, which only works while that container is still running.
+    """
+    named_series = []
+    fallback_series = []
     found_containers = set()
-    for entry in data:
+    pid_matches = {}
+
+    for entry in iter_scaphandre_entries(file_name):
+        timestamp = (entry.get("host") or {}).get("timestamp")
+        named_power = fallback_power = 0.0
         for consumer in entry.get("consumers", []):
+            power = consumer.get("consumption", 0.0)
+            if timestamp is None:
+                timestamp = consumer.get("timestamp")
             container = consumer.get("container")
             if container:
                 found_containers.add(container.get("name"))
-            if container and container.get("name") == container_name:
-                power = consumer.get("consumption", 0.0)
-                if power > 0:
-                    total_power_microwatts += power
-                    number_samples += 1
-    # Fallback: when Scaphandre reports container=null for all (e.g. cgroups v2), attribute by cgroup path
-    if number_samples == 0 and container_id and not found_containers:
-        for entry in data:
-            for consumer in entry.get("consumers", []):
-                if consumer.get("container"):
-                    continue
+                if container.get("name") == container_name and power > 0:
+                    named_power += power
+            elif boots is not None and not found_containers and power > 0:
+                if timestamp is not None and consumer.get("pid", 0) in boots.pids_at(float(timestamp)):
+                    fallback_power += power
+            elif container_id and not found_containers and power > 0:
                 pid = consumer.get("pid", 0)
-                power = consumer.get("consumption", 0.0)
-                if power > 0 and _pid_in_container(pid, container_id):
-                    total_power_microwatts += power
-                    number_samples += 1
-        if number_samples > 0:
+                if pid not in pid_matches:
+                    pid_matches[pid] = _pid_in_container(pid, container_id)
+                if pid_matches[pid]:
+                    fallback_power += power
+        if timestamp is None:
+            continue
+        if named_power > 0:
+            named_series.append((float(timestamp), named_power * 1e-6))
+        if fallback_power > 0:
+            fallback_series.append((float(timestamp), fallback_power * 1e-6))
+
+    series = named_series
+    # Fallback: when Scaphandre reports container=null for all (e.g. cgroups v2), attribute by cgroup path
+    if not series and (container_id or boots is not None) and not found_containers:
+        series = fallback_series
+        if series:
             logger.info(f"Using cgroup fallback for '{container_name}' (Scaphandre container=null on this system)")
-    if not found_containers and number_samples == 0:
+
+    if not found_containers and not series:
         logger.warning(f"No containers found in Scaphandre output {file_name}")
     elif found_containers:
         logger.info(f"Containers found in Scaphandre output: {found_containers}")
-    if container_name not in found_containers and number_samples == 0:
+    if container_name not in found_containers and not series:
         logger.warning(f"Container '{container_name}' not found in Scaphandre output!")
-    if number_samples == 0:
-        logger.warning(f"No energy samples found for container '{container_name}' in {file_name}")
-        return 0.0, 0.0, 0
+    series.sort()
+    return series
+
+
+def _power_at(series, t):
+    """Linearly interpolated power at t; held flat before the first and after the last point."""
+    i = bisect.bisect_left(series, (t,))
+    if i == 0:
+        return series[0][1]
+    if i == len(series):
+        return series[-1][1]
+    (t0, p0), (t1, p1) = series[i - 1], series[i]
+    if t1 == t0:
+        return p1
+    return p0 + (p1 - p0) * (t - t0) / (t1 - t0)
+
+
+def integrate_power(series, t_start, t_end):
+    """Energy in joules between t_start and t_end by the trapezoidal rule over (timestamp_s, watts) points."""
+    if not series or t_end <= t_start:
+        return 0.0
+    points = [(t_start, _power_at(series, t_start))]
+    points += [p for p in series if t_start < p[0] < t_end]
+    points.append((t_end, _power_at(series, t_end)))
+    return sum((t1 - t0) * (p0 + p1) / 2 for (t0, p0), (t1, p1) in zip(points, points[1:]))
+
+
+def idle_csv_fields(idle_seconds, phase_energy):
+    """CSV columns for the idle baseline; empty when no idle window was recorded."""
+    if phase_energy['idle_power'] is None:
+        return {"Idle Window (s)": idle_seconds or '', "Idle Power (W)": '', "Energy Above Idle (J)": ''}
+    return {
+        "Idle Window (s)": idle_seconds,
+        "Idle Power (W)": phase_energy['idle_power'],
+        "Energy Above Idle (J)": phase_energy['above_idle'],
+    }
+
+
+def record_idle_window(idle_seconds, container_name, verbose=False):
+    """Leave the container unloaded for idle_seconds while Scaphandre runs; return the (start, end) window or None."""
+    if idle_seconds <= 0:
+        return None
+    if is_measure_quiet() and not verbose:
+        measure_quiet_msg(f"{container_name} | idle baseline {idle_seconds:g}s …")
+    logger.info(f"Recording idle baseline for {idle_seconds:g}s...")
+    idle_start = time.time()
+    time.sleep(idle_seconds)
+    return idle_start, time.time()
+
+
+def compute_window_energy(series, start_time, runtime, idle_window=None, bounds=None):
+    """Energy figures for the load window start_time..start_time+runtime of a power series.
+
+    Returns (total_energy_joules, avg_power_watts, number_samples, phase_energy) where phase_energy holds
+    the joules Scaphandre saw before ('warmup') and after ('cooldown') the load window. With an
+    idle_window (t_start, t_end) it also holds the baseline 'idle_power' in watts and the load-window
+    energy above that baseline as 'above_idle'; both stay None without one.
+
+    Warmup and cooldown run from the load window out to bounds (t_start, t_end), which default to the
+    first and last sample; sweeps pass the neighbouring points' windows so phases do not overlap.
+    """
+    phase_energy = {'warmup': 0.0, 'cooldown': 0.0, 'idle_power': None, 'above_idle': None}
+    if not series:
+        return 0.0, 0.0, 0, phase_energy
 
-    avg_power_watts = (total_power_microwatts / number_samples) * 1e-6
-    total_energy_joules = avg_power_watts * runtime
-    return total_energy_joules, avg_power_watts, number_samples
+    end_time = start_time + runtime
+    lower, upper = bounds or (series[0][0], series[-1][0])
+    lower, upper = max(lower, series[0][0]), min(upper, series[-1][0])
+    number_samples = sum(1 for t, _ in series if start_time <= t <= end_time)
+    total_energy_joules = integrate_power(series, start_time, end_time)
+    avg_power_watts = total_energy_joules / runtime if runtime > 0 else 0.0
+    phase_energy['warmup'] = integrate_power(series, lower, min(start_time, upper))
+    phase_energy['cooldown'] = integrate_power(series, max(end_time, lower), upper)
+    if idle_window is not None and idle_window[1] > idle_window[0]:
+        idle_start, idle_end = idle_window
+        phase_energy['idle_power'] = integrate_power(series, idle_start, idle_end) / (idle_end - idle_start)
+        phase_energy['above_idle'] = total_energy_joules - phase_energy['idle_power'] * runtime
+    return total_energy_joules, avg_power_watts, number_samples, phase_energy
 
 # =====================
 # Container Lifecycle
 # =====================
-def cleanup_existing_container(container_name, docker_path):
+def cleanup_existing_container(container_name, docker_path, docker_api=None, port=None):
     logger.info(f"Cleaning up any existing container named '{container_name}'...")
-    subprocess.run([docker_path, "stop", container_name], capture_output=True, text=True, check=False)
-    subprocess.run([docker_path, "rm", "-f", container_name], capture_output=True, text=True, check=False)
-    for _ in range(5):
-        result = subprocess.run([docker_path, "ps", "-a", "--filter", f"name={container_name}", "--format", "{{.Names}}"], capture_output=True, text=True)
-        if container_name not in result.stdout:
-            break
-        time.sleep(1)
+    if docker_api is not None:
+        docker_api.remove(container_name, force=True, missing_ok=True)
     else:
+        subprocess.run([docker_path, "stop", container_name], capture_output=True, text=True, check=False)
+        subprocess.run([docker_path, "rm", "-f", container_name], capture_output=True, text=True, check=False)
+    if not wait_until(lambda: not container_exists(container_name, docker_path, docker_api), PROCESS_EXIT_TIMEOUT,
+                      f"container '{container_name}' to be removed"):
         logger.warning(f"Container '{container_name}' could not be removed after multiple attempts.")
-    time.sleep(2)
+    if port is not None:
+        # Ensure the port is released (docker-proxy can linger after long runs)
+        wait_until(lambda: port_released(port), PORT_RELEASE_TIMEOUT, f"port {port} to be released")
 
-def start_server_container(server_image, port_mapping, container_name, docker_path, network="bridge"):
-    cleanup_existing_container(container_name, docker_path)
+def start_server_container(server_image, port_mapping, container_name, docker_path, network="bridge", docker_api=None,
+                           cpuset_cpus=None, nano_cpus=None, env=None):
+    cleanup_existing_container(container_name, docker_path, docker_api, port=readiness_port(port_mapping, network))
     # --cgroupns=host: needed for Scaphandre to detect container names on cgroups v2
-    cmd = [docker_path, "run", "-d", "--cgroupns=host", "--ulimit", "nofile=100000:100000", "--name", container_name]
-    if network == "host":
-        cmd.extend(["--network", "host"])
+    if docker_api is not None:
+        try:
+            docker_api.run(server_image, container_name, port_mapping, network, env=env,
+                           cpuset_cpus=cpuset_cpus, nano_cpus=nano_cpus)
+        except DockerAPIError as e:
+            logger.error("Failed to start container: %s", e)
+            raise RuntimeError("Container failed to start")
     else:
-        cmd.extend(["-p", port_mapping])
-    cmd.append(server_image)
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        logger.error("Failed to start container. Docker stderr: %s", result.stderr or "(none)")
-        logger.error("If --cgroupns=host is unsupported, try: docker run --rm --cgroupns=host hello-world")
-        raise RuntimeError("Container failed to start")
-    time.sleep(5)
-
-def stop_server_container(container_name, docker_path):
-    subprocess.run([docker_path, "stop", container_name], capture_output=True, text=True, check=True)
-    subprocess.run([docker_path, "rm", container_name], capture_output=True, text=True, check=True)
-    time.sleep(2)
+        cmd = [docker_path, "run", "-d", "--cgroupns=host", "--ulimit", "nofile=100000:100000", "--name", container_name]
+        if network == "host":
+            cmd.extend(["--network", "host"])
+        else:
+            cmd.extend(["-p", port_mapping])
+        if cpuset_cpus:
+            cmd.extend(["--cpuset-cpus", cpuset_cpus])
+        if nano_cpus:
+            cmd.extend(["--cpus", f"{nano_cpus / 1e9:g}"])
+        for key, value in (env or {}).items():
+            cmd.extend(["-e", f"{key}={value}"])
+        cmd.append(server_image)
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            logger.error("Failed to start container. Docker stderr: %s", result.stderr or "(none)")
+            logger.error("If --cgroupns=host is unsupported, try: docker run --rm --cgroupns=host hello-world")
+            raise RuntimeError("Container failed to start")
+    wait_until(lambda: container_state(container_name, docker_path, docker_api) not in (None, "created", "restarting"),
+               CONTAINER_START_TIMEOUT, f"container '{container_name}' to start")
+    state = container_state(container_name, docker_path, docker_api)
+    if state != "running":
+        logger.warning("Container '%s' is %s after start.", container_name, state or "missing")
+
+def stop_server_container(container_name, docker_path, docker_api=None, port=None):
+    if docker_api is not None:
+        docker_api.stop(container_name)
+        docker_api.remove(container_name)
+    else:
+        subprocess.run([docker_path, "stop", container_name], capture_output=True, text=True, check=True)
+        subprocess.run([docker_path, "rm", container_name], capture_output=True, text=True, check=True)
+    if port is not None:
+        wait_until(lambda: port_released(port), PORT_RELEASE_TIMEOUT, f"port {port} to be released")
+
+def start_resource_collector(args, container_name, docker_path, docker_api=None):
+    """Start the container CPU/memory sampler thread; returns (thread, stop_event, resource_results).
+
+    ``resource_results['samples']`` keeps the raw ``(time, cpu_usage_usec, mem_bytes)`` samples for the
+    timeline; it stays empty with the docker CLI sampler.
+    """
+    cgroup_dir = None
+    if args.resource_sampler == "cgroup":
+        cgroup_dir = find_container_cgroup_dir(get_container_id(container_name, docker_path, docker_api))
+        if cgroup_dir is None:
+            logger.warning("cgroup v2 directory for '%s' not found under %s; falling back to docker stats.", container_name, CGROUP_ROOT)
+    stop_event = threading.Event()
+    first_sample = threading.Event()
+    resource_results = {'cpu': {}, 'mem': {}, 'samples': []}
+    def collect():
+        if cgroup_dir is not None:
+            cpu_metrics, mem_metrics = collect_resources_cgroup(cgroup_dir, stop_event, args.sample_interval,
+                                                                samples=resource_results['samples'])
+        elif docker_api is not None:
+            cpu_metrics, mem_metrics = collect_resources_docker_api(docker_api, container_name, stop_event,
+                                                                    samples=resource_results['samples'], first_sample=first_sample)
+        else:
+            cpu_metrics, mem_metrics = collect_resources_docker_stats(container_name, stop_event, docker_path, first_sample=first_sample)
+        resource_results['cpu'] = cpu_metrics
+        resource_results['mem'] = mem_metrics
+
+    resource_thread = threading.Thread(target=collect)
+    resource_thread.start()
+
+    if cgroup_dir is None:
+        logger.info("Waiting for the first docker stats sample...")
+        wait_until(first_sample.is_set, DOCKER_STATS_FIRST_SAMPLE_TIMEOUT, "the first docker stats sample")
+    return resource_thread, stop_event, resource_results
+
+
+# =====================
+# Per-second timeline sidecar (<csv>_timeline/<run_id>.npz)
+# =====================
+TIMELINE_INTERVAL = 1.0  # seconds per timeline bin
+TIMELINE_PERCENTILES = (50, 90, 99, 99.9)
+
+
+def new_run_id():
+    """Identifier linking a CSV row to its timeline file: start time plus a short random suffix."""
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def timeline_path(output_csv, run_id):
+    """``results_docker/<name>.csv`` -> ``results_docker/<name>_timeline/<run_id>.npz``."""
+    return os.path.join(f"{os.path.splitext(output_csv)[0]}_timeline", f"{run_id}.npz")
+
+
+def _interpolate(times, values, t):
+    """Linear interpolation of a sampled series at *t*; NaN outside the sampled range."""
+    if not times or t < times[0] or t > times[-1]:
+        return math.nan
+    i = bisect.bisect_left(times, t)
+    if times[i] == t:
+        return values[i]
+    return values[i - 1] + (values[i] - values[i - 1]) * (t - times[i - 1]) / (times[i] - times[i - 1])
+
+
+def resource_timeline(samples, windows):
+    """Container CPU% and memory (MB) per ``(t_start, t_end)`` window from ``(time, cpu_usage_usec, mem_bytes)`` samples.
+
+    CPU interpolates the cumulative usage counter at both window edges, so ~1 s docker API samples work
+    as well as 50 ms cgroup ones; memory is the peak sample inside the window, else the interpolated value.
+    """
+    times = [s[0] for s in samples]
+    usage = [s[1] for s in samples]
+    mem = [s[2] / (1024 * 1024) for s in samples]
+    cpu_col, mem_col = [], []
+    for t0, t1 in windows:
+        used = _interpolate(times, usage, t1) - _interpolate(times, usage, t0)
+        cpu_col.append(used / 1e6 / (t1 - t0) * 100.0 if t1 > t0 else math.nan)
+        inside = mem[bisect.bisect_left(times, t0):bisect.bisect_right(times, t1)]
+        mem_col.append(max(inside) if inside else _interpolate(times, mem, (t0 + t1) / 2))
+    return cpu_col, mem_col
+
+
+def timeline_columns(rows, load_start, samples, series):
+    """Columns of the timeline file from ``(t_start, t_end, completed, errors, percentiles_ms)`` rows.
+
+    Times are offsets from *load_start*; CPU/memory come from the container sampler's *samples* and
+    power (W) from the Scaphandre *series*; missing data is NaN.
+    """
+    windows = [(row[0], row[1]) for row in rows]
+    cpu, mem = resource_timeline(samples or [], windows)
+    columns = {
+        "t": [t0 - load_start for t0, _ in windows],
+        "duration": [t1 - t0 for t0, t1 in windows],
+        "completed": [row[2] for row in rows],
+        "errors": [row[3] for row in rows],
+    }
+    for k, pct in enumerate(TIMELINE_PERCENTILES):
+        columns["p" + f"{pct:g}".replace(".", "") + "_ms"] = [row[4][k] for row in rows]
+    columns["cpu_pct"] = cpu
+    columns["mem_mb"] = mem
+    columns["power_w"] = [integrate_power(series, t0, t1) / (t1 - t0) if series and t1 > t0 else math.nan
+                          for t0, t1 in windows]
+    return columns
+
+
+def save_timeline(path, run_id, columns):
+    """Write one run's timeline as compressed numpy columns (read back with ``np.load``); returns *path*."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(path, run_id=np.array(run_id),
+                        **{name: np.asarray(values, dtype=np.float64) for name, values in columns.items()})
+    return path
+
+
+class EchoTimeline:
+    """Per-second message/error counts and latency buckets, binned by completion time since *start*.
+
+    The clients record into it from the event loop alongside their own counters; a bin is
+    ``[total, failure, {bucket_index: count}]`` so an idle second costs nothing.
+    """
+
+    def __init__(self, start, interval=TIMELINE_INTERVAL):
+        self.start = start
+        self.interval = interval
+        self.bins = {}
+
+    def _bin(self):
+        index = int((time.time() - self.start) / self.interval)
+        current = self.bins.get(index)
+        if current is None:
+            current = self.bins[index] = [0, 0, Counter()]
+        return current
+
+    def record(self, ok, latency=None):
+        current = self._bin()
+        current[0] += 1
+        if ok:
+            current[2][LatencyHistogram._index(LatencyHistogram.to_us(latency))] += 1
+        else:
+            current[1] += 1
+
+    def record_failures(self, count):
+        current = self._bin()
+        current[0] += count
+        current[1] += count
+
+    def state(self):
+        """Plain-data bins for shipping between processes (see ``merge_state``)."""
+        return {index: (total, failure, dict(buckets)) for index, (total, failure, buckets) in self.bins.items()}
+
+    def merge_state(self, state):
+        """Add another process's bins; both timelines must share (about) the same start."""
+        for index, (total, failure, buckets) in state.items():
+            current = self.bins.get(index)
+            if current is None:
+                current = self.bins[index] = [0, 0, Counter()]
+            current[0] += total
+            current[1] += failure
+            current[2].update(buckets)
+
+    def rows(self, end):
+        """``timeline_columns`` rows up to *end*, one per interval including empty ones (NaN percentiles)."""
+        rows = []
+        for index in range(max(math.ceil((end - self.start) / self.interval), max(self.bins, default=-1) + 1)):
+            total, failure, buckets = self.bins.get(index, (0, 0, {}))
+            hist = LatencyHistogram.from_counts(buckets)
+            pcts = tuple(hist.percentile_ms(pct) if hist.count else math.nan for pct in TIMELINE_PERCENTILES)
+            t_start = self.start + index * self.interval
+            rows.append((t_start, max(min(t_start + self.interval, end), t_start), total, failure, pcts))
+        return rows
+
+
+
+# =====================
+# Core-scaling sweep (--core-sweep)
+# =====================
+def parse_core_sweep(value):
+    """argparse type for ``--core-sweep 1,2,4,8``: positive CPU allotments, in the order given."""
+    try:
+        cores = [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid core sweep {value!r} (expected e.g. 1,2,4,8)")
+    if not cores or min(cores) < 1:
+        raise argparse.ArgumentTypeError("--core-sweep needs positive CPU counts")
+    return cores
+
+
+def core_pool(args):
+    """CPUs a cpuset-limited allotment is carved from: --server-cpus, else the host minus --client-cpus."""
+    if args.server_cpus:
+        return list(args.server_cpus)
+    client = set(args.client_cpus or ())
+    return [cpu for cpu in range(os.cpu_count() or 1) if cpu not in client]
+
+
+def check_core_sweep(parser, args):
+    if args.core_limit not in ("quota", "cpuset"):
+        parser.error(f"--core-limit must be quota or cpuset, got {args.core_limit!r}")
+    if args.beam_schedulers and not args.core_sweep:
+        parser.error("--beam-schedulers requires --core-sweep")
+    if args.core_sweep:
+        available = len(core_pool(args)) if args.core_limit == "cpuset" else server_core_count(args, os.cpu_count() or 1)
+        if max(args.core_sweep) > available:
+            parser.error(f"--core-sweep goes up to {max(args.core_sweep)} CPUs but only {available} are available to the server")
+
+
+def server_limits(args, cores=None):
+    """CPU limits for ``start_server_container``: --server-cpus, narrowed to *cores* during a core sweep.
+
+    In cpuset mode the container gets the first *cores* CPUs of ``core_pool``; in quota mode it keeps
+    its cpuset and gets ``--cpus cores``. With --beam-schedulers, ``ERL_FLAGS=+S cores:cores`` is passed
+    so BEAM runs one scheduler per allotted core (non-BEAM servers ignore it).
+    """
+    cpuset = args.server_cpus
+    nano_cpus = None
+    env = None
+    if cores is not None:
+        if args.core_limit == "cpuset":
+            cpuset = core_pool(args)[:cores]
+        else:
+            nano_cpus = cores * 10**9
+        if args.beam_schedulers:
+            env = {"ERL_FLAGS": f"+S {cores}:{cores}"}
+    return {"cpuset_cpus": format_cpu_list(cpuset) if cpuset else None, "nano_cpus": nano_cpus, "env": env}
+
+
+def core_csv_fields(args, cores, num_cores):
+    """CSV ``extra_fields`` for the server's CPU allotment; Server Cores is the x-axis of a core sweep."""
+    return {
+        "Server Cores": cores if cores is not None else server_core_count(args, num_cores),
+        "Core Limit": args.core_limit if cores is not None else ("cpuset" if args.server_cpus else ""),
+        "BEAM Schedulers": cores if cores is not None and args.beam_schedulers else "",
+    }
+
+
+# =====================
+# CPU placement (--server-cpus / --client-cpus)
+# =====================
+def parse_cpu_list(value):
+    """argparse type for a cpuset list such as ``0-3,6``; returns the sorted CPU ids."""
+    cpus = set()
+    try:
+        for part in value.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            first, sep, last = part.partition("-")
+            first, last = int(first), int(last) if sep else int(first)
+            if first < 0 or last < first:
+                raise ValueError(part)
+            cpus.update(range(first, last + 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid CPU list {value!r} (expected e.g. 0-3,6)")
+    if not cpus:
+        raise argparse.ArgumentTypeError("CPU list must not be empty")
+    return sorted(cpus)
+
+
+def format_cpu_list(cpus):
+    """Compact ``0-3,6`` form of a CPU id list, as ``docker run --cpuset-cpus`` takes it."""
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(f"{first}-{last}" if last > first else str(first) for first, last in ranges)
+
+
+def check_cpu_layout(parser, args):
+    """Validate --server-cpus/--client-cpus against this host; warn when the two sets share cores."""
+    host_cpus = os.cpu_count() or 1
+    if args.server_cpus and args.server_cpus[-1] >= host_cpus:
+        parser.error(f"--server-cpus {format_cpu_list(args.server_cpus)} exceeds the {host_cpus} CPUs of this host")
+    if args.client_cpus and not set(args.client_cpus) <= os.sched_getaffinity(0):
+        parser.error(f"--client-cpus {format_cpu_list(args.client_cpus)} is outside the CPUs this process may use "
+                     f"({format_cpu_list(os.sched_getaffinity(0))})")
+    if args.server_cpus and args.client_cpus:
+        shared = set(args.server_cpus) & set(args.client_cpus)
+        if shared:
+            logger.warning("--server-cpus and --client-cpus share CPUs %s; server and load generator will compete.",
+                           format_cpu_list(shared))
+
+
+def pin_client(args):
+    """Pin this process (and every thread and child started afterwards, Scaphandre included) to --client-cpus."""
+    if args.client_cpus:
+        os.sched_setaffinity(0, args.client_cpus)
+        logger.info(f"Load generator pinned to CPUs {format_cpu_list(args.client_cpus)}")
+
+
+def server_core_count(args, num_cores):
+    """CPUs the server container may run on: the --server-cpus set, else the whole host."""
+    return len(args.server_cpus) if args.server_cpus else num_cores
+
+
+def cpu_layout_csv_fields(args, cores=None):
+    """CSV ``extra_fields`` recording the CPU placement; empty when that side was left to the scheduler."""
+    return {
+        "Server CPUs": server_limits(args, cores)["cpuset_cpus"] or "",
+        "Client CPUs": format_cpu_list(args.client_cpus) if args.client_cpus else "",
+    }
+
+
+# =====================
+# Load generator self-accounting (psutil)
+# =====================
+CLIENT_SAMPLE_INTERVAL = 0.25  # seconds between psutil samples of the load generator's own processes
+CLIENT_BOUND_CPU = 90.0        # % of one core at which a generator process or thread counts as saturated
+
+
+def collect_client_resources(pids, stop_event, interval=CLIENT_SAMPLE_INTERVAL):
+    """Sample the load generator's own processes (*pids*) with psutil until *stop_event* is set.
+
+    CPU time is accumulated per process and per thread between samples (100% = one core); the
+    busiest process or thread shows whether one core of the harness was saturated. Returns
+    ``{'cpu_avg','cpu_peak','rss_peak','busiest_process','busiest_thread'}`` (RSS in MB), or None
+    when the run was too short for two samples.
+    """
+    procs = {}
+    for pid in pids:
+        try:
+            procs[pid] = psutil.Process(pid)
+        except psutil.NoSuchProcess:
+            pass
+    last_proc, last_thread = {}, {}
+    proc_cpu, thread_cpu = Counter(), Counter()
+    cpu_peak = rss_peak = elapsed = 0.0
+    last_t = None
+    stopping = False
+    while True:
+        now = time.perf_counter()
+        interval_cpu = 0.0
+        rss = 0
+        for pid, proc in list(procs.items()):
+            try:
+                with proc.oneshot():
+                    times = proc.cpu_times()
+                    threads = proc.threads()
+                    rss += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                del procs[pid]
+                continue
+            used = times.user + times.system
+            if pid in last_proc:
+                proc_cpu[pid] += used - last_proc[pid]
+                interval_cpu += used - last_proc[pid]
+            last_proc[pid] = used
+            for thread in threads:
+                key = (pid, thread.id)
+                used = thread.user_time + thread.system_time
+                if key in last_thread:
+                    thread_cpu[key] += used - last_thread[key]
+                last_thread[key] = used
+        if last_t is not None and now > last_t:
+            elapsed += now - last_t
+            cpu_peak = max(cpu_peak, interval_cpu / (now - last_t) * 100.0)
+        last_t = now
+        rss_peak = max(rss_peak, rss)
+        if stopping:
+            break
+        stopping = stop_event.wait(interval)
+    if elapsed <= 0:
+        return None
+    return {
+        'cpu_avg': sum(proc_cpu.values()) / elapsed * 100.0,
+        'cpu_peak': cpu_peak,
+        'rss_peak': rss_peak / (1024 * 1024),
+        'busiest_process': max(proc_cpu.values(), default=0.0) / elapsed * 100.0,
+        'busiest_thread': max(thread_cpu.values(), default=0.0) / elapsed * 100.0,
+    }
+
+
+def start_client_collector(pids):
+    """Start the load generator sampler thread; returns (thread, stop_event, client_results)."""
+    stop_event = threading.Event()
+    client_results = {}
+
+    def collect():
+        client_results['metrics'] = collect_client_resources(pids, stop_event)
+
+    client_thread = threading.Thread(target=collect, daemon=True)
+    client_thread.start()
+    return client_thread, stop_event, client_results
+
+
+def client_bound(client, server_cpu_avg, server_cores):
+    """True when a generator process or thread sat at ``CLIENT_BOUND_CPU`` of a core while the server
+    averaged below ``CLIENT_BOUND_CPU`` of its *server_cores*: the harness, not the server, capped throughput."""
+    busiest = max(client['busiest_process'], client['busiest_thread'])
+    return busiest >= CLIENT_BOUND_CPU and server_cpu_avg < CLIENT_BOUND_CPU * max(1, server_cores or 1)
+
+
+def client_csv_fields(client, server_cpu_avg, server_cores):
+    """CSV ``extra_fields`` for the load generator's own usage; empty when it was not sampled."""
+    if client is None:
+        return {"Client CPU Avg (%)": "", "Client CPU Peak (%)": "", "Client RSS Peak (MB)": "",
+                "Client Busiest Process CPU (%)": "", "Client Busiest Thread CPU (%)": "", "Client Bound": ""}
+    return {
+        "Client CPU Avg (%)": client['cpu_avg'],
+        "Client CPU Peak (%)": client['cpu_peak'],
+        "Client RSS Peak (MB)": client['rss_peak'],
+        "Client Busiest Process CPU (%)": client['busiest_process'],
+        "Client Busiest Thread CPU (%)": client['busiest_thread'],
+        "Client Bound": "yes" if client_bound(client, server_cpu_avg, server_cores) else "no",
+    }
+
+
+def write_csv_row(filename, headers, row):
+    """Append row to filename; older CSVs with a different header are rewritten with the current columns."""
+    if not os.path.isfile(filename) or os.stat(filename).st_size == 0:
+        with open(filename, mode='w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(headers)
+            writer.writerow(row)
+        return
+
+    with open(filename, mode='r', newline='') as file:
+        existing = list(csv.reader(file))
+    if existing and existing[0] == headers:
+        with open(filename, mode='a', newline='') as file:
+            csv.writer(file).writerow(row)
+        return
+
+    # Older CSVs without new columns: rewrite with canonical header and padded rows.
+    migrated = []
+    if existing:
+        existing_header = existing[0]
+        for old_row in existing[1:]:
+            row_dict = {key: old_row[i] for i, key in enumerate(existing_header) if i < len(old_row)}
+            migrated.append([row_dict.get(k, '') for k in headers])
+    migrated.append(row)
+    with open(filename, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(headers)
+        writer.writerows(migrated)
 
 # =====================
 # WebSocket Benchmark Logic
 # =====================
-async def echo_burst_client(url, size_kb, bursts, interval, results, client_id, verbose=False):
-    latencies = []
+ECHO_HEADER = struct.Struct("!Q")  # per-client sequence number leading every message
+ECHO_CHECK_SAMPLES = 64            # body bytes covered by the sampled CRC
+
+
+class EchoPayload:
+    """One immutable random body per message size, shared by every client.
+
+    A message is the 8-byte sequence number followed by the shared body. Each client copies the body
+    once into its own send buffer (``buffer``) and ``message`` stamps the sequence number into it in
+    place, so nothing is copied per message. An echo passes when its length and sequence number match
+    and a CRC over ~64 evenly spaced body bytes equals the precomputed one; ``full=True`` compares the
+    whole body instead (``--verify full``).
+    """
+
+    _bodies = {}
+
+    def __init__(self, size, full=False):
+        self.size = max(size, ECHO_HEADER.size)
+        body = self._bodies.get(self.size)
+        if body is None:
+            body = self._bodies[self.size] = os.urandom(self.size - ECHO_HEADER.size)
+        self.body = memoryview(body)
+        self.full = full
+        self.stride = max(1, len(body) // ECHO_CHECK_SAMPLES)
+        self.crc = zlib.crc32(body[::self.stride])
+
+    def buffer(self):
+        """A new per-client send buffer holding the shared body after room for the header."""
+        buf = bytearray(self.size)
+        buf[ECHO_HEADER.size:] = self.body
+        return buf
+
+    def message(self, buf, seq):
+        """Write *seq* into the header of the client's *buf* and return it for sending."""
+        ECHO_HEADER.pack_into(buf, 0, seq)
+        return buf
+
+    def check(self, resp, seq):
+        """True when *resp* is the echo of message *seq*."""
+        if not isinstance(resp, bytes) or len(resp) != self.size or ECHO_HEADER.unpack_from(resp)[0] != seq:
+            return False
+        if self.full:
+            return resp.startswith(self.body, ECHO_HEADER.size)
+        return zlib.crc32(resp[ECHO_HEADER.size::self.stride]) == self.crc
+
+
+def echo_payload(args):
+    return EchoPayload(args.size_kb * 1024, full=args.verify == "full")
+
+
+STREAM_LATE_THRESHOLD = 0.010  # seconds behind its slot before a stream message counts as late (well above sleep wake-up jitter)
+
+
+class StreamSchedule:
+    """Absolute-deadline send schedule of one stream client: slot *k* is due at ``start + phase + k / rate``.
+
+    Deadlines never drift with the round-trip time: a slot whose due time has passed is sent at once,
+    and its latency is measured from the due time, so waiting on a slow echo is charged to the
+    message (coordinated-omission correction). A message leaving more than ``STREAM_LATE_THRESHOLD``
+    after its slot is late; slots still unsent when the duration ends are missed. *phase* staggers
+    the clients so they do not all send on the same tick.
+    """
+
+    def __init__(self, rate, duration, phase=0.0):
+        self.rate = rate
+        self.duration = duration
+        self.interval = 1.0 / rate
+        self.phase = phase
+        self.scheduled = int(rate * duration)
+        self.start = self.end = None
+        self.issued = 0
+        self.late = 0
+
+    def begin(self):
+        """Start the clock (once the connection is up, so the handshake does not eat into the slots)."""
+        self.start = time.perf_counter() + self.phase
+        self.end = self.start + self.duration
+
+    def claim(self):
+        """Due time (``time.perf_counter``) of the next slot, or None once the schedule is over."""
+        if self.issued >= self.scheduled or time.perf_counter() >= self.end:
+            return None
+        due = self.start + self.issued * self.interval
+        self.issued += 1
+        return due
+
+    async def wait(self, due):
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def note_sent(self, due):
+        if time.perf_counter() - due > STREAM_LATE_THRESHOLD:
+            self.late += 1
+
+    @property
+    def missed(self):
+        return self.scheduled - self.issued
+
+    def state(self):
+        return (self.scheduled, self.issued, self.late)
+
+    @classmethod
+    def from_state(cls, rate, duration, state):
+        """Slot accounting of another process's clients (see ``stream_csv_fields``)."""
+        schedule = cls(rate, duration)
+        schedule.scheduled, schedule.issued, schedule.late = state
+        return schedule
+
+
+def stream_csv_fields(args, client_results):
+    """Offered vs. achieved send rate over all stream clients; empty for burst runs."""
+    if args.pattern != 'stream':
+        return {"Offered Rate (msg/s)": "", "Achieved Rate (msg/s)": "", "Late Messages": "", "Missed Slots": ""}
+    schedules = [r['schedule'] for r in client_results]
+    return {
+        "Offered Rate (msg/s)": sum(s.scheduled for s in schedules) / args.duration,
+        "Achieved Rate (msg/s)": sum(s.issued for s in schedules) / args.duration,
+        "Late Messages": sum(s.late for s in schedules),
+        "Missed Slots": sum(s.missed for s in schedules),
+    }
+
+
+def record_echo(results, ok, latency):
+    """Count one echo round trip (*latency* in seconds) in the client's counters, histogram and timeline."""
+    results['total'] += 1
+    if ok:
+        results['success'] += 1
+        results['hist'].record(latency)
+    else:
+        results['fail'] += 1
+    results['timeline'].record(ok, latency)
+
+
+def record_failures(results, count):
+    """Count *count* messages that were never echoed (connection error) as failures."""
+    results['fail'] += count
+    results['total'] += count
+    results['timeline'].record_failures(count)
+
+
+async def echo_burst_client(url, payload, bursts, interval, results, client_id, verbose=False):
     completed_bursts = 0
     try:
         async with websockets.connect(url, max_size=None, ping_interval=None) as ws:
-            payload = os.urandom(size_kb * 1024)
+            buf = payload.buffer()
             for b in range(bursts):
+                message = payload.message(buf, b)
                 start = time.perf_counter()
-                await ws.send(payload)
+                await ws.send(message)
                 resp = await ws.recv()
-                end = time.perf_counter()
-                latency = (end - start) * 1000
-                if resp == payload:
-                    latencies.append(latency)
-                    results['success'] += 1
-                else:
-                    results['fail'] += 1
-                results['total'] += 1
+                latency = time.perf_counter() - start
+                record_echo(results, payload.check(resp, b), latency)
                 completed_bursts += 1
                 if verbose:
-                    logger.info(f"[Client {client_id}] Burst {b+1}/{bursts} latency: {latency:.2f} ms")
+                    logger.info(f"[Client {client_id}] Burst {b+1}/{bursts} latency: {latency * 1000:.2f} ms")
                 await asyncio.sleep(interval)
     except Exception as e:
         logger.warning(f"[Client {client_id}] WebSocket connection error: {e}")
         # Count only the unfinished bursts as failures to avoid over-counting.
-        remaining_bursts = max(0, bursts - completed_bursts)
-        results['fail'] += remaining_bursts
-        results['total'] += remaining_bursts
-    results['latencies'].extend(latencies)
+        record_failures(results, max(0, bursts - completed_bursts))
 
-async def echo_stream_client(url, size_kb, rate, duration, results, client_id, verbose=False):
-    latencies = []
+async def echo_stream_client(url, payload, schedule, results, client_id, verbose=False):
     try:
         async with websockets.connect(url, max_size=None, ping_interval=None) as ws:
-            payload = os.urandom(size_kb * 1024)
-            end_time = time.time() + duration
-            while time.time() < end_time:
-                start = time.perf_counter()
-                await ws.send(payload)
+            schedule.begin()
+            buf = payload.buffer()
+            seq = 0
+            while True:
+                due = schedule.claim()
+                if due is None:
+                    break
+                message = payload.message(buf, seq)
+                await schedule.wait(due)
+                schedule.note_sent(due)
+                await ws.send(message)
                 resp = await ws.recv()
-                end = time.perf_counter()
-                latency = (end - start) * 1000
-                if resp == payload:
-                    latencies.append(latency)
-                    results['success'] += 1
-                else:
-                    results['fail'] += 1
-                results['total'] += 1
+                latency = time.perf_counter() - due
+                record_echo(results, payload.check(resp, seq), latency)
+                seq += 1
                 if verbose:
-                    logger.info(f"[Client {client_id}] Stream latency: {latency:.2f} ms")
-                await asyncio.sleep(1.0 / rate)
+                    logger.info(f"[Client {client_id}] Stream latency: {latency * 1000:.2f} ms")
     except Exception as e:
         logger.warning(f"[Client {client_id}] WebSocket stream error: {e}")
         # Surface stream session failures in totals instead of silently dropping them.
-        results['fail'] += 1
-        results['total'] += 1
-    results['latencies'].extend(latencies)
+        record_failures(results, 1)
+
+async def echo_window_client(url, payload, window, results, client_id, count=None, schedule=None, pause=0.0, verbose=False):
+    """Pipelined echo: keep up to *window* tagged messages in flight on one connection (``--window``).
+
+    The writer sends while a window slot is free: *count* messages in back-to-back groups of *window*
+    with a *pause* after each group (burst), or on the slots of a ``StreamSchedule`` (stream, latency
+    from the due time). A reader task matches
+    each echo to its send time by sequence number, falling back to the oldest outstanding message
+    for a garbled header.
+    """
+    sent_at = {}
+    slots = asyncio.Semaphore(window)
+    state = {'sent': 0, 'closed': False}
+
+    async def reader(ws):
+        try:
+            while True:
+                resp = await ws.recv()
+                now = time.perf_counter()
+                seq = ECHO_HEADER.unpack_from(resp)[0] if isinstance(resp, bytes) and len(resp) >= ECHO_HEADER.size else None
+                if seq not in sent_at:
+                    if not sent_at:
+                        continue
+                    seq = next(iter(sent_at))
+                latency = now - sent_at.pop(seq)
+                record_echo(results, payload.check(resp, seq), latency)
+                if verbose:
+                    logger.info(f"[Client {client_id}] Echo {seq} latency: {latency * 1000:.2f} ms ({len(sent_at)} in flight)")
+                slots.release()
+        except Exception:
+            # Wake the writer so it notices the connection is gone instead of waiting for a slot forever
+            state['closed'] = True
+            for _ in range(window):
+                slots.release()
+            raise
+
+    try:
+        async with websockets.connect(url, max_size=None, ping_interval=None) as ws:
+            reader_task = asyncio.create_task(reader(ws))
+            buf = payload.buffer()
+            if schedule is not None:
+                schedule.begin()
+            try:
+                while schedule is not None or state['sent'] < count:
+                    if schedule is not None:
+                        due = schedule.claim()
+                        if due is None:
+                            break
+                        await schedule.wait(due)
+                    await slots.acquire()
+                    if state['closed']:
+                        break
+                    seq = state['sent']
+                    message = payload.message(buf, seq)
+                    state['sent'] += 1
+                    if schedule is not None:
+                        schedule.note_sent(due)
+                        sent_at[seq] = due
+                    else:
+                        sent_at[seq] = time.perf_counter()
+                    await ws.send(message)
+                    if pause and state['sent'] % window == 0:
+                        await asyncio.sleep(pause)
+                for _ in range(window if not state['closed'] else 0):  # drain: all slots back = nothing in flight
+                    await slots.acquire()
+            finally:
+                reader_task.cancel()
+                try:
+                    await reader_task
+                except asyncio.CancelledError:
+                    pass
+    except Exception as e:
+        logger.warning(f"[Client {client_id}] WebSocket pipelined echo error: {e}")
+    # Unanswered (and, with a message count, unsent) messages are failures; a failed stream counts at least once.
+    missing = len(sent_at) + (count - state['sent'] if count is not None else 0)
+    if state['closed'] and count is None:
+        missing = max(missing, 1)
+    if missing:
+        record_failures(results, missing)
+
+async def echo_warmup_client(url, payload, num_messages, deadline, results):
+    """Back-to-back echoes until num_messages are done or deadline (time.monotonic) passes; only counted."""
+    try:
+        async with websockets.connect(url, max_size=None, ping_interval=None) as ws:
+            message = payload.message(payload.buffer(), 0)
+            sent = 0
+            while (num_messages is None or sent < num_messages) and (deadline is None or time.monotonic() < deadline):
+                await ws.send(message)
+                await ws.recv()
+                sent += 1
+                results['total'] += 1
+    except Exception as e:
+        logger.warning(f"[Warmup] WebSocket connection error: {e}")
+
+
+def run_warmup(url, args, container_name):
+    """Echo warmup over args.clients connections before the measured phase; excluded from all results.
+
+    Returns {'messages', 'duration', 'throughput'} for the CSV, or None when no warmup is configured.
+    """
+    if not args.warmup_requests and not args.warmup_seconds:
+        return None
+    desc = f"{args.warmup_requests} messages" if args.warmup_requests else f"{args.warmup_seconds:g}s"
+    if is_measure_quiet() and not args.verbose:
+        measure_quiet_msg(f"{container_name} | warmup {desc} …")
+    logger.info(f"Warming up with {desc} over {args.clients} client(s)...")
+    results = {'total': 0}
+
+    async def run_all():
+        deadline = time.monotonic() + args.warmup_seconds if args.warmup_seconds else None
+        counts = [None] * args.clients
+        if args.warmup_requests:
+            base, extra = divmod(args.warmup_requests, args.clients)
+            counts = [base + (1 if i < extra else 0) for i in range(args.clients)]
+        payload = echo_payload(args)
+        await asyncio.gather(*(echo_warmup_client(url, payload, n, deadline, results)
+                               for n in counts if n is None or n > 0))
+
+    warm_start = time.time()
+    asyncio.run(run_all())
+    duration = time.time() - warm_start
+    return {
+        "messages": results['total'],
+        "duration": duration,
+        "throughput": results['total'] / duration if duration > 0 else 0.0,
+    }
+
+
+def warmup_csv_fields(warmup):
+    if warmup is None:
+        return {"Warmup Messages": "", "Warmup Duration (s)": "", "Warmup Throughput (msg/s)": ""}
+    return {
+        "Warmup Messages": warmup["messages"],
+        "Warmup Duration (s)": warmup["duration"],
+        "Warmup Throughput (msg/s)": warmup["throughput"],
+    }
+
+def echo_clients(url, args, client_ids, latency_hist, timeline):
+    """Per-client result dicts and client coroutines for *client_ids* (global indices, so stream phases
+    stay evenly spread when the clients are split over processes); all share *latency_hist* and *timeline*."""
+    payload = echo_payload(args)
+    client_results = []
+    tasks = []
+    for i in client_ids:
+        r = {'success': 0, 'fail': 0, 'total': 0, 'hist': latency_hist, 'timeline': timeline}
+        if args.pattern == 'stream':
+            r['schedule'] = StreamSchedule(args.rate, args.duration, phase=i / (args.rate * args.clients))
+        client_results.append(r)
+        if args.mode == 'echo' and args.window > 1:
+            if args.pattern == 'burst':
+                tasks.append(echo_window_client(url, payload, args.window, r, i, count=args.bursts,
+                                                pause=args.interval, verbose=args.verbose))
+            else:
+                tasks.append(echo_window_client(url, payload, args.window, r, i,
+                                                schedule=r['schedule'], verbose=args.verbose))
+        elif args.mode == 'echo' and args.pattern == 'burst':
+            tasks.append(echo_burst_client(url, payload, args.bursts, args.interval, r, i, args.verbose))
+        elif args.mode == 'echo' and args.pattern == 'stream':
+            tasks.append(echo_stream_client(url, payload, r['schedule'], r, i, args.verbose))
+        else:
+            raise ValueError(f"Unsupported mode/pattern: {args.mode}/{args.pattern}")
+    return client_results, tasks
+
+
+async def run_clients(tasks):
+    await asyncio.gather(*tasks)
+
+
+def event_loop_name(choice):
+    """Event loop the echo clients run on for ``--event-loop`` *choice*: uvloop for auto when it is installed."""
+    if choice == "auto":
+        return "uvloop" if uvloop is not None else "asyncio"
+    return choice
+
+
+def run_event_loop(coro, choice):
+    if event_loop_name(choice) != "uvloop":
+        return asyncio.run(coro)
+    loop = uvloop.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+# =====================
+# Multi-process clients (--processes N)
+# =====================
+def _split_evenly(total, parts, index):
+    return total // parts + (1 if index < total % parts else 0)
+
+
+def _client_shard_main(index, cpu, url, args, client_ids, ready, go, progress, results):
+    """Child process entry: pin to *cpu*, wait for the common start, run *client_ids* on its own loop, ship the results."""
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+    latency_hist = LatencyHistogram()
+    timeline = EchoTimeline(time.time())
+    client_results, tasks = echo_clients(url, args, client_ids, latency_hist, timeline)
+    ready.wait()
+    go.wait()
+    timeline.start = time.time()
+    stop = threading.Event()
+
+    def _report_progress():
+        while not stop.wait(0.5):
+            progress[index] = sum(r['total'] for r in client_results)
+
+    threading.Thread(target=_report_progress, daemon=True).start()
+    run_event_loop(run_clients(tasks), args.event_loop)
+    stop.set()
+    schedules = [r['schedule'].state() for r in client_results if 'schedule' in r]
+    results.put({
+        "success": sum(r['success'] for r in client_results),
+        "fail": sum(r['fail'] for r in client_results),
+        "total": sum(r['total'] for r in client_results),
+        "histogram": latency_hist.state(),
+        "timeline": timeline.state(),
+        "schedule": tuple(map(sum, zip(*schedules))) if schedules else None,
+    })
+
+
+def start_client_shards(url, args):
+    """Spawn ``args.processes`` client processes, one per CPU of our affinity set, and wait until all are ready.
+
+    The clients are split into contiguous ranges, each process running its share on its own event loop.
+    They connect only when ``run_client_shards`` releases them, so process start-up stays outside the
+    measured window.
+    """
+    nproc = args.processes
+    cpus = sorted(os.sched_getaffinity(0))
+    if nproc > len(cpus):
+        logger.warning("--processes %d exceeds the %d CPUs available; client processes will share cores.", nproc, len(cpus))
+    ctx = multiprocessing.get_context("spawn")
+    shards = {
+        "ready": ctx.Barrier(nproc + 1),
+        "go": ctx.Barrier(nproc + 1),
+        "progress": ctx.Array("q", nproc, lock=False),
+        "results": ctx.Queue(),
+        "procs": [],
+    }
+    first = 0
+    for i in range(nproc):
+        count = _split_evenly(args.clients, nproc, i)
+        shards["procs"].append(ctx.Process(
+            target=_client_shard_main,
+            args=(i, cpus[i % len(cpus)], url, args, range(first, first + count),
+                  shards["ready"], shards["go"], shards["progress"], shards["results"]),
+            daemon=True,
+        ))
+        first += count
+    for p in shards["procs"]:
+        p.start()
+    try:
+        shards["ready"].wait(timeout=60)
+    except threading.BrokenBarrierError:
+        for p in shards["procs"]:
+            p.terminate()
+        raise RuntimeError("WebSocket client processes failed to start")
+    return shards
+
+
+def run_client_shards(shards, args, latency_hist, timeline):
+    """Release the client processes, wait for them and merge their histograms and timelines into ours.
+
+    Returns one result dict per process (counters and, for stream, the summed slot accounting), in the
+    shape ``main`` sums over.
+    """
+    procs = shards["procs"]
+    shards["go"].wait()
+    shard_results = []
+    while len(shard_results) < len(procs):
+        try:
+            shard_results.append(shards["results"].get(timeout=1))
+        except queue.Empty:
+            if not any(p.is_alive() for p in procs):
+                break
+    for p in procs:
+        p.join(timeout=5)
+    if len(shard_results) < len(procs):
+        logger.warning("Only %d of %d WebSocket client processes reported results.", len(shard_results), len(procs))
+    client_results = []
+    for r in shard_results:
+        latency_hist.merge(LatencyHistogram.from_state(r["histogram"]))
+        timeline.merge_state(r["timeline"])
+        merged = {'success': r['success'], 'fail': r['fail'], 'total': r['total']}
+        if r["schedule"] is not None:
+            merged['schedule'] = StreamSchedule.from_state(args.rate, args.duration, r["schedule"])
+        client_results.append(merged)
+    return client_results
 
 # =====================
 # Main Benchmark Runner
 # =====================
+async def check_websocket_health(url, timeout):
+    """Poll until the server accepts a connection and echoes a small binary message; False after *timeout* seconds."""
+    ws_parts = urlsplit(url)
+    ws_host, ws_port = ws_parts.hostname or "localhost", ws_parts.port or 80
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    last_error = None
+    while time.monotonic() < deadline:
+        if port_accepting(ws_host, ws_port):
+            attempt += 1
+            try:
+                async with websockets.connect(url, max_size=None, ping_interval=None) as ws:
+                    test_payload = os.urandom(64)  # Small binary payload (64 bytes)
+                    await ws.send(test_payload)
+                    response = await ws.recv()
+                    if response == test_payload:
+                        logger.info(f"WebSocket health check passed (attempt {attempt})")
+                        return True
+                    logger.warning(f"WebSocket health check failed: echo mismatch (attempt {attempt})")
+            except Exception as e:
+                last_error = e
+                logger.debug(f"WebSocket health check attempt {attempt} failed: {e}, retrying...")
+        await asyncio.sleep(0.25)
+    logger.error(f"WebSocket health check failed after {timeout}s ({attempt} attempts). Last error: {last_error}")
+    return False
+
+
+def boot_container(args, container_name, url, docker_path, docker_api=None, cores=None):
+    """Start the server container (with *cores* CPUs in a core sweep) and wait for the WebSocket echo; on failure
+    log its output, remove it and return False."""
+    logger.info(f"Starting container '{container_name}'" + (f" with {cores} CPUs..." if cores is not None else "..."))
+    start_server_container(args.server_image, args.port_mapping, container_name, docker_path, args.network, docker_api,
+                           **server_limits(args, cores))
+    logger.info(f"Checking container health at {url}...")
+    # MEASURE_STARTUP_WAIT + MEASURE_HEALTH_RETRIES * MEASURE_HEALTH_DELAY is the overall timeout;
+    # the port and the echo are polled from the start so a fast server is not left idle.
+    startup_wait = int(os.environ.get("MEASURE_STARTUP_WAIT", "15"))
+    max_attempts = int(os.environ.get("MEASURE_HEALTH_RETRIES", "20"))
+    delay = int(os.environ.get("MEASURE_HEALTH_DELAY", "2"))
+    health_timeout = startup_wait + max_attempts * delay
+    logger.info("Waiting up to %ds for container to answer the WebSocket echo...", health_timeout)
+    if (container_state(container_name, docker_path, docker_api) == "running"
+            and asyncio.run(check_websocket_health(url, health_timeout))):
+        return True
+    logger.error(f"Container '{container_name}' failed WebSocket health check. Stopping container.")
+    # Show container logs to help diagnose (e.g. crash or port not bound)
+    try:
+        logs_result = subprocess.run(
+            [docker_path, "logs", "--tail", "50", container_name],
+            capture_output=True, text=True, timeout=5
+        )
+        if logs_result.stdout or logs_result.stderr:
+            logger.error("Container logs (last 50 lines):")
+            if logs_result.stdout:
+                for line in logs_result.stdout.splitlines():
+                    logger.error("  %s", line)
+            if logs_result.stderr:
+                for line in logs_result.stderr.splitlines():
+                    logger.error("  %s", line)
+    except Exception as e:
+        logger.debug("Could not get container logs: %s", e)
+    stop_server_container(container_name, docker_path, docker_api, port=readiness_port(args.port_mapping, args.network))
+    return False
+
+
+def run_load(url, args, container_name):
+    """Run the echo clients once, in this process or spread over ``--processes`` workers; returns start_time,
+    runtime, the per-client (per-worker when sharded) result dicts, the load generator usage, the merged latency
+    histogram and the per-second timeline rows."""
+    latency_hist = LatencyHistogram()
+    timeline = EchoTimeline(time.time())
+    shards = start_client_shards(url, args) if args.processes > 1 else None
+    if shards is None:
+        client_results, tasks = echo_clients(url, args, range(args.clients), latency_hist, timeline)
+    else:
+        client_results, tasks = [], None
+
+    def completed():
+        if shards is not None:
+            return sum(shards["progress"])
+        return sum(int(r.get("total", 0)) for r in client_results)
+
+    hb_stop = threading.Event()
+    hb_thread = None
+    load_t0 = time.time()
+    if is_measure_quiet() and not args.verbose:
+        iv = measure_quiet_heartbeat_interval_sec()
+
+        def _heartbeat_worker():
+            while not hb_stop.wait(iv):
+                measure_quiet_msg(
+                    f"{container_name} | WebSocket messages {completed()} ({int(time.time() - load_t0)}s elapsed)"
+                )
+
+        hb_thread = threading.Thread(target=_heartbeat_worker, daemon=True)
+        hb_thread.start()
+
+    client_pids = [os.getpid()] + ([proc.pid for proc in shards["procs"]] if shards is not None else [])
+    client_thread, client_stop, client_usage = start_client_collector(client_pids)
+    start_time = time.time()
+    timeline.start = start_time  # bin from the measured start, not from client setup
+    try:
+        if shards is not None:
+            client_results = run_client_shards(shards, args, latency_hist, timeline)
+        else:
+            run_event_loop(run_clients(tasks), args.event_loop)
+    finally:
+        client_stop.set()
+        if hb_thread is not None:
+            hb_stop.set()
+            hb_thread.join(timeout=3)
+    runtime = time.time() - start_time
+    client_thread.join()
+    return {"start_time": start_time, "runtime": runtime, "client_results": client_results,
+            "client": client_usage.get('metrics'), "latency_hist": latency_hist,
+            "timeline": timeline.rows(start_time + runtime)}
+
+
 def main():
     args = parse_args()
     if args.verbose:
@@ -329,8 +2089,10 @@ def main():
     elif is_measure_quiet():
         logger.setLevel(logging.WARNING)
     check_prerequisites()  # Exit with error before any measurement if anything is missing
+    pin_client(args)
     scaphandre_path = get_binary_path("scaphandre")
     docker_path = get_binary_path("docker")
+    docker_api = DockerAPI() if args.docker_backend == "api" else None
     num_cores = os.cpu_count()
     output_json = args.output_json or os.path.join("output", datetime.now().strftime("%Y-%m-%d-%H%M%S") + ".json")
     container_name = args.container_name or args.server_image
@@ -354,221 +2116,179 @@ def main():
     cleanup_existing_scaphandre()
     if is_measure_quiet() and not args.verbose:
         measure_quiet_msg(f"{container_name} | Docker start + WebSocket readiness wait …")
-    logger.info(f"Starting container '{container_name}'...")
-    start_server_container(args.server_image, args.port_mapping, container_name, docker_path, args.network)
     url = args.url
     if not url:
         url = f"ws://localhost:{args.port_mapping.split(':')[0]}/ws"
-    logger.info(f"Checking container health at {url}...")
-    startup_wait = int(os.environ.get("MEASURE_STARTUP_WAIT", "15"))
-    if startup_wait > 0:
-        logger.info("Waiting %ds for container to boot before WebSocket health check...", startup_wait)
-        time.sleep(startup_wait)
-
-    # Actual WebSocket health check: try to connect and echo a small binary message
-    max_attempts = int(os.environ.get("MEASURE_HEALTH_RETRIES", "20"))
-    delay = int(os.environ.get("MEASURE_HEALTH_DELAY", "2"))
-    async def check_websocket_health(ws_url, max_attempts=max_attempts, delay=delay):
-        for attempt in range(1, max_attempts + 1):
-            try:
-                async with websockets.connect(ws_url, max_size=None, ping_interval=None) as ws:
-                    test_payload = os.urandom(64)  # Small binary payload (64 bytes)
-                    await ws.send(test_payload)
-                    response = await ws.recv()
-                    if response == test_payload:
-                        logger.info(f"WebSocket health check passed (attempt {attempt}/{max_attempts})")
-                        return True
-                    else:
-                        logger.warning(f"WebSocket health check failed: echo mismatch (attempt {attempt}/{max_attempts})")
-            except Exception as e:
-                if attempt < max_attempts:
-                    logger.debug(f"WebSocket health check attempt {attempt}/{max_attempts} failed: {e}, retrying in {delay}s...")
-                    time.sleep(delay)
-                else:
-                    logger.error(f"WebSocket health check failed after {max_attempts} attempts. Last error: {e}")
-                    return False
-        return False
-    
-    health_ok = asyncio.run(check_websocket_health(url))
-    if not health_ok:
-        logger.error(f"Container '{container_name}' failed WebSocket health check. Stopping container and exiting.")
-        # Show container logs to help diagnose (e.g. crash or port not bound)
-        try:
-            logs_result = subprocess.run(
-                [docker_path, "logs", "--tail", "50", container_name],
-                capture_output=True, text=True, timeout=5
-            )
-            if logs_result.stdout or logs_result.stderr:
-                logger.error("Container logs (last 50 lines):")
-                if logs_result.stdout:
-                    for line in logs_result.stdout.splitlines():
-                        logger.error("  %s", line)
-                if logs_result.stderr:
-                    for line in logs_result.stderr.splitlines():
-                        logger.error("  %s", line)
-        except Exception as e:
-            logger.debug("Could not get container logs: %s", e)
-        stop_server_container(container_name, docker_path)
+    allotments = args.core_sweep or [None]
+    if not boot_container(args, container_name, url, docker_path, docker_api, cores=allotments[0]):
         exit(1)
+    port = readiness_port(args.port_mapping, args.network)
 
     if is_measure_quiet() and not args.verbose:
         traffic_desc = f"{args.pattern} | clients={args.clients} size_kb={args.size_kb}"
+        if args.window > 1:
+            traffic_desc += f" window={args.window}"
+        if args.processes > 1:
+            traffic_desc += f" processes={args.processes}"
         if args.pattern == "burst":
             traffic_desc += f" bursts={args.bursts} interval={args.interval}s"
         else:
             traffic_desc += f" rate={args.rate}/s duration={args.duration}s"
+        if args.core_sweep:
+            traffic_desc += f" | {args.core_limit} core sweep {','.join(map(str, args.core_sweep))}"
         measure_quiet_msg(
             f"{container_name} | Scaphandre power sampling + WebSocket load | {traffic_desc}"
         )
     logger.info("Starting Scaphandre...")
     scaphandre_process = start_scaphandre(output_json, scaphandre_path)
-    time.sleep(2)
+    idle_window = record_idle_window(args.idle_seconds, container_name, args.verbose)
 
-    stop_event = threading.Event()
-    resource_results = {'cpu': {}, 'mem': {}}
-    def collect():
-        cpu_metrics, mem_metrics = collect_resources_docker_stats(container_name, stop_event, docker_path)
-        resource_results['cpu'] = cpu_metrics
-        resource_results['mem'] = mem_metrics
-    resource_thread = threading.Thread(target=collect)
-    resource_thread.start()
-    logger.info("Sleeping 1s to let docker stats stabilize...")
-    time.sleep(1)
+    boots = ContainerBoots(container_name, docker_path, docker_api)
+    boots.started()
+    measured = []
+    container_up = True
+    for core_index, cores in enumerate(allotments):
+        if core_index > 0:
+            boots.stopping()
+            stop_server_container(container_name, docker_path, docker_api, port=port)
+            if is_measure_quiet() and not args.verbose:
+                measure_quiet_msg(f"{container_name} | core sweep {core_index + 1}/{len(allotments)} | {cores} CPUs")
+            if not boot_container(args, container_name, url, docker_path, docker_api, cores=cores):
+                container_up = False
+                break
+            boots.started()
+            idle_window = record_idle_window(args.idle_seconds, container_name, args.verbose)
+        warmup = run_warmup(url, args, container_name)
+        resource_thread, stop_event, resource_results = start_resource_collector(args, container_name, docker_path, docker_api)
+        run = run_load(url, args, container_name)
+        stop_event.set()
+        resource_thread.join()
+        boots.snapshot()
+        run.update(resources=resource_results, warmup=warmup, cores=cores, idle_window=idle_window)
+        measured.append(run)
 
-    # Prepare per-client result dicts
-    client_results = []
-    for _ in range(args.clients):
-        r = {'success': 0, 'fail': 0, 'total': 0, 'latencies': []}
-        client_results.append(r)
-    tasks = []
-    for i in range(args.clients):
-        if args.mode == 'echo' and args.pattern == 'burst':
-            tasks.append(echo_burst_client(url, args.size_kb, args.bursts, args.interval, client_results[i], i, args.verbose))
-        elif args.mode == 'echo' and args.pattern == 'stream':
-            tasks.append(echo_stream_client(url, args.size_kb, args.rate, args.duration, client_results[i], i, args.verbose))
-        else:
-            raise ValueError(f"Unsupported mode/pattern: {args.mode}/{args.pattern}")
-    async def run_all():
-        await asyncio.gather(*tasks)
-    hb_stop = threading.Event()
-    hb_thread = None
-    load_t0 = time.time()
-    if is_measure_quiet() and not args.verbose:
-        iv = measure_quiet_heartbeat_interval_sec()
-
-        def _heartbeat_worker():
-            while not hb_stop.wait(iv):
-                done = sum(int(r.get("total", 0)) for r in client_results)
-                measure_quiet_msg(
-                    f"{container_name} | WebSocket messages {done} ({int(time.time() - load_t0)}s elapsed)"
-                )
-
-        hb_thread = threading.Thread(target=_heartbeat_worker, daemon=True)
-        hb_thread.start()
-
-    start_time = time.time()
-    try:
-        asyncio.run(run_all())
-    finally:
-        if hb_thread is not None:
-            hb_stop.set()
-            hb_thread.join(timeout=3)
-    runtime = time.time() - start_time
-
-    time.sleep(3)
-    stop_event.set()
-    resource_thread.join()
-    
     if is_measure_quiet() and not args.verbose:
         measure_quiet_msg(f"{container_name} | stopping Scaphandre + appending CSV …")
     logger.info("Waiting for Scaphandre...")
-    time.sleep(5)
+    if measured:
+        # Energy is interpolated up to the window end, so one report past the last window is enough
+        wait_scaphandre_sample(output_json, measured[-1]["start_time"] + measured[-1]["runtime"], scaphandre_process)
     stop_scaphandre(scaphandre_process)
-    container_id = None
-    result = subprocess.run(
-        [docker_path, "ps", "-q", "-f", f"name={container_name}"],
-        capture_output=True, text=True
-    )
-    if result.returncode == 0 and result.stdout.strip():
-        container_id = result.stdout.strip()
-    total_msgs = sum(int(r['total']) for r in client_results)
-    total_success = sum(int(r['success']) for r in client_results)
-    total_fail = sum(int(r['fail']) for r in client_results)
-    all_latencies = [lat for r in client_results for lat in r['latencies']]
-    avg_latency = sum(all_latencies) / len(all_latencies) if all_latencies else 0.0
-    requests_per_second = total_msgs / runtime if runtime > 0 else 0.0
-    throughput_mb_s = (total_msgs * args.size_kb / 1024) / runtime if runtime > 0 else 0.0
-    total_energy, avg_power, total_samples = parse_json_and_compute_energy(
-        output_json, container_name, runtime, container_id=container_id
-    )
-    stop_server_container(container_name, docker_path)
+    series = load_container_power_series(output_json, container_name, boots=boots)
+    if not series:
+        logger.warning(f"No energy samples found for container '{container_name}' in {output_json}")
+    if container_up:
+        stop_server_container(container_name, docker_path, docker_api, port=port)
 
     headers = ["Container Name", "Test Type", "Num CPUs", "Total Messages", "Successful Messages", "Failed Messages", "Execution Time (s)", "Messages/s", "Throughput (MB/s)",
                "Avg Latency (ms)", "Min Latency (ms)", "Max Latency (ms)",
+               "P50 Latency (ms)", "P90 Latency (ms)", "P99 Latency (ms)", "P99.9 Latency (ms)", "Latency Stddev (ms)",
                "Total Energy (J)", "Avg Power (W)", "Samples", "Avg CPU (%)", "Peak CPU (%)", "Total CPU (%*s)",
                "Avg Mem (MB)", "Peak Mem (MB)", "Total Mem (MB*s)",
-               "Pattern", "Num Clients", "Message Size (KB)", "Rate (msg/s)", "Bursts", "Interval (s)", "Duration (s)"]
-    # Calculate latency statistics
-    min_latency = min(all_latencies) if all_latencies else 0.0
-    max_latency = max(all_latencies) if all_latencies else 0.0
-    
-    row = [
-        container_name,
-        args.measurement_type,
-        int(num_cores) if num_cores is not None else 1,
-        total_msgs,
-        total_success,
-        total_fail,
-        runtime,
-        requests_per_second,
-        throughput_mb_s,
-        avg_latency,
-        min_latency,
-        max_latency,
-        total_energy,
-        avg_power,
-        total_samples,
-        resource_results['cpu'].get('avg', 0.0),
-        resource_results['cpu'].get('peak', 0.0),
-        resource_results['cpu'].get('total', 0.0),
-        resource_results['mem'].get('avg', 0.0),
-        resource_results['mem'].get('peak', 0.0),
-        resource_results['mem'].get('total', 0.0),
-        args.pattern,  # Pattern (burst/stream)
-        args.clients,
-        args.size_kb,  # Message Size (KB)
-        args.rate if args.pattern == 'stream' else '',  # Rate (msg/s) for stream mode
-        args.bursts if args.pattern == 'burst' else '',  # Bursts count for burst mode
-        args.interval if args.pattern == 'burst' else '',  # Interval (s) for burst mode
-        args.duration if args.pattern == 'stream' else ''  # Duration (s) for stream mode
-    ]
-    write_header = not os.path.exists(output_csv)
-    with open(output_csv, 'a', newline='') as f:
-        writer = csv.writer(f)
-        if write_header:
-            writer.writerow(headers)
-        writer.writerow(row)
-
-    if is_measure_quiet() and not args.verbose:
-        ok = total_success == total_msgs
-        cnt = (
-            f"{_M_GREEN}{total_success}/{total_msgs} ok{_M_NC}"
-            if ok
-            else f"{total_success}/{total_msgs}"
+               "Pattern", "Num Clients", "Message Size (KB)", "Rate (msg/s)", "Bursts", "Interval (s)", "Duration (s)",
+               "Warmup Energy (J)", "Cooldown Energy (J)", "Idle Window (s)", "Idle Power (W)", "Energy Above Idle (J)",
+               "Warmup Messages", "Warmup Duration (s)", "Warmup Throughput (msg/s)",
+               "Client CPU Avg (%)", "Client CPU Peak (%)", "Client RSS Peak (MB)",
+               "Client Busiest Process CPU (%)", "Client Busiest Thread CPU (%)", "Client Bound",
+               "Server CPUs", "Client CPUs", "Server Cores", "Core Limit", "BEAM Schedulers", "Run ID", "Echo Verify", "Window",
+               "Offered Rate (msg/s)", "Achieved Rate (msg/s)", "Late Messages", "Missed Slots",
+               "Client Processes", "Event Loop"]
+    for index, run in enumerate(measured):
+        start_time, runtime, client_results = run["start_time"], run["runtime"], run["client_results"]
+        resource_results, warmup, client = run["resources"], run["warmup"], run["client"]
+        # Warmup/cooldown of a core-sweep point stop at the neighbouring points' load windows
+        lower = measured[index - 1]["start_time"] + measured[index - 1]["runtime"] if index > 0 else float("-inf")
+        upper = measured[index + 1]["start_time"] if index + 1 < len(measured) else float("inf")
+        total_energy, avg_power, total_samples, phase_energy = compute_window_energy(
+            series, start_time, runtime, run["idle_window"], bounds=(lower, upper)
         )
-        measure_quiet_msg(
-            f"{container_name} | {cnt} | {runtime:.1f}s | {requests_per_second:.0f} msg/s | {output_csv}"
+        run_id = new_run_id()
+        timeline_file = save_timeline(
+            timeline_path(output_csv, run_id), run_id,
+            timeline_columns(run["timeline"], start_time, resource_results["samples"], series)
         )
-    else:
-        logger.info("=== Measurement Summary ===")
-        logger.info(f"Container: {container_name}")
-        logger.info(f"Total Requests: {total_msgs}, Successful: {total_success}, Failed: {total_fail}")
-        logger.info(f"Execution Time: {runtime:.2f} s, Messages/s: {requests_per_second:.2f}")
-        logger.info(f"Energy: Total {total_energy:.2f} J, Avg Power {avg_power:.2f} W")
-        logger.info(f"CPU: Avg {resource_results['cpu'].get('avg', 0.0):.2f}%, Peak {resource_results['cpu'].get('peak', 0.0):.2f}%, Total {resource_results['cpu'].get('total', 0.0):.2f} %*s")
-        logger.info(f"Memory: Avg {resource_results['mem'].get('avg', 0.0):.2f} MB, Peak {resource_results['mem'].get('peak', 0.0):.2f} MB, Total {resource_results['mem'].get('total', 0.0):.2f} MB*s")
-        logger.info(f"JSON: {output_json}, CSV: {output_csv}")
-        logger.info("==========================")
+        logger.info(f"Timeline: {timeline_file}")
+        total_msgs = sum(int(r['total']) for r in client_results)
+        total_success = sum(int(r['success']) for r in client_results)
+        total_fail = sum(int(r['fail']) for r in client_results)
+        requests_per_second = total_msgs / runtime if runtime > 0 else 0.0
+        throughput_mb_s = (total_msgs * args.size_kb / 1024) / runtime if runtime > 0 else 0.0
+
+        row = [
+            container_name,
+            args.measurement_type,
+            int(num_cores) if num_cores is not None else 1,
+            total_msgs,
+            total_success,
+            total_fail,
+            runtime,
+            requests_per_second,
+            throughput_mb_s,
+            *latency_csv_fields(run["latency_hist"]).values(),
+            total_energy,
+            avg_power,
+            total_samples,
+            resource_results['cpu'].get('avg', 0.0),
+            resource_results['cpu'].get('peak', 0.0),
+            resource_results['cpu'].get('total', 0.0),
+            resource_results['mem'].get('avg', 0.0),
+            resource_results['mem'].get('peak', 0.0),
+            resource_results['mem'].get('total', 0.0),
+            args.pattern,  # Pattern (burst/stream)
+            args.clients,
+            args.size_kb,  # Message Size (KB)
+            args.rate if args.pattern == 'stream' else '',  # Rate (msg/s) for stream mode
+            args.bursts if args.pattern == 'burst' else '',  # Bursts count for burst mode
+            args.interval if args.pattern == 'burst' else '',  # Interval (s) for burst mode
+            args.duration if args.pattern == 'stream' else '',  # Duration (s) for stream mode
+            phase_energy['warmup'],
+            phase_energy['cooldown']
+        ] + list(idle_csv_fields(args.idle_seconds, phase_energy).values()) + list(warmup_csv_fields(warmup).values())
+        core_fields = core_csv_fields(args, run["cores"], num_cores)
+        client_fields = client_csv_fields(client, resource_results['cpu'].get('avg', 0.0), core_fields["Server Cores"])
+        row += list(client_fields.values()) + list(cpu_layout_csv_fields(args, run["cores"]).values()) + list(core_fields.values()) + [run_id, args.verify, args.window]
+        row += list(stream_csv_fields(args, client_results).values()) + [args.processes, event_loop_name(args.event_loop)]
+        write_csv_row(output_csv, headers, row)
+
+        if is_measure_quiet() and not args.verbose:
+            ok = total_success == total_msgs
+            cnt = (
+                f"{_M_GREEN}{total_success}/{total_msgs} ok{_M_NC}"
+                if ok
+                else f"{total_success}/{total_msgs}"
+            )
+            bound = " | client-bound" if client_fields["Client Bound"] == "yes" else ""
+            cores = f" | {run['cores']} CPUs" if run["cores"] is not None else ""
+            measure_quiet_msg(
+                f"{container_name}{cores} | {cnt} | {runtime:.1f}s | {requests_per_second:.0f} msg/s{bound} | {output_csv}"
+            )
+        else:
+            logger.info("=== Measurement Summary ===")
+            logger.info(f"Container: {container_name}" + (f" ({run['cores']} CPUs)" if run["cores"] is not None else ""))
+            logger.info(f"Total Requests: {total_msgs}, Successful: {total_success}, Failed: {total_fail}")
+            logger.info(f"Execution Time: {runtime:.2f} s, Messages/s: {requests_per_second:.2f}")
+            if args.pattern == 'stream':
+                stream = stream_csv_fields(args, client_results)
+                logger.info(f"Send rate: offered {stream['Offered Rate (msg/s)']:.2f} msg/s, achieved {stream['Achieved Rate (msg/s)']:.2f} msg/s, "
+                            f"{stream['Late Messages']} late, {stream['Missed Slots']} missed slots")
+            latency = run["latency_hist"]
+            logger.info(f"Latency: Avg {latency.mean_ms():.2f} ms, P50 {latency.percentile_ms(50):.2f} ms, P99 {latency.percentile_ms(99):.2f} ms, "
+                        f"P99.9 {latency.percentile_ms(99.9):.2f} ms, Max {latency.max_ms():.2f} ms, Stddev {latency.stddev_ms():.2f} ms")
+            if warmup is not None:
+                logger.info(f"Warmup: {warmup['messages']} messages in {warmup['duration']:.2f} s ({warmup['throughput']:.2f} msg/s), not measured")
+            logger.info(f"Energy: Total {total_energy:.2f} J, Avg Power {avg_power:.2f} W")
+            logger.info(f"Energy outside load window: Warmup {phase_energy['warmup']:.2f} J, Cooldown {phase_energy['cooldown']:.2f} J")
+            if phase_energy['idle_power'] is not None:
+                logger.info(f"Idle baseline: {phase_energy['idle_power']:.2f} W, Energy above idle {phase_energy['above_idle']:.2f} J")
+            logger.info(f"CPU: Avg {resource_results['cpu'].get('avg', 0.0):.2f}%, Peak {resource_results['cpu'].get('peak', 0.0):.2f}%, Total {resource_results['cpu'].get('total', 0.0):.2f} %*s")
+            logger.info(f"Memory: Avg {resource_results['mem'].get('avg', 0.0):.2f} MB, Peak {resource_results['mem'].get('peak', 0.0):.2f} MB, Total {resource_results['mem'].get('total', 0.0):.2f} MB*s")
+            if client is not None:
+                logger.info(f"Load generator: CPU Avg {client['cpu_avg']:.2f}%, Peak {client['cpu_peak']:.2f}%, RSS Peak {client['rss_peak']:.2f} MB, "
+                            f"busiest process {client['busiest_process']:.2f}%, busiest thread {client['busiest_thread']:.2f}%")
+                if client_fields["Client Bound"] == "yes":
+                    logger.warning("Load generator saturated a core while the server did not: throughput is client-bound")
+            logger.info(f"JSON: {output_json}, CSV: {output_csv}")
+            logger.info("==========================")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file